@@ -1,8 +1,14 @@
-import requests
 import subprocess
 from datetime import datetime
 import streamlit as st
-from llm_classifier import classify_ticket
+from llm_classifier import (
+    classify_ticket, classify_ticket_stream, write_log, load_dealer_index, get_client,
+)
+from email_thread import split_thread
+from feedback_queue import submit_feedback, get_feedback_queue
+from fewshot_index import get_fewshot_index
+from syndicator_index import get_syndicator_index
+from ticket_features import name_automaton
 import json
 
 st.set_page_config(page_title="Ticket AI Classifier", layout="wide")
@@ -33,6 +39,74 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
+FIELD_LABELS = [
+    ("dealer_name", "Dealer Name"), ("dealer_id", "Dealer ID"), ("rep", "Rep"), ("contact", "Contact"),
+    ("category", "Category"), ("sub_category", "Sub Category"), ("syndicator", "Syndicator"),
+    ("inventory_type", "Inventory Type"),
+]
+
+def render_fields(zf, pending=False):
+    # pending: fields still waiting on the model show an hourglass instead of an empty value
+    lines = []
+    for key, label in FIELD_LABELS:
+        value = zf.get(key, "")
+        lines.append(f"**{label}**: `{value}`" if value or not pending else f"**{label}**: ⏳")
+    return "  \n".join(lines)
+
+def classify_streaming(text, placeholder):
+    shown = {}
+    result = {}
+    for event in classify_ticket_stream(text):
+        if event["event"] == "field":
+            if event["value"]:
+                shown[event["field"]] = event["value"]
+                placeholder.markdown("### 🧾 Zoho Fields\n" + render_fields(shown, pending=True))
+        else:
+            result = event["result"]
+    placeholder.empty()
+    return result
+
+@st.cache_resource(show_spinner="Loading dealer mapping and keyword tables…")
+def load_resources():
+    # Once per server process, shared by every session: dealer index, syndicator index, the combined
+    # name automaton, the few-shot example index, the OpenAI client on the pooled HTTP transport, and the
+    # feedback sender. The dealer and few-shot indexes reload themselves when their files change, so
+    # nothing here needs invalidating.
+    dealer_index = load_dealer_index()
+    syndicators = get_syndicator_index()
+    name_automaton(dealer_index, syndicators)
+    get_fewshot_index()
+    get_feedback_queue()
+    return {"dealer_index": dealer_index, "syndicators": syndicators, "client": get_client()}
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def timeline_markdown(raw_text):
+    timeline = []
+    messages = split_thread(raw_text)
+    if len(messages) > 1:
+        for message in messages:
+            header = " · ".join(p for p in (message.sender or "Unknown sender", message.date) if p)
+            preview = " ".join(message.body.split())
+            timeline.append(f"- **{header}**\n  → _{preview[:100]}..._")
+    if not timeline:
+        preview = raw_text[:150].replace("\n", " ")
+        timeline = [f"**Message:** _{preview}..._"]
+    return "\n\n".join(timeline)
+
+def classify_memoized(text, stream):
+    # Per-session memo: pressing Classify again on the same text (or any other rerun) reuses the result
+    last = st.session_state.get("last_classification")
+    if last and last["input"] == text:
+        return last["result"]
+    result = classify_streaming(text, st.empty()) if stream else classify_ticket(text)
+    write_log(text, result)
+    if "error" in result:
+        # LLM call failed or its reply stayed unparseable after the repair retry
+        st.session_state.pop("last_classification", None)
+        raise RuntimeError(result["error"])
+    st.session_state.last_classification = {"input": text, "result": result, "feedback_sent": False, "confirmed": False}
+    return result
+
 st.title("🎟️ Ticket AI Classifier")
 
 st.markdown("""
@@ -55,92 +129,89 @@ with st.sidebar:
         height=260
     )
 
+    stream_results = st.checkbox("⚡ Stream fields as they arrive", value=True)
+
     classify_col, clear_col = st.columns([1, 1])
     with classify_col:
         classify = st.button("🚀 Classify Ticket", use_container_width=True)
     with clear_col:
         if st.button("🧹 Clear Fields", use_container_width=True):
             st.session_state.ticket_input = ""
+            st.session_state.pop("last_classification", None)
             st.experimental_rerun()
 # MAIN: Classifier Output
 if classify:
     st.session_state.ticket_input = ticket_input
-    if not ticket_input.strip():
+    text = ticket_input.strip()
+    if not text:
         st.error("Please paste a ticket or message.")
     else:
         with st.spinner("Classifying…"):
             try:
-                result = classify_ticket(ticket_input.strip())
+                load_resources()
+                classify_memoized(text, stream_results)
                 st.success("✅ Classification complete.")
-                zf = result.get("zoho_fields", {})
-                edge = result.get("edge_case", "")
-                raw_text = ticket_input.strip()
-
-                left_col, right_col = st.columns([2, 1])
-                with left_col:
-                    st.markdown("### 🧾 Zoho Fields")
-                    st.markdown(f"""
-**Dealer Name**: `{zf.get("dealer_name", "")}`  
-**Dealer ID**: `{zf.get("dealer_id", "")}`  
-**Rep**: `{zf.get("rep", "")}`  
-**Contact**: `{zf.get("contact", "")}`  
-**Category**: `{zf.get("category", "")}`  
-**Sub Category**: `{zf.get("sub_category", "")}`  
-**Syndicator**: `{zf.get("syndicator", "")}`  
-**Inventory Type**: `{zf.get("inventory_type", "")}`
-""")
-
-                    feedback = st.button("❌ This classification is incorrect", key="flag_button_left_col")
-                    if feedback:
-                        log_entry = {
-                            "timestamp": datetime.utcnow().isoformat(),
-                            "edge_case": edge,
-                            "zoho_fields": json.dumps(zf),
-                            "zoho_comment": result.get("zoho_comment", ""),
-                            "input_text": ticket_input.strip()
-                        }
-                        form_url = "https://docs.google.com/forms/d/e/1FAIpQLSfIJgy3DdtSQsZN6G4asdZyiWaf2Qb-8_9fwQLxp74sFTMx4g/formResponse"
-                        payload = {
-                            "entry.2041497043": log_entry["timestamp"],
-                            "entry.827201251": log_entry["edge_case"],
-                            "entry.1216884505": log_entry["zoho_fields"],
-                            "entry.1859746012": log_entry["zoho_comment"],
-                            "entry.91556361": log_entry["input_text"]
-                        }
-                        r = requests.post(form_url, data=payload)
-                        if r.status_code == 200:
-                            st.success("📝 Feedback sent to Google Sheets! Thank you!")
-                        else:
-                            st.info("Feedback submitted. Check Google Sheets to confirm receipt.")
-
-                    if edge:
-                        st.warning(f"⚠️ Detected Edge Case: `{edge}`")
-
-                    st.markdown("---")
-                    st.markdown("### 📬 Communication Timeline")
-                    timeline = []
-                    lines = raw_text.splitlines()
-                    for i, line in enumerate(lines):
-                        line = line.strip()
-                        if line.lower().startswith("from:") or "wrote:" in line.lower():
-                            if i + 1 < len(lines):
-                                preview = lines[i + 1].strip()
-                                summary = f"- **{line}**\n  → _{preview[:100]}..._"
-                                timeline.append(summary)
-                    if not timeline:
-                        preview = raw_text[:150].replace("\n", " ")
-                        timeline = [f"**Message:** _{preview}..._"]
-                    st.markdown("\n\n".join(timeline))
-
-                with right_col:
-                    st.markdown("### 📝 Zoho Comment")
-                    st.code(result["zoho_comment"], language="markdown")
-                    st.download_button(
-                        label="📋 Copy Zoho Comment",
-                        data=result["zoho_comment"],
-                        file_name="zoho_comment.txt",
-                        mime="text/plain"
-                    )
             except Exception as e:
                 st.error("❌ An unexpected error occurred.")
                 st.exception(e)
+
+# Reruns from the feedback / copy buttons (or any other widget) redraw the memoized result
+last = st.session_state.get("last_classification")
+if last:
+    result = last["result"]
+    zf = result.get("zoho_fields", {})
+    edge = result.get("edge_case", "")
+
+    left_col, right_col = st.columns([2, 1])
+    with left_col:
+        st.markdown("### 🧾 Zoho Fields")
+        st.markdown(render_fields(zf))
+
+        if last["feedback_sent"]:
+            st.success("📝 Feedback queued for Google Sheets. Thank you!")
+        elif st.button("❌ This classification is incorrect", key="flag_button_left_col"):
+            log_entry = {
+                "timestamp": datetime.utcnow().isoformat(),
+                "edge_case": edge,
+                "zoho_fields": json.dumps(zf),
+                "zoho_comment": result.get("zoho_comment", ""),
+                "input_text": last["input"]
+            }
+            # Queued and sent in the background; the spool keeps it if Google Forms is down
+            submit_feedback(log_entry)
+            last["feedback_sent"] = True
+            st.success("📝 Feedback queued for Google Sheets. Thank you!")
+
+        if last["confirmed"]:
+            st.success("👍 Saved as an example for similar tickets.")
+        elif not last["feedback_sent"] and st.button("👍 This classification is correct", key="confirm_button_left_col"):
+            write_log(last["input"], result, confirmed=True)
+            last["confirmed"] = True
+            st.success("👍 Saved as an example for similar tickets.")
+
+        if edge:
+            st.warning(f"⚠️ Detected Edge Case: `{edge}`")
+        for model, reasons in result.get("escalations", {}).items():
+            st.caption(f"🧭 {model} answer escalated: {', '.join(reasons)}")
+        if result.get("escalation_failed"):
+            st.warning(f"⚠️ Escalation failed, showing the **{result['model']}** answer: {result['escalation_failed']}")
+        for field, check in result.get("model_disagrees", {}).items():
+            st.warning(f"🤖 The local model reads {field} as **{check['model'] or 'blank'}** "
+                       f"({check['probability']:.0%}), not **{check['llm'] or 'blank'}**. Worth a second look.")
+        for syndicator, active in result.get("export_active", {}).items():
+            st.info(f"📦 {syndicator} export is already **{'ON' if active else 'OFF'}** for this dealer "
+                    f"(snapshot {result.get('export_snapshot_age_hours', 0):.0f}h old)")
+
+        st.markdown("---")
+        st.markdown("### 📬 Communication Timeline")
+        st.markdown(timeline_markdown(last["input"]))
+
+    with right_col:
+        st.markdown("### 📝 Zoho Comment")
+        st.code(result["zoho_comment"], language="markdown")
+        st.download_button(
+            label="📋 Copy Zoho Comment",
+            data=result["zoho_comment"],
+            file_name="zoho_comment.txt",
+            mime="text/plain"
+        )
@@ -0,0 +1,34 @@
+import os
+import pickle
+
+# Precompiled lookup tables live next to the code so start-up can skip CSV parsing entirely.
+ARTIFACT_DIR = os.getenv("CLASSIFIER_ARTIFACT_DIR", ".artifacts")
+ARTIFACT_FORMAT = 1
+
+
+def artifact_path(source_path, name):
+    return os.path.join(ARTIFACT_DIR, f"{os.path.basename(source_path)}.{name}.pickle")
+
+
+def load_artifact(source_path, name, build):
+    # Rebuilds (and re-pickles) whenever the source file's mtime or size changes
+    st = os.stat(source_path)
+    stamp = (ARTIFACT_FORMAT, st.st_mtime_ns, st.st_size)
+    path = artifact_path(source_path, name)
+    try:
+        with open(path, "rb") as f:
+            cached_stamp, value = pickle.load(f)
+        if cached_stamp == stamp:
+            return value
+    except (OSError, EOFError, pickle.UnpicklingError, ValueError, TypeError):
+        pass
+    value = build(source_path)
+    try:
+        os.makedirs(ARTIFACT_DIR, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump((stamp, value), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+    return value
@@ -0,0 +1,233 @@
+import os
+import csv
+import json
+import time
+import random
+import asyncio
+import argparse
+import openai
+from openai import AsyncOpenAI
+from email_thread import prepare_thread
+from fewshot_index import similar_examples
+from ticket_model import local_predictions
+from http_transport import make_async_http_client
+from classification_log import get_logger, write_log
+from result_cache import get_result_cache
+from rule_classifier import RULE_CONFIDENCE_THRESHOLD
+from llm_classifier import (
+    answer_cache_key, STRUCTURED_OUTPUT, REPAIR_MODEL, REPAIR_RETRIES, REPAIR_MAX_TOKENS, RESPONSE_FORMAT,
+    build_messages, repair_messages, parse_llm_response, finalize_result, classify_by_rules, usage_counts,
+    add_repair_usage, reply_text, add_model_check, local_rules, store_result, add_export_status,
+)
+from model_router import Route, format_routes, get_route_stats
+
+# Rough output size of one zoho_fields reply, used to reserve tokens before the response is known
+EXPECTED_COMPLETION_TOKENS = 250
+
+
+class TokenBucket:
+    def __init__(self, per_minute, capacity=None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount=1):
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def adjust(self, delta):
+        # Reconcile an estimate with real usage; may go negative so later callers wait it out
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+
+def _retry_delay(error, attempt, base=1.0, cap=30.0):
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    # Full jitter keeps a burst of 429s from retrying in lockstep
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def _is_retryable(error):
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+
+class BatchClassifier:
+    def __init__(self, client=None, model="gpt-4o", concurrency=8, requests_per_minute=500,
+                 tokens_per_minute=30000, max_retries=5, use_cache=True,
+                 rule_threshold=RULE_CONFIDENCE_THRESHOLD, structured=STRUCTURED_OUTPUT):
+        self.client = client or AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0,
+                                            http_client=make_async_http_client())
+        self.model = model
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.use_cache = use_cache
+        self.rule_threshold = rule_threshold
+        self.structured = structured
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.stats = {"requests": 0, "retries": 0, "failures": 0, "cache_hits": 0, "rule_hits": 0, "tokens": 0,
+                      "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0, "repairs": 0, "escalations": 0}
+
+    async def _complete(self, messages, model=None, **options):
+        estimate = sum(len(m["content"]) for m in messages) // 4 + EXPECTED_COMPLETION_TOKENS
+        for attempt in range(self.max_retries + 1):
+            await self.request_bucket.acquire()
+            await self.token_bucket.acquire(estimate)
+            self.stats["requests"] += 1
+            started = time.perf_counter()
+            try:
+                resp = await self.client.chat.completions.create(
+                    model=model or self.model, messages=messages, **{"temperature": 0.2, **options},
+                )
+            except Exception as e:
+                if attempt >= self.max_retries or not _is_retryable(e):
+                    raise
+                self.stats["retries"] += 1
+                await asyncio.sleep(_retry_delay(e, attempt))
+                continue
+            usage = usage_counts(resp.usage, started)
+            if resp.usage is not None:
+                self.stats["tokens"] += resp.usage.total_tokens
+                self.stats["prompt_tokens"] += usage["prompt_tokens"]
+                self.stats["cached_tokens"] += usage["cached_tokens"]
+                self.stats["completion_tokens"] += usage["completion_tokens"]
+                self.token_bucket.adjust(resp.usage.total_tokens - estimate)
+            return reply_text(resp), usage
+
+    async def _parse(self, raw, usage):
+        # Async twin of llm_classifier.parse_or_repair
+        for attempt in range(REPAIR_RETRIES + 1):
+            try:
+                return parse_llm_response(raw)
+            except ValueError:
+                if attempt >= REPAIR_RETRIES or not raw:
+                    raise
+            self.stats["repairs"] += 1
+            raw, repair_usage = await self._complete(
+                repair_messages(raw), model=REPAIR_MODEL, temperature=0, max_tokens=REPAIR_MAX_TOKENS,
+                response_format=RESPONSE_FORMAT,
+            )
+            add_repair_usage(usage, repair_usage)
+
+    async def classify(self, text, semaphore, prediction=None):
+        # Same tail as classify_ticket: export status on every result, cached or not
+        return add_export_status(await self._classify(text, semaphore, prediction))
+
+    async def _classify(self, text, semaphore, prediction):
+        async with semaphore:
+            message, context, history = prepare_thread(text)
+            rules = local_rules(message, context, prediction)
+            data = classify_by_rules(message, context, self.rule_threshold, rules=rules)
+            if data is not None:
+                self.stats["rule_hits"] += 1
+                return data
+            examples = similar_examples(message)
+            cache = get_result_cache() if self.use_cache else None
+            cache_key = None
+            if cache is not None:
+                cache_key = answer_cache_key(text, self.model, examples, rules, prediction, self.structured)
+                cached = cache.get(cache_key)
+                if cached is not None:
+                    self.stats["cache_hits"] += 1
+                    return cached
+            options = {"response_format": RESPONSE_FORMAT} if self.structured else {}
+            messages = build_messages(message, context, history, structured=self.structured, examples=examples)
+            route = Route(self.model, context, rules, REPAIR_MODEL)
+            for route_model in route:
+                try:
+                    raw, usage = await self._complete(messages, model=route_model, **options)
+                    data = finalize_result(text, context, await self._parse(raw, usage))
+                except Exception as e:
+                    get_logger().error("Classification with %s failed: %r", route_model, e)
+                    route.failed(route_model, e)
+                    continue
+                add_model_check(data, prediction)
+                route.answer(route_model, data, usage)
+            data = route.result()
+            if "error" in data:
+                self.stats["failures"] += 1
+                return data
+            self.stats["escalations"] += len(data.get("escalations", {}))
+            return store_result(cache, cache_key, data)
+
+    async def classify_all(self, texts):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        # The local model scores the whole backlog in one vectorised pass up front
+        predictions = local_predictions(prepare_thread(text)[0] for text in texts) or [None] * len(texts)
+        # gather() keeps results in input order regardless of completion order
+        return await asyncio.gather(*(
+            self.classify(text, semaphore, prediction) for text, prediction in zip(texts, predictions)
+        ))
+
+
+def classify_batch(texts, **kwargs):
+    return asyncio.run(BatchClassifier(**kwargs).classify_all(list(texts)))
+
+
+def read_messages(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    if not rows:
+        return []
+    msg_col = "message" if "message" in rows[0] else next(iter(rows[0]))
+    return [str(row[msg_col] or "") for row in rows]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Classify a CSV of tickets concurrently.")
+    parser.add_argument("input", help="CSV file with a 'message' column (or message in the first column)")
+    parser.add_argument("-o", "--output", default="batch_results.jsonl", help="JSONL file, one result per input row")
+    parser.add_argument("--model", default="gpt-4o")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rpm", type=int, default=500, help="Requests per minute")
+    parser.add_argument("--tpm", type=int, default=30000, help="Tokens per minute")
+    parser.add_argument("--max-retries", type=int, default=5)
+    parser.add_argument("--base-url", default=None, help="Override the API base URL (e.g. fake_openai.py)")
+    parser.add_argument("--no-cache", action="store_true")
+    args = parser.parse_args(argv)
+
+    texts = read_messages(args.input)
+    client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), base_url=args.base_url, max_retries=0,
+                         http_client=make_async_http_client())
+    engine = BatchClassifier(
+        client=client, model=args.model, concurrency=args.concurrency,
+        requests_per_minute=args.rpm, tokens_per_minute=args.tpm,
+        max_retries=args.max_retries, use_cache=not args.no_cache,
+    )
+    started = time.perf_counter()
+    results = asyncio.run(engine.classify_all(texts))
+    elapsed = time.perf_counter() - started
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        for i, (text, result) in enumerate(zip(texts, results)):
+            f.write(json.dumps({"index": i, "input": text, "output": result}, ensure_ascii=False) + "\n")
+            write_log(text, result)
+    print(f"✅ Classified {len(texts)} tickets in {elapsed:.1f}s → {args.output}")
+    print(f"📊 {engine.stats}")
+    for line in format_routes(get_route_stats().summary()):
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
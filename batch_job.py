@@ -0,0 +1,272 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+from openai import OpenAI
+from openai.types.chat import ChatCompletion
+
+import llm_classifier
+from email_thread import prepare_thread
+from fewshot_index import similar_examples
+from ticket_model import local_predictions
+from http_transport import get_http_client
+from classification_log import LOG_PATH, get_logger, read_log
+from result_cache import get_result_cache
+from batch_classifier import read_messages
+from llm_classifier import (
+    PROMPT_FINGERPRINT, STRUCTURED_OUTPUT, RESPONSE_FORMAT, build_messages, classify_by_rules, finalize_result,
+    parse_or_repair, reply_text, usage_counts, add_model_check, answer_cache_key, local_rules,
+)
+
+# Overnight reclassification through the OpenAI Batch API (half price, results within 24h).
+# Tickets the cache or the rules can answer are resolved locally; the rest are serialized with the
+# normal prompt builder into a Batch API input file, submitted, polled, and merged back through
+# finalize_result. Progress lives in a small state file so a cron job can submit, exit, and pick the
+# results up on its next run. The state freezes the submitted texts: the log keeps growing between
+# runs, and a submitted batch is resumed (never resubmitted) whatever the input looks like by then.
+
+STATE_PATH = os.getenv("CLASSIFIER_BATCH_STATE", "batch_job_state.json")
+TERMINAL = {"completed", "failed", "expired", "cancelled"}
+
+
+def read_log_inputs(path=LOG_PATH):
+    # Distinct ticket texts from the classification history (rotated .N.gz files included), oldest first
+    seen = {}
+    for entry in read_log(path):
+        text = entry.get("input")
+        if isinstance(text, str) and text.strip():
+            seen.setdefault(text.strip(), None)
+    return list(seen)
+
+
+def read_inputs(path):
+    return read_messages(path) if path.lower().endswith(".csv") else read_log_inputs(path)
+
+
+def inputs_digest(texts, model):
+    h = hashlib.sha256(f"{model}\n{PROMPT_FINGERPRINT}\n".encode("utf-8"))
+    for text in texts:
+        h.update(hashlib.sha256(text.encode("utf-8")).digest())
+    return h.hexdigest()[:16]
+
+
+def batch_request(custom_id, text, model, structured=STRUCTURED_OUTPUT):
+    # One line of the Batch API input file: the same body classify_ticket would send
+    message, context, history = prepare_thread(text)
+    body = {
+        "model": model,
+        "messages": build_messages(message, context, history, structured=structured, examples=similar_examples(message)),
+        "temperature": 0.2,
+    }
+    if structured:
+        body["response_format"] = RESPONSE_FORMAT
+    return {"custom_id": custom_id, "method": "POST", "url": "/v1/chat/completions", "body": body}
+
+
+def resolve_locally(text, model, use_cache, rule_threshold, prediction=None, structured=STRUCTURED_OUTPUT):
+    # (result, cache key): the rules' or the cache's answer when there is one, and the key an LLM answer
+    # for this ticket is cached under (None with the cache off)
+    message, context, _ = prepare_thread(text)
+    rules = local_rules(message, context, prediction)
+    data = classify_by_rules(message, context, rule_threshold, rules=rules)
+    cache = get_result_cache() if use_cache else None
+    if data is not None or cache is None:
+        return data, None
+    cache_key = answer_cache_key(text, model, similar_examples(message), rules, prediction, structured)
+    return cache.get(cache_key), cache_key
+
+
+def batch_predictions(texts):
+    # Local-model predictions for the whole input in one vectorised pass (all None without a model)
+    return local_predictions(prepare_thread(text)[0] for text in texts) or [None] * len(texts)
+
+
+def merge_line(text, line, cache_key=None, prediction=None):
+    # Same post-processing as classify_ticket: parse (with repair), dealer matching, zoho comment
+    if line.get("error") or (line.get("response") or {}).get("status_code") != 200:
+        return {"error": json.dumps(line.get("error") or line.get("response"), ensure_ascii=False)}
+    try:
+        resp = ChatCompletion.model_validate(line["response"]["body"])
+        usage = usage_counts(resp.usage)
+        parsed = parse_or_repair(reply_text(resp), usage)
+    except Exception as e:
+        get_logger().error("Batch result %s unusable: %r", line.get("custom_id"), e)
+        return {"error": str(e)}
+    _, context, _ = prepare_thread(text)
+    data = finalize_result(text, context, parsed)
+    data["tier"] = "llm"
+    usage["batch"] = True
+    data["usage"] = usage
+    add_model_check(data, prediction)
+    cache = get_result_cache() if cache_key else None
+    if cache is not None:
+        cache.put(cache_key, data)
+    return data
+
+
+class BatchJob:
+    def __init__(self, client, model="gpt-4o", state_path=STATE_PATH, use_cache=True,
+                 rule_threshold=llm_classifier.RULE_CONFIDENCE_THRESHOLD, structured=STRUCTURED_OUTPUT):
+        self.client = client
+        self.model = model
+        self.state_path = state_path
+        self.use_cache = use_cache
+        self.rule_threshold = rule_threshold
+        self.structured = structured
+        self.state = None
+        self.texts = []
+
+    def load_state(self, digest):
+        if not os.path.exists(self.state_path):
+            return None
+        with open(self.state_path, encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("batch_id") and "texts" in state:
+            # A submitted batch is resumed against the texts it was built from, even if the input has grown
+            return state
+        # Nothing on the server (all resolved locally) and a different input list (or prompt): a new job
+        return state if state.get("digest") == digest else None
+
+    def save_state(self):
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp, self.state_path)
+
+    def submit(self, texts, digest, input_path):
+        pending, cache_keys = {}, {}
+        predictions = batch_predictions(texts)
+        with open(input_path, "w", encoding="utf-8") as f:
+            for i, text in enumerate(texts):
+                data, cache_key = resolve_locally(text, self.model, self.use_cache, self.rule_threshold, predictions[i],
+                                                  self.structured)
+                if data is not None:
+                    continue
+                custom_id = f"ticket-{i}"
+                pending[custom_id] = i
+                if cache_key:
+                    # Keyed on the examples this request was built with, whatever the pool holds at merge time
+                    cache_keys[custom_id] = cache_key
+                f.write(json.dumps(batch_request(custom_id, text, self.model, self.structured), ensure_ascii=False) + "\n")
+        self.state = {"digest": digest, "model": self.model, "pending": pending, "batch_id": None,
+                      "submitted_at": time.time(), "texts": texts,
+                      "cache_keys": cache_keys}
+        if pending:
+            with open(input_path, "rb") as f:
+                uploaded = self.client.files.create(file=f, purpose="batch")
+            batch = self.client.batches.create(
+                input_file_id=uploaded.id, endpoint="/v1/chat/completions", completion_window="24h",
+                metadata={"job": "ticket-reclassification", "digest": digest},
+            )
+            self.state["batch_id"] = batch.id
+            self.state["status"] = batch.status
+        self.save_state()
+
+    def poll(self, wait=True, interval=30.0, timeout=None):
+        started = time.monotonic()
+        while True:
+            batch = self.client.batches.retrieve(self.state["batch_id"])
+            if batch.status != self.state.get("status"):
+                self.state["status"] = batch.status
+                self.save_state()
+            if batch.status in TERMINAL or not wait:
+                return batch
+            if timeout is not None and time.monotonic() - started > timeout:
+                return batch
+            time.sleep(interval)
+
+    def download(self, file_id):
+        lines = {}
+        if file_id:
+            for raw in self.client.files.content(file_id).text.splitlines():
+                if raw.strip():
+                    line = json.loads(raw)
+                    lines[line["custom_id"]] = line
+        return lines
+
+    def merge(self, texts, batch):
+        lines = self.download(batch.output_file_id) if batch is not None else {}
+        if batch is not None:
+            lines.update(self.download(getattr(batch, "error_file_id", None)))
+        by_index = {i: custom_id for custom_id, i in self.state["pending"].items()}
+        predictions = batch_predictions(texts)
+        results = []
+        for i, text in enumerate(texts):
+            custom_id = by_index.get(i)
+            if custom_id is None:
+                data, _ = resolve_locally(text, self.model, self.use_cache, self.rule_threshold, predictions[i],
+                                          self.structured)
+                results.append(data or {"error": "no longer resolvable locally; rerun the job"})
+            elif custom_id in lines:
+                cache_key = self.state.get("cache_keys", {}).get(custom_id)
+                results.append(merge_line(text, lines[custom_id], cache_key, predictions[i]))
+            else:
+                results.append({"error": f"missing from batch output ({batch.status if batch else 'no batch'})"})
+        return results
+
+    def run(self, texts, input_path, wait=True, interval=30.0, timeout=None):
+        # Returns (results, batch) once the batch is terminal, or (None, batch) while it is still running.
+        # Results line up with self.texts: the resumed job's texts, which may differ from `texts`.
+        digest = inputs_digest(texts, self.model)
+        self.state = self.load_state(digest)
+        if self.state is None:
+            self.submit(texts, digest, input_path)
+        texts = self.texts = self.state.get("texts", texts)
+        self.model = self.state.get("model", self.model)
+        batch = None
+        if self.state["batch_id"]:
+            batch = self.poll(wait=wait, interval=interval, timeout=timeout)
+            if batch.status not in TERMINAL:
+                return None, batch
+        return self.merge(texts, batch), batch
+
+    def finish(self):
+        if os.path.exists(self.state_path):
+            os.remove(self.state_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reclassify the ticket history through the OpenAI Batch API.")
+    parser.add_argument("input", nargs="?", default=LOG_PATH,
+                        help="Classification log (JSONL) or a CSV with a 'message' column")
+    parser.add_argument("-o", "--output", default="batch_job_results.jsonl", help="JSONL file, one result per ticket")
+    parser.add_argument("--batch-input", default="batch_job_input.jsonl", help="Where to write the Batch API input file")
+    parser.add_argument("--state", default=STATE_PATH, help="Job state file used to resume")
+    parser.add_argument("--model", default="gpt-4o")
+    parser.add_argument("--base-url", default=None, help="Override the API base URL (e.g. fake_openai.py)")
+    parser.add_argument("--no-wait", action="store_true", help="Submit or check once and exit; rerun to resume")
+    parser.add_argument("--poll-interval", type=float, default=60.0)
+    parser.add_argument("--no-cache", action="store_true")
+    args = parser.parse_args(argv)
+
+    texts = read_inputs(args.input)
+    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), base_url=args.base_url, http_client=get_http_client())
+    # Repair round trips during the merge go to the same endpoint
+    llm_classifier.client = client
+    job = BatchJob(client, model=args.model, state_path=args.state, use_cache=not args.no_cache)
+    results, batch = job.run(texts, args.batch_input, wait=not args.no_wait, interval=args.poll_interval)
+    if job.texts != texts:
+        print(f"↩️  Resuming batch {job.state['batch_id']} for the {len(job.texts)} tickets it was submitted with; "
+              "newer tickets are picked up by the next job.")
+    texts = job.texts
+    pending = len(job.state["pending"])
+    if results is None:
+        print(f"⏳ Batch {batch.id} is {batch.status} ({pending} tickets); rerun to resume.")
+        return 0
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        for i, (text, result) in enumerate(zip(texts, results)):
+            f.write(json.dumps({"index": i, "input": text, "output": result}, ensure_ascii=False) + "\n")
+    job.finish()
+    failed = sum("error" in r for r in results)
+    status = batch.status if batch is not None else "not needed"
+    print(f"✅ {len(texts)} tickets ({len(texts) - pending} resolved locally, {pending} via batch: {status}) → {args.output}")
+    if failed:
+        print(f"⚠️  {failed} tickets failed; see the 'error' field in {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+from export_toggles import ToggleJob, run_jobs, run_pool, export_url
+from fake_export_admin import FakeExportAdmin, DEFAULT_SYNDICATORS
+
+# Bulk export toggles against the local fixture: a cold browser per job (what looping over
+# export_toggle_disable.py does) vs one browser with a pool of contexts, then the same jobs again to
+# show that dealers already in the target state are skipped without a save. --syndicators pads the
+# table so the per-element baseline (a Playwright call per row, cell and checkbox, as the scripts
+# used to do) can be compared with the single-evaluation plan on a realistically long page.
+
+
+def make_jobs(dealers, syndicator, action):
+    types = ("Usagé", "Neuf") if action == "enable" else ()
+    return [ToggleJob(dealer, syndicator, action, types) for dealer in dealers]
+
+
+async def cold(jobs, base_url):
+    results = []
+    for job in jobs:
+        results += await run_jobs([job], concurrency=1, storage_state=None, base_url=base_url, on_result=None)
+    return results
+
+
+async def toggle_per_element(page, job, base_url):
+    # The pre-plan implementation, kept here as the baseline
+    await page.goto(export_url(job.dealer_id, base_url))
+    await page.wait_for_selector("table")
+    target_row = None
+    for row in await page.query_selector_all("table tr"):
+        cells = await row.query_selector_all("td")
+        if len(cells) >= 2 and job.syndicator.lower() in (await cells[1].inner_text()).replace("✓", "").strip().lower():
+            target_row = row
+            break
+    if target_row is None:
+        return {"status": "not_found", "changed": 0}
+    changed = 0
+    for checkbox in await target_row.query_selector_all("input[type=checkbox]"):
+        want = job.wants_checked(await checkbox.get_attribute("name") or "")
+        if want is None or want == await checkbox.is_checked():
+            continue
+        await (checkbox.check() if want else checkbox.uncheck())
+        changed += 1
+    if not changed:
+        return {"status": "unchanged", "changed": 0}
+    async with page.expect_navigation():
+        await page.click("input[type=submit][value='Save']")
+    return {"status": "saved", "changed": changed}
+
+
+def summary(results):
+    counts = {}
+    for result in results:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time bulk export toggles: cold browser, per-element calls, one-evaluation plans.")
+    parser.add_argument("--dealers", type=int, default=40, help="Rooftops in the fake dealer group")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.05, help="Fixture server delay per request (s)")
+    parser.add_argument("--syndicator", default="AutoTrader")
+    parser.add_argument("--syndicators", type=int, default=60, help="Rows in each dealer's table")
+    parser.add_argument("--action", choices=("enable", "disable"), default="disable")
+    parser.add_argument("-o", "--output", default="bench_export_toggles.json", help="Where to write the timings")
+    args = parser.parse_args(argv)
+
+    dealers = [str(5000 + i) for i in range(args.dealers)]
+    # The target goes last so every row is scanned before it is found
+    padding = [f"Syndicator {i:03d}" for i in range(max(0, args.syndicators - len(DEFAULT_SYNDICATORS)))]
+    syndicators = padding + [s for s in DEFAULT_SYNDICATORS if s != args.syndicator] + [args.syndicator]
+    print(f"🧪 {args.action} {args.syndicator} on {args.dealers} dealers, {len(syndicators)} rows per table, "
+          f"{args.latency * 1000:.0f} ms per request")
+
+    runs = []
+
+    def timed(name, admin, runner):
+        jobs = make_jobs(dealers, args.syndicator, args.action)
+        started = time.perf_counter()
+        results = asyncio.run(runner(jobs, admin.url))
+        elapsed = time.perf_counter() - started
+        runs.append({"run": name, "seconds": round(elapsed, 2), "ms_per_dealer": round(elapsed / len(jobs) * 1000, 1),
+                     "statuses": summary(results), "saves": admin.saves})
+        print(f"{name:<22} {elapsed:>7.1f}s  {elapsed / len(jobs) * 1000:>6.0f} ms/dealer  {summary(results)}  "
+              f"saves so far: {admin.saves}")
+
+    def pooled(jobs, base_url):
+        return run_jobs(jobs, args.concurrency, storage_state=None, base_url=base_url, on_result=None)
+
+    def dry_run(jobs, base_url):
+        return run_jobs(jobs, args.concurrency, storage_state=None, base_url=base_url, on_result=None, dry_run=True)
+
+    def per_element(jobs, base_url):
+        async def handle(page, job):
+            return await toggle_per_element(page, job, base_url)
+        return run_pool(jobs, handle, args.concurrency, storage_state=None)
+
+    def admin():
+        # Same seed, so every run starts from identical checkbox states
+        return FakeExportAdmin(dealers=dealers, syndicators=syndicators, latency=args.latency, seed=1)
+
+    with admin() as server:
+        timed("cold browser per job", server, cold)
+    with admin() as server:
+        timed(f"per-element, pool {args.concurrency}", server, per_element)
+    with admin() as server:
+        timed("plan, dry run", server, dry_run)
+        timed(f"plan, pool {args.concurrency}", server, pooled)
+        timed("plan, second pass", server, pooled)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"config": vars(args), "runs": runs}, f, indent=2, ensure_ascii=False)
+    print(f"💾 Timings written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+import re
+import sys
+import time
+import argparse
+
+from batch_classifier import read_messages
+from dealer_index import get_dealer_index
+from syndicator_index import get_syndicator_index
+from ticket_features import extract_features
+
+# Compares the single-pass extractor with the original one-function-per-field preprocess_ticket
+# on long forwarded threads built from the example tickets, and checks both agree field by field.
+
+INPUTS = ["classifier_input_examples.csv", "Classifier_Complex_Input_Examples.csv"]
+COMPARED_FIELDS = ("contains_french", "contains_stock_number", "contacts_found", "dealers_found",
+                   "syndicators", "image_flags", "line_count")
+
+
+# The original one-function-per-field helpers from dealer_utils, kept here as the baseline
+def detect_language(text):
+    return "fr" if re.search(r"\b(merci|bonjour|véhicule|images|depuis)\b", text.lower()) else "en"
+
+
+def detect_stock_number(text):
+    return bool(re.search(r"\b[A-Z0-9]{6,}\b", text))
+
+
+def extract_contacts(text):
+    lines = text.strip().split('\n')
+    for i in range(len(lines) - 1):
+        line = lines[i].strip().lower()
+        if re.match(r'^(best regards|regards|merci|thanks|cordially|from:|envoyé par|de:)', line, re.IGNORECASE):
+            next_line = lines[i + 1].strip()
+            name_match = re.match(r'^[A-Z][a-z]+( [A-Z][a-z]+)+$', next_line)
+            if name_match:
+                return next_line
+    greet_match = re.search(r'^(hi|bonjour|hello|salut)[\s,:-]+([A-Z][a-z]+)', text.strip(), re.IGNORECASE | re.MULTILINE)
+    if greet_match:
+        candidate = greet_match.group(2)
+        if not re.match(r'^(nous|client|dealer|photos?|images?|request|inventory)$', candidate, re.IGNORECASE):
+            return candidate
+    match = re.search(r'\b([A-Z][a-z]+ [A-Z][a-z]+)\b', text)
+    if match and not re.match(r'^(nous|client|dealer|photos?|images?|request|inventory)$', match.group(1), re.IGNORECASE):
+        return match.group(1)
+    return ""
+
+
+def extract_dealers(text):
+    lines = text.split('\n')
+    extracted = []
+    for line in lines:
+        m = re.search(r"(Dealership Name|Dealer Name|Dealer)\s*[:\-]?\s*([A-Za-z0-9 &'\-]+)", line, re.IGNORECASE)
+        if m:
+            candidate = m.group(2).strip()
+            if candidate:
+                extracted.append(candidate.lower())
+    if not extracted:
+        dealer_matches = re.findall(
+            r"\b(?:mazda|toyota|honda|chevrolet|hyundai|genesis|ford|ram|gmc|acura|jeep"
+            r"|buick|nissan|volvo|subaru|volkswagen|kia|mitsubishi|infiniti|lexus"
+            r"|cadillac|dodge|mini|jaguar|land rover|bmw|mercedes|audi|porsche|tesla)"
+            r"[a-zé\-\s]*\b", text.lower()
+        )
+        INVALID_SUFFIXES = {"units", "inventory", "vehicles", "images", "stock"}
+        cleaned = []
+        for d in dealer_matches:
+            d_clean = d.strip()
+            parts = d_clean.split()
+            if parts and parts[-1] not in INVALID_SUFFIXES:
+                cleaned.append(d_clean)
+        extracted = list(set(cleaned))
+    return extracted
+
+
+def extract_syndicators(text):
+    return get_syndicator_index().extract(text)
+
+
+def extract_image_flags(text):
+    flags = []
+    lower = text.lower()
+    if "image" in lower:
+        flags.append("image")
+    if "certified" in lower:
+        flags.append("certified")
+    if "overwrite" in lower or "overwritten" in lower:
+        flags.append("overwritten")
+    return flags
+
+
+def legacy_preprocess(text):
+    return {
+        "message": text,
+        "contains_french": detect_language(text) == "fr",
+        "contains_stock_number": detect_stock_number(text),
+        "contacts_found": [extract_contacts(text)],
+        "dealers_found": extract_dealers(text),
+        "syndicators": extract_syndicators(text),
+        "image_flags": extract_image_flags(text),
+        "line_count": text.count("\n") + 1,
+    }
+
+
+def build_thread(messages, replies):
+    # Newest reply first, each older message quoted below it like a mail client forward
+    parts = []
+    for i in range(replies):
+        parts.append(messages[i % len(messages)])
+        parts.append("\n-----Original Message-----\nFrom: support@d2cmedia.ca\n")
+    return "\n".join(parts)
+
+
+def best_of(fn, text, runs):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn(text)
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings)
+
+
+def mismatches(text):
+    old, new = legacy_preprocess(text), extract_features(text)
+    diffs = []
+    for name in COMPARED_FIELDS:
+        a, b = old[name], getattr(new, name)
+        if name == "dealers_found":
+            a, b = sorted(a), sorted(b)
+        if a != b:
+            diffs.append(f"{name}: {a!r} != {b!r}")
+    return diffs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark preprocess_ticket feature extraction.")
+    parser.add_argument("--sizes", type=int, nargs="*", default=[1, 10, 50, 200], help="Messages per thread")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    messages = [m for path in INPUTS for m in read_messages(path)]
+    failed = False
+    for message in messages:
+        for diff in mismatches(message):
+            failed = True
+            print(f"❌ {message[:40]!r}… {diff}")
+
+    extract_features(messages[0])  # warm-up: builds the syndicator and dealer automatons
+    print(f"{'messages':>8} {'chars':>8} {'legacy ms':>10} {'single-pass ms':>15} {'speed-up':>9}")
+    for size in args.sizes:
+        thread = build_thread(messages, size)
+        for diff in mismatches(thread):
+            failed = True
+            print(f"❌ thread of {size}: {diff}")
+        legacy = best_of(legacy_preprocess, thread, args.runs)
+        # Legacy callers also re-scanned the thread for dealer mentions and e-mail addresses later on
+        legacy += best_of(get_dealer_index().scan, thread, args.runs)
+        single = best_of(extract_features, thread, args.runs)
+        print(f"{size:>8} {len(thread):>8} {legacy:>10.2f} {single:>15.2f} {legacy / single:>8.1f}x")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
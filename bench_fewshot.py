@@ -0,0 +1,67 @@
+import sys
+import time
+import argparse
+
+from fake_openai import estimate_tokens
+from email_thread import prepare_thread
+from fewshot_index import FewShotIndex, EXAMPLE_SUITES, read_suite, clean_fields
+from prompt_templates import FEWSHOT_SEEDS, example_messages
+
+# Retrieved few-shot examples vs the three fixed ones every ticket used to carry: example tokens per
+# prompt, retrieval time per ticket, how often nothing was similar enough (the seeds are sent instead),
+# and how often an example shares the ticket's expected category / sub-category (a proxy for how useful
+# it is to the model). A ticket never retrieves itself.
+
+
+def example_tokens(examples):
+    return sum(estimate_tokens(m["content"]) for m in example_messages(examples))
+
+
+def shares_label(fields, examples, keys=("category", "sub_category")):
+    return any(all(fields[k] and fields[k] == example[k] for k in keys) for _, example in examples)
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare retrieved few-shot examples with the fixed three.")
+    parser.add_argument("-k", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=200, help="Retrievals per ticket for the timing")
+    args = parser.parse_args(argv)
+
+    index = FewShotIndex()
+    tickets = [(message, clean_fields(fields)) for suite in EXAMPLE_SUITES for message, fields in read_suite(*suite)]
+    print(f"🧪 {len(tickets)} labelled tickets, {len(index)} examples in the pool, k={args.k}")
+
+    fixed = list(FEWSHOT_SEEDS)
+    rows = {"fixed three": [], "retrieved": []}
+    fallbacks = 0
+    timings = []
+    for text, fields in tickets:
+        message = prepare_thread(text)[0]
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            retrieved = [(m, f) for _, m, f in index.search(message, args.k)]
+            timings.append((time.perf_counter() - started) * 1000)
+        if not retrieved:
+            fallbacks += 1
+            retrieved = fixed[:args.k]
+        rows["fixed three"].append((example_tokens(fixed), len(fixed), shares_label(fields, fixed)))
+        rows["retrieved"].append((example_tokens(retrieved), len(retrieved), shares_label(fields, retrieved)))
+
+    print(f"{'examples':<12} {'tokens/prompt':>14} {'examples/prompt':>16} {'same category+sub':>18}")
+    for name, values in rows.items():
+        n = len(values)
+        print(f"{name:<12} {sum(v[0] for v in values) / n:>14.0f} {sum(v[1] for v in values) / n:>16.1f} "
+              f"{sum(v[2] for v in values) / n:>17.0%}")
+    print(f"🌱 {fallbacks} of {len(tickets)} tickets fell back to the seeds")
+    print(f"⏱️  retrieval: p50 {percentile(timings, 0.5):.3f} ms  p95 {percentile(timings, 0.95):.3f} ms  "
+          f"max {max(timings):.3f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
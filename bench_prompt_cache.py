@@ -0,0 +1,84 @@
+import os
+import sys
+import argparse
+
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+
+from batch_classifier import read_messages
+from email_thread import prepare_thread
+from fake_openai import FakeOpenAIServer, estimate_tokens
+from prompt_templates import SYSTEM_PROMPT, OUTPUT_CONTRACT, build_messages
+
+# How much of each request the provider's prompt cache can reuse: the old layout put per-ticket dealer
+# candidates and hints *before* the static instructions, the template keeps them after.
+
+INPUTS = ["classifier_input_examples.csv", "Classifier_Complex_Input_Examples.csv"]
+
+
+def legacy_messages(text, context, history=()):
+    # Pre-template layout: dealer candidates prepended to the system prompt, the output contract in the
+    # user turn after the ticket, hints before it
+    system = SYSTEM_PROMPT.split("\nReturn a JSON object exactly as follows", 1)[0]
+    system += "\nNow classify the following message and return ONLY the JSON object as exactly specified:"
+    if context.dealers_found:
+        system = f"Detected dealer candidates: {', '.join(context.dealers_found)}\n\n" + system
+    user = f"\nMessage:\n{text}\n\nReturn a JSON object exactly as follows:\n{OUTPUT_CONTRACT}"
+    if context.contains_stock_number:
+        user = "[Contains stock number]\n" + user
+    if context.image_flags:
+        user = "[Contains image/photo keywords]\n" + user
+    return [{"role": "system", "content": system}, {"role": "user", "content": user}]
+
+
+def flatten(messages):
+    return "".join(f"<{m['role']}>{m['content']}" for m in messages)
+
+
+def common_prefix(a, b):
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+def measure(builder, tickets, cache_min_tokens):
+    server = FakeOpenAIServer(cache_min_tokens=cache_min_tokens)
+    try:
+        shared, prompt, cached = 0, 0, 0
+        previous = None
+        for text in tickets:
+            message, context, history = prepare_thread(text)
+            messages = builder(message, context, history)
+            flat = flatten(messages)
+            if previous is not None:
+                shared += estimate_tokens(flat[:common_prefix(previous, flat)])
+            previous = flat
+            prompt += sum(estimate_tokens(m["content"]) for m in messages)
+            cached += server.cached_prefix_tokens(messages)
+    finally:
+        server._httpd.server_close()
+    return {"shared": shared / max(1, len(tickets) - 1), "prompt": prompt / len(tickets), "cached": cached / prompt}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare prompt-cache reuse for the old and templated prompt layouts.")
+    parser.add_argument("--cache-min-tokens", type=int, default=1024,
+                        help="Shortest prefix the provider caches (OpenAI: 1024 tokens)")
+    args = parser.parse_args(argv)
+
+    tickets = [m for path in INPUTS for m in read_messages(path)]
+    static = estimate_tokens(SYSTEM_PROMPT)
+    print(f"🧪 {len(tickets)} tickets, static prefix ≈ {static} tokens, provider minimum {args.cache_min_tokens}")
+    if static < args.cache_min_tokens:
+        print(f"⚠️  The static prefix is below the provider minimum: nothing is cached until it grows past "
+              f"{args.cache_min_tokens} tokens (try --cache-min-tokens {static // 128 * 128 or 128} to see the layout effect)")
+    print(f"{'layout':<10} {'avg prompt':>11} {'shared prefix w/ previous':>26} {'cached share':>13}")
+    for name, builder in (("legacy", legacy_messages), ("template", build_messages)):
+        r = measure(builder, tickets, args.cache_min_tokens)
+        print(f"{name:<10} {r['prompt']:>11.0f} {r['shared']:>26.0f} {r['cached']:>12.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
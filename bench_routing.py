@@ -0,0 +1,107 @@
+import os
+import sys
+import time
+import random
+import argparse
+
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+
+import llm_classifier
+import model_router
+from email_thread import prepare_thread
+from classification_log import get_logger
+from fake_openai import FakeOpenAIServer, BLANK_FIELDS
+from fewshot_index import EXAMPLE_SUITES, read_suite, clean_fields
+from model_router import RouteStats, format_routes
+
+# Cheap-model-first routing against the requested model alone, on the labelled example tickets and the
+# local fake API. The large fake model answers with the expected labels; the cheap one gets a share of
+# its answers wrong (blank category, a syndicator the ticket never names, or a different sub-category),
+# picked up front from a seeded generator so exactly that share of its calls is wrong, and answers faster. Reports how often the route escalates, the final accuracy, and cost/latency per route.
+
+LARGE = "gpt-4o"
+CHEAP = "gpt-4o-mini"
+CHECKED = ("category", "sub_category", "syndicator")
+
+
+def make_responder(tickets, error_rate, cheap_ms, large_ms, calls, seed=0):
+    # The cheap model is asked once per ticket, so its n-th call is the n-th ticket (repeats included)
+    rng = random.Random(seed)
+    wrong = {call: rng.randrange(3) for call in rng.sample(range(calls), round(calls * error_rate))}
+    planted = {"answers": 0, "wrong": 0}
+
+    def responder(messages, model):
+        prompt = messages[-1]["content"]
+        fields = next((f for message, f in tickets if message in prompt), BLANK_FIELDS)
+        answer = dict(fields)
+        if model == CHEAP:
+            time.sleep(cheap_ms / 1000)
+            kind = wrong.get(planted["answers"])
+            planted["answers"] += 1
+            if kind is not None:
+                planted["wrong"] += 1
+                if kind == 0:
+                    answer["category"] = ""
+                elif kind == 1:
+                    answer["syndicator"] = "Unknown Feed"
+                else:
+                    answer["sub_category"] = "Other" if answer["sub_category"] != "Other" else "Export"
+        else:
+            time.sleep(large_ms / 1000)
+        return {"zoho_fields": answer, "zoho_comment": "", "suggested_reply": ""}
+    return responder, planted
+
+
+def run(texts, expected, first):
+    model_router.ROUTE_FIRST = first
+    stats = RouteStats()
+    correct = failures = 0
+    started = time.perf_counter()
+    for text, fields in zip(texts, expected):
+        result = llm_classifier.classify_ticket(text, model=LARGE, use_cache=False, rule_threshold=None)
+        if "error" in result:
+            failures += 1
+            continue
+        stats.add(result["route"], result["usage"])
+        zf = result["zoho_fields"]
+        correct += all(zf.get(f, "") == fields[f] for f in CHECKED)
+    return stats.summary(), correct, failures, time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare cheap-model-first routing with the large model alone.")
+    parser.add_argument("--cheap-error-rate", type=float, default=0.2, help="Share of tickets the cheap model gets wrong")
+    parser.add_argument("--cheap-ms", type=float, default=20, help="Fake latency of the cheap model")
+    parser.add_argument("--large-ms", type=float, default=60, help="Fake latency of the large model")
+    parser.add_argument("--repeat", type=int, default=10, help="Passes over the example tickets")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for which cheap answers are wrong")
+    args = parser.parse_args(argv)
+
+    get_logger().setLevel("CRITICAL")
+    labelled = [(text, clean_fields(fields)) for suite in EXAMPLE_SUITES for text, fields in read_suite(*suite)]
+    tickets = [(prepare_thread(text)[0], fields) for text, fields in labelled]
+    texts = [text for text, _ in labelled] * args.repeat
+    expected = [fields for _, fields in labelled] * args.repeat
+    print(f"🧪 {len(texts)} tickets, cheap model wrong on ~{args.cheap_error_rate:.0%}, "
+          f"fake latency {args.cheap_ms:.0f} ms / {args.large_ms:.0f} ms")
+
+    responder, planted = make_responder(tickets, args.cheap_error_rate, args.cheap_ms, args.large_ms, len(texts),
+                                        args.seed)
+    with FakeOpenAIServer(responder) as server:
+        from openai import OpenAI
+        llm_classifier.client = OpenAI(base_url=server.url, api_key="fake", max_retries=0)
+        for name, first in ((f"{LARGE} only", ()), (f"{CHEAP} first", (CHEAP,))):
+            routes, correct, failures, elapsed = run(texts, expected, first)
+            answered = len(texts) - failures
+            escalated = sum(r["tickets"] for key, r in routes.items() if " → " in key)
+            print(f"\n{name}: {correct / answered:.0%} of tickets with {'/'.join(CHECKED)} right, "
+                  f"{escalated / answered:.0%} escalated, {elapsed * 1000 / answered:.0f} ms/ticket, {failures} failed")
+            for line in format_routes(routes):
+                print(line)
+        print(f"\n🎯 {planted['wrong']} of {planted['answers']} cheap answers were planted wrong "
+              f"({planted['wrong'] / max(1, planted['answers']):.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+import sys
+import argparse
+import subprocess
+
+# Start-up regression check: `python bench_startup.py` exits non-zero when importing the CLI
+# entry point gets slower than the budget or drags a heavy dependency back in at import time.
+
+DEFAULT_MODULES = ["cli_runner", "llm_classifier"]
+HEAVY_MODULES = {"pandas", "numpy", "openai", "nltk", "streamlit", "requests"}
+
+
+def measure_import(module):
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    total_us, imported = 0, set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue
+        imported.add(name.strip().split(".")[0])
+        if name.strip() == module:
+            total_us = int(cumulative)
+    return total_us / 1000.0, imported
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fail if module import time exceeds a budget.")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--budget-ms", type=float, default=150.0)
+    parser.add_argument("--runs", type=int, default=5, help="Best-of-N to smooth out noise")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for module in args.modules:
+        measure_import(module)  # warm-up: byte-compiles and builds .artifacts/ pickles
+        timings, heavy = [], set()
+        for _ in range(args.runs):
+            elapsed, imported = measure_import(module)
+            timings.append(elapsed)
+            heavy |= imported & HEAVY_MODULES
+        best = min(timings)
+        ok = best <= args.budget_ms and not heavy
+        failed |= not ok
+        status = "✅" if ok else "❌"
+        print(f"{status} import {module}: {best:.1f} ms (budget {args.budget_ms:.0f} ms)")
+        if heavy:
+            print(f"   heavy modules imported eagerly: {', '.join(sorted(heavy))}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
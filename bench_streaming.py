@@ -0,0 +1,77 @@
+import os
+import sys
+import json
+import time
+import argparse
+
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+
+import llm_classifier
+from batch_classifier import read_messages
+from fake_openai import FakeOpenAIServer
+
+# Time-to-first-useful-field for classify_ticket (blocking) vs classify_ticket_stream against the
+# local fake API, with a model delay before the first token and a delay between streamed chunks.
+
+INPUTS = ["classifier_input_examples.csv", "Classifier_Complex_Input_Examples.csv"]
+
+
+def filled_responder(messages, model):
+    # A complete answer so every field shows up in the stream
+    return json.dumps({
+        "zoho_fields": {
+            "contact": "Sophie", "dealer_name": "Chomedey Toyota", "dealer_id": "", "rep": "",
+            "category": "Problem / Bug", "sub_category": "Export", "syndicator": "vAuto",
+            "inventory_type": "Used",
+        },
+        "zoho_comment": "",
+        "suggested_reply": "",
+    })
+
+
+def run_blocking(text):
+    started = time.perf_counter()
+    llm_classifier.classify_ticket(text, use_cache=False, rule_threshold=None)
+    elapsed = (time.perf_counter() - started) * 1000
+    return elapsed, elapsed, elapsed
+
+
+def run_streaming(text):
+    started = time.perf_counter()
+    first = first_llm = None
+    for event in llm_classifier.classify_ticket_stream(text, use_cache=False, rule_threshold=None):
+        now = (time.perf_counter() - started) * 1000
+        if event["event"] == "field" and event["value"]:
+            first = now if first is None else first
+            if event["source"] == "llm" and first_llm is None:
+                first_llm = now
+    total = (time.perf_counter() - started) * 1000
+    return first if first is not None else total, first_llm if first_llm is not None else total, total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare blocking and streaming time-to-first-field.")
+    parser.add_argument("--latency", type=float, default=0.8, help="Model delay before the first token (s)")
+    parser.add_argument("--chunk-delay", type=float, default=0.02, help="Delay between streamed chunks (s)")
+    args = parser.parse_args(argv)
+
+    with FakeOpenAIServer(filled_responder, latency=args.latency, chunk_delay=args.chunk_delay) as server:
+        from openai import OpenAI
+        llm_classifier.client = OpenAI(base_url=server.url, api_key="fake", max_retries=0)
+        texts = [m for path in INPUTS for m in read_messages(path)]
+        results = {"blocking": [], "streaming": []}
+        for text in texts:
+            results["blocking"].append(run_blocking(text))
+            results["streaming"].append(run_streaming(text))
+
+    print(f"🧪 {len(texts)} tickets, {args.latency * 1000:.0f} ms to first token, "
+          f"{args.chunk_delay * 1000:.0f} ms between chunks")
+    print(f"{'mode':<10} {'first field':>12} {'first LLM field':>16} {'complete':>10}   (median ms)")
+    for mode, rows in results.items():
+        medians = [sorted(col)[len(col) // 2] for col in zip(*rows)]
+        print(f"{mode:<10} {medians[0]:>12.1f} {medians[1]:>16.1f} {medians[2]:>10.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
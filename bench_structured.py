@@ -0,0 +1,71 @@
+import os
+import sys
+import argparse
+
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+
+import llm_classifier
+from batch_classifier import read_messages
+from classification_log import get_logger
+from fake_openai import FakeOpenAIServer
+
+# Free-form JSON replies vs strict structured outputs against the local fake API: how many replies
+# needed a repair round trip, how many tickets still failed, and how many tokens the model wrote.
+
+INPUTS = ["classifier_input_examples.csv", "Classifier_Complex_Input_Examples.csv"]
+
+
+def filled_responder(messages, model):
+    return {
+        "zoho_fields": {
+            "contact": "Sophie", "dealer_name": "Chomedey Toyota", "dealer_id": "", "rep": "",
+            "category": "Problem / Bug", "sub_category": "Export", "syndicator": "vAuto",
+            "inventory_type": "Used",
+        },
+        "zoho_comment": "Export to vAuto is missing used vehicles since yesterday's update.",
+        "suggested_reply": "Hi Sophie, thanks for letting us know, we're looking into the vAuto export now.",
+    }
+
+
+def run(texts, structured, repair_retries, malformed_rate, seed):
+    llm_classifier.STRUCTURED_OUTPUT = structured
+    llm_classifier.REPAIR_RETRIES = repair_retries
+    totals = {"tickets": len(texts), "failures": 0, "repairs": 0, "prompt_tokens": 0, "completion_tokens": 0,
+              "repair_tokens": 0}
+    with FakeOpenAIServer(filled_responder, malformed_rate=malformed_rate, seed=seed) as server:
+        from openai import OpenAI
+        llm_classifier.client = OpenAI(base_url=server.url, api_key="fake", max_retries=0)
+        for text in texts:
+            result = llm_classifier.classify_ticket(text, use_cache=False, rule_threshold=None)
+            if "error" in result:
+                totals["failures"] += 1
+                continue
+            for key in ("repairs", "prompt_tokens", "completion_tokens", "repair_tokens"):
+                totals[key] += result["usage"].get(key, 0)
+    return totals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare free-form and structured-output replies.")
+    parser.add_argument("--malformed-rate", type=float, default=0.05,
+                        help="Share of free-form replies the fake model sends broken")
+    parser.add_argument("--repeat", type=int, default=20, help="Passes over the example tickets")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    get_logger().setLevel("CRITICAL")  # one warning/error line per broken reply otherwise
+    texts = [m for path in INPUTS for m in read_messages(path)] * args.repeat
+    print(f"🧪 {len(texts)} tickets, {args.malformed_rate:.0%} of free-form replies malformed")
+    print(f"{'mode':<22} {'failures':>9} {'repairs':>8} {'prompt tok':>11} {'output tok':>11} {'repair tok':>11}"
+          "   (per ticket)")
+    for name, structured, retries in (("free-form, no repair", False, 0), ("free-form + repair", False, 1),
+                                      ("structured + repair", True, 1)):
+        r = run(texts, structured, retries, args.malformed_rate, args.seed)
+        n = max(1, r["tickets"] - r["failures"])
+        print(f"{name:<22} {r['failures']:>9} {r['repairs']:>8} {r['prompt_tokens'] / n:>11.0f} "
+              f"{r['completion_tokens'] / n:>11.0f} {r['repair_tokens'] / n:>11.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+import os
+import sys
+import time
+import tempfile
+import argparse
+
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+
+from fake_openai import FakeOpenAIServer
+from feedback_queue import FeedbackQueue
+from http_transport import get_http_client, http2_available
+
+# Connections opened and per-call latency for a fresh client per call vs the shared pool, and how long
+# the UI waits for a feedback submission (blocking POST vs the background queue). The fake is plain
+# HTTP on loopback, so the TLS handshakes the pool saves in production are not even counted here.
+
+MESSAGES = [{"role": "user", "content": "Message:\nThe Mazda Steele feed to AutoTrader stopped updating."}]
+
+
+def timed_calls(server, calls, make_client):
+    from openai import OpenAI
+    before = server.connections
+    started = time.perf_counter()
+    for _ in range(calls):
+        client = OpenAI(base_url=server.url, api_key="fake", max_retries=0, http_client=make_client())
+        client.chat.completions.create(model="gpt-4o", messages=MESSAGES)
+    return (time.perf_counter() - started) * 1000 / calls, server.connections - before
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare per-call clients with the shared HTTP pool.")
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.2, help="Server delay for the feedback comparison (s)")
+    args = parser.parse_args(argv)
+
+    import openai
+    with FakeOpenAIServer() as server:
+        print(f"🧪 {args.calls} sequential calls, HTTP/2 {'available' if http2_available() else 'unavailable (pip install h2)'}")
+        print(f"{'client':<22} {'ms/call':>8} {'connections':>12}")
+        for name, make_client in (("new client per call", openai.DefaultHttpxClient), ("shared pool", get_http_client)):
+            ms, connections = timed_calls(server, args.calls, make_client)
+            print(f"{name:<22} {ms:>8.2f} {connections:>12}")
+
+    with FakeOpenAIServer(latency=args.latency) as server:
+        url = server.url + "/chat/completions"
+        started = time.perf_counter()
+        get_http_client().post(url, json={"messages": MESSAGES})
+        blocking = (time.perf_counter() - started) * 1000
+        spool = os.path.join(tempfile.mkdtemp(), "feedback_spool.jsonl")
+        feedback = FeedbackQueue(url=url, spool_path=spool,
+                                 post=lambda payload: get_http_client().post(url, json={"messages": MESSAGES}).status_code)
+        started = time.perf_counter()
+        feedback.submit({"entry.1": "bench"})
+        queued = (time.perf_counter() - started) * 1000
+        feedback.flush(timeout=10)
+        feedback.close()
+        os.remove(spool)
+        print(f"📝 feedback: blocking POST {blocking:.1f} ms, queued submit {queued:.2f} ms "
+              f"(delivered in the background: {feedback.sent} sent, {feedback.pending} spooled)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,328 @@
+import os
+import sys
+import csv
+import json
+import time
+import types
+import hashlib
+import argparse
+
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+
+import llm_classifier
+from fake_openai import BLANK_FIELDS, estimate_tokens
+from result_cache import normalize_ticket_text
+from prompt_templates import ticket_text
+from syndicator_index import squash
+from fewshot_index import FIELD_COLUMNS, labels_match
+from email_thread import prepare_thread
+from rule_classifier import classify_with_rules, RULE_CONFIDENCE_THRESHOLD
+
+# (suite name, input CSV, expected-output CSV); rows are paired by position
+SUITES = [
+    ("basic", "classifier_input_examples.csv", "classifier_expected_output.csv"),
+    ("complex", "Classifier_Complex_Input_Examples.csv", "Classifier_Complex_Expected_Output.csv"),
+]
+
+# Rule-tier regressions: (ticket, expected category, whether the rules may answer it without the LLM)
+RULE_CASES = [
+    ("Please cancel the Cargurus export for Steele Mazda, they closed the account.", "Product Cancellation", True),
+    ("Please remove sold units, they still show on the feed for Steele Mazda.", "Problem / Bug", False),
+    ("Bonjour, pouvez-vous désactiver l'exportation vers Kijiji pour Steele Mazda?", "Product Cancellation", True),
+    ("The AutoTrader feed is missing used units since Monday, please remove the duplicates.", "Problem / Bug", False),
+]
+
+STAGES = ("preprocess", "llm", "post_matching", "comment", "total")
+RECORDINGS_PATH = "benchmark_recordings.json"
+LOG_PATH = "ticket_classifier_log.jsonl"
+
+
+def recording_key(text):
+    return hashlib.sha256(normalize_ticket_text(text).encode("utf-8")).hexdigest()
+
+
+def _user_message(messages):
+    # The ticket is the last user turn; earlier ones are retrieved few-shot examples
+    return ticket_text(next((m["content"] for m in reversed(messages) if m["role"] == "user"), ""))
+
+
+def load_recordings(path=RECORDINGS_PATH, log_path=LOG_PATH):
+    recordings = {}
+    # Past production answers in the classification log double as recordings
+    if os.path.exists(log_path):
+        with open(log_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                output = entry.get("output")
+                if isinstance(output, dict) and "zoho_fields" in output:
+                    recordings[recording_key(entry.get("input", ""))] = json.dumps(output, ensure_ascii=False)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            recordings.update(json.load(f))
+    return recordings
+
+
+def recording_responder(recordings):
+    # Calls the real API once per ticket and keeps the raw answer for later offline replays
+    client = llm_classifier.get_client()
+
+    def respond(messages, model):
+        key = recording_key(_user_message(messages))
+        if key not in recordings:
+            resp = client.chat.completions.create(
+                model=model, messages=messages, temperature=0.2, **llm_classifier.response_options()
+            )
+            recordings[key] = resp.choices[0].message.content.strip()
+        return recordings[key]
+    return respond
+
+
+def blank_responder(messages, model):
+    return json.dumps({"zoho_fields": dict(BLANK_FIELDS), "zoho_comment": "", "suggested_reply": ""})
+
+
+def recorded_responder(recordings):
+    def respond(messages, model):
+        return recordings.get(recording_key(_user_message(messages))) or blank_responder(messages, model)
+    return respond
+
+
+class StubClient:
+    def __init__(self, responder, latency=0.0):
+        self.responder = responder
+        self.latency = latency
+        self.chat = types.SimpleNamespace(completions=self)
+
+    def create(self, model, messages, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        content = self.responder(messages, model)
+        prompt_tokens = sum(estimate_tokens(m["content"]) for m in messages)
+        completion_tokens = estimate_tokens(content)
+        usage = types.SimpleNamespace(
+            prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+            total_tokens=prompt_tokens + completion_tokens,
+        )
+        message = types.SimpleNamespace(content=content)
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)], usage=usage)
+
+
+class StageTimer:
+    # Wraps llm_classifier's module-level callables so each stage is timed without touching the pipeline
+    def __init__(self):
+        self.current = {}
+
+    def wrap(self, stage, fn):
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.current[stage] = self.current.get(stage, 0.0) + (time.perf_counter() - started) * 1000
+        return timed
+
+    def install(self, client):
+        client.create = self.wrap("llm", client.create)
+        llm_classifier.client = client
+        llm_classifier.prepare_thread = self.wrap("preprocess", llm_classifier.prepare_thread)
+        llm_classifier.format_zoho_comment = self.wrap("comment", llm_classifier.format_zoho_comment)
+        llm_classifier.finalize_result = self.wrap("post_matching", llm_classifier.finalize_result)
+
+    def run(self, fn, *args, **kwargs):
+        self.current = {}
+        started = time.perf_counter()
+        result = fn(*args, **kwargs)
+        timings = dict(self.current)
+        timings["total"] = (time.perf_counter() - started) * 1000
+        # finalize_result includes format_zoho_comment; report matching on its own
+        timings["post_matching"] = timings.get("post_matching", 0.0) - timings.get("comment", 0.0)
+        return result, {stage: timings.get(stage, 0.0) for stage in STAGES}
+
+
+def normalize_value(field, value):
+    value = " ".join(str(value or "").split()).casefold()
+    if field == "dealer_name":
+        value = value.replace(" (group suggestion)", "")
+    if field == "syndicator":
+        # "Car Media" in the expected CSVs and "CarMedia" in the reference are the same syndicator
+        value = ", ".join(squash(part) for part in value.split(","))
+    if field == "inventory_type" and value == "both":
+        value = "new + used"
+    return value
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return round(ordered[rank], 3)
+
+
+def read_rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def run_suite(name, input_path, expected_path, timer, repeat, rule_threshold):
+    inputs = [row.get("message") or next(iter(row.values()), "") for row in read_rows(input_path)]
+    expected = read_rows(expected_path)
+    # Rows are paired by position; a sheet that is out of step would grade tickets against someone else's
+    # labels, so the suite is then timed but not scored (same guard as fewshot_index.read_suite)
+    unscored = None
+    if len(inputs) != len(expected):
+        unscored = f"{len(inputs)} inputs vs {len(expected)} expected rows"
+    else:
+        stray = [i for i, (text, row) in enumerate(zip(inputs, expected))
+                 if not labels_match(text, {field: row.get(column, "") for column, field in FIELD_COLUMNS.items()})]
+        if stray:
+            unscored = f"rows {', '.join(map(str, stray))} name neither their expected dealer nor syndicator"
+    if unscored:
+        print(f"⚠️  {name}: {unscored}; not scored until the sheets line up", file=sys.stderr)
+    pairs = [(text, {}) for text in inputs] if unscored else list(zip(inputs, expected))
+    correct = {field: 0 for field in FIELD_COLUMNS.values()}
+    latencies = {stage: [] for stage in STAGES}
+    tiers = {}
+    mismatches = []
+
+    for round_ in range(repeat):
+        for i, (text, want) in enumerate(pairs):
+            kwargs = {"use_cache": False}
+            if rule_threshold is not None:
+                kwargs["rule_threshold"] = None if rule_threshold < 0 else rule_threshold
+            result, timings = timer.run(llm_classifier.classify_ticket, text, **kwargs)
+            for stage, ms in timings.items():
+                latencies[stage].append(ms)
+            if round_ or unscored:
+                continue
+            tiers[result.get("tier", "")] = tiers.get(result.get("tier", ""), 0) + 1
+            got = result.get("zoho_fields", {})
+            for column, field in FIELD_COLUMNS.items():
+                if normalize_value(field, got.get(field)) == normalize_value(field, want.get(column)):
+                    correct[field] += 1
+                else:
+                    mismatches.append({"row": i, "field": field, "expected": want.get(column, ""), "got": got.get(field, "")})
+
+    n = len(pairs)
+    return {
+        "n": n,
+        "unscored": unscored,
+        "accuracy": {} if unscored else {field: round(hits / n, 4) if n else 0.0 for field, hits in correct.items()},
+        "latency_ms": {
+            stage: {"p50": percentile(v, 50), "p95": percentile(v, 95), "p99": percentile(v, 99)}
+            for stage, v in latencies.items()
+        },
+        "tiers": tiers,
+        "mismatches": mismatches,
+    }
+
+
+def check_rule_cases(cases=RULE_CASES):
+    failures = []
+    for text, category, confident in cases:
+        message, context, _ = prepare_thread(text)
+        fields, confidence = classify_with_rules(message, context)
+        sure = confidence.get("category", 0.0) >= RULE_CONFIDENCE_THRESHOLD
+        if fields["category"] != category or sure != confident:
+            failures.append(f"rules: {text[:50]!r}… → {fields['category'] or 'blank'} "
+                            f"({confidence.get('category', 0.0):.2f}), expected {category}"
+                            f"{'' if confident else ' below the threshold'}")
+    return failures
+
+
+def compare(results, baseline, max_accuracy_drop, max_latency_regression):
+    failures = []
+    for suite, current in results["suites"].items():
+        previous = baseline.get("suites", {}).get(suite)
+        if not previous:
+            continue
+        for field, acc in current["accuracy"].items():
+            before = previous["accuracy"].get(field)
+            if before is not None and acc < before - max_accuracy_drop:
+                failures.append(f"{suite}.{field} accuracy {before:.2%} → {acc:.2%}")
+        before = previous["latency_ms"]["total"]["p95"]
+        after = current["latency_ms"]["total"]["p95"]
+        if before and after > before * (1 + max_latency_regression):
+            failures.append(f"{suite} total p95 {before:.1f} ms → {after:.1f} ms")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline accuracy + latency benchmark for classify_ticket.")
+    parser.add_argument("-o", "--output", default="benchmark_results.json")
+    parser.add_argument("--responder", choices=("recorded", "blank"), default="recorded",
+                        help="recorded: replay benchmark_recordings.json + the classification log; blank: empty LLM answers")
+    parser.add_argument("--record", action="store_true",
+                        help=f"Call the real API for tickets without a recording and save answers to {RECORDINGS_PATH}")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Simulated model latency in seconds")
+    parser.add_argument("--repeat", type=int, default=20, help="Replays per ticket for latency percentiles")
+    parser.add_argument("--rule-threshold", type=float, default=None,
+                        help="Override the rule tier threshold (negative disables the rule tier)")
+    parser.add_argument("--baseline", help="Previous results JSON to compare against")
+    parser.add_argument("--max-accuracy-drop", type=float, default=0.0)
+    parser.add_argument("--max-latency-regression", type=float, default=0.5, help="Allowed p95 growth, 0.5 = +50%%")
+    args = parser.parse_args(argv)
+
+    if args.record:
+        recordings = {}
+        if os.path.exists(RECORDINGS_PATH):
+            with open(RECORDINGS_PATH, encoding="utf-8") as f:
+                recordings = json.load(f)
+        responder = recording_responder(recordings)
+    elif args.responder == "recorded":
+        responder = recorded_responder(load_recordings())
+    else:
+        responder = blank_responder
+    timer = StageTimer()
+    timer.install(StubClient(responder, latency=0.0 if args.record else args.llm_latency))
+
+    results = {
+        "config": {
+            "responder": args.responder, "llm_latency": args.llm_latency, "repeat": args.repeat,
+            "rule_threshold": args.rule_threshold, "prompt": llm_classifier.PROMPT_FINGERPRINT,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "suites": {},
+    }
+    # Warm-up: build the lazily compiled dealer automaton / trigram index outside the measurements
+    llm_classifier.classify_ticket("warm-up ticket for Steele Mazda", use_cache=False)
+    results["rule_cases"] = check_rule_cases()
+    for name, input_path, expected_path in SUITES:
+        results["suites"][name] = run_suite(name, input_path, expected_path, timer, args.repeat, args.rule_threshold)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    if args.record:
+        with open(RECORDINGS_PATH, "w", encoding="utf-8") as f:
+            json.dump(recordings, f, indent=2, ensure_ascii=False)
+
+    for name, suite in results["suites"].items():
+        print(f"📊 {name} ({suite['n']} tickets, tiers {suite['tiers']})")
+        if suite["unscored"]:
+            print(f"   accuracy not scored: {suite['unscored']}")
+        for field, acc in suite["accuracy"].items():
+            print(f"   {field:<15}: {acc:.0%}")
+        for stage, pcts in suite["latency_ms"].items():
+            print(f"   {stage:<15}: p50 {pcts['p50']:.2f} ms  p95 {pcts['p95']:.2f} ms  p99 {pcts['p99']:.2f} ms")
+    print(f"📏 rule cases: {len(RULE_CASES) - len(results['rule_cases'])}/{len(RULE_CASES)} pass")
+    for failure in results["rule_cases"]:
+        print(f"❌ {failure}")
+    print(f"💾 Results written to {args.output}")
+    if results["rule_cases"]:
+        return 1
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            failures = compare(results, json.load(f), args.max_accuracy_drop, args.max_latency_regression)
+        for failure in failures:
+            print(f"❌ Regression: {failure}")
+        if failures:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
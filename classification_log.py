@@ -0,0 +1,216 @@
+import os
+import sys
+import json
+import queue
+import atexit
+import logging
+import threading
+import logging.handlers
+from datetime import datetime
+
+# Classification history (ticket_classifier_log.jsonl), traces and diagnostics all go through background
+# threads: callers enqueue and return immediately, a writer batches lines and rotates by size.
+LOG_PATH = os.getenv("CLASSIFIER_LOG_PATH", "ticket_classifier_log.jsonl")
+LOG_MAX_BYTES = int(os.getenv("CLASSIFIER_LOG_MAX_BYTES", str(5 * 1024 * 1024)))
+LOG_BACKUPS = int(os.getenv("CLASSIFIER_LOG_BACKUPS", "5"))
+LOG_LEVEL = os.getenv("CLASSIFIER_LOG_LEVEL", "WARNING").upper()
+# Entries someone marked as correct in the app, also kept apart from the log: never rotated, so the
+# few-shot pool and the local model keep them, and small enough to re-read whenever it changes
+CONFIRMED_PATH = os.getenv("CLASSIFIER_CONFIRMED_PATH", "confirmed_examples.jsonl")
+
+QUEUE_SIZE = 1000
+BATCH_SIZE = 50
+FLUSH_INTERVAL = 1.0
+
+
+class ClassificationLogWriter:
+    def __init__(self, path=LOG_PATH, max_bytes=LOG_MAX_BYTES, backups=LOG_BACKUPS, queue_size=QUEUE_SIZE, seed=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        # Called on the writer thread for the file's first entries when it does not exist yet
+        self.seed = seed
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stop = object()
+        self._thread = threading.Thread(target=self._run, name="classification-log", daemon=True)
+        self._thread.start()
+
+    def submit(self, entry):
+        try:
+            self._queue.put_nowait(entry)
+            return True
+        except queue.Full:
+            # Never block the request path; a dropped history line is cheaper than a stalled ticket
+            self.dropped += 1
+            return False
+
+    def flush(self, timeout=5.0):
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout=5.0):
+        if self._thread.is_alive():
+            try:
+                self._queue.put(self._stop, timeout=timeout)
+            except queue.Full:
+                return
+            self._thread.join(timeout)
+
+    def _run(self):
+        if self.seed is not None and not os.path.exists(self.path):
+            try:
+                self._start(self.seed())
+            except Exception as e:
+                print(f"❌ Could not start {self.path}: {e!r}", file=sys.stderr)
+        while True:
+            item = self._queue.get()
+            batch, waiters, stop = [], [], False
+            while True:
+                if item is self._stop:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                if stop or len(batch) >= BATCH_SIZE:
+                    break
+                try:
+                    item = self._queue.get(timeout=FLUSH_INTERVAL if not waiters else 0)
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    self._write(batch)
+                except Exception as e:
+                    print(f"❌ Could not write {self.path}: {e!r}", file=sys.stderr)
+            for waiter in waiters:
+                waiter.set()
+            if stop:
+                return
+
+    def _write(self, batch):
+        lines = "".join(json.dumps(entry, ensure_ascii=False, default=str) + "\n" for entry in batch)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+            size = f.tell()
+        if self.max_bytes and size >= self.max_bytes:
+            self._rotate()
+
+    def _start(self, entries):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+        os.replace(tmp, self.path)
+
+    def _rotate(self):
+        import gzip
+        import shutil
+
+        # ticket_classifier_log.jsonl -> .1.gz -> .2.gz ... oldest beyond `backups` is removed
+        for i in range(self.backups - 1, 0, -1):
+            src = f"{self.path}.{i}.gz"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}.gz")
+        rotated = f"{self.path}.rotating"
+        os.replace(self.path, rotated)
+        if self.backups > 0:
+            with open(rotated, "rb") as src, gzip.open(f"{self.path}.1.gz", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+        os.remove(rotated)
+
+
+# One writer thread per file: the classification history, and the trace JSONL when tracing is on
+_writers = {}
+_writer_lock = threading.Lock()
+
+
+def get_log_writer(path=None, max_bytes=LOG_MAX_BYTES, seed=None):
+    # max_bytes and seed only apply when the path's writer is first created; max_bytes=0 never rotates
+    path = path or LOG_PATH
+    writer = _writers.get(path)
+    if writer is None:
+        with _writer_lock:
+            writer = _writers.get(path)
+            if writer is None:
+                writer = _writers[path] = ClassificationLogWriter(path, max_bytes=max_bytes, seed=seed)
+                atexit.register(writer.close)
+    return writer
+
+
+def log_files(path=LOG_PATH):
+    # The live log and its rotated .N.gz backups, oldest first
+    files = [f"{path}.{i}.gz" for i in range(LOG_BACKUPS, 0, -1)] + [path]
+    return [f for f in files if os.path.exists(f)]
+
+
+def read_log(path=LOG_PATH):
+    # Every parseable entry of the log, rotated history included, oldest first
+    import gzip
+    for name in log_files(path):
+        opener = gzip.open if name.endswith(".gz") else open
+        try:
+            with opener(name, "rt", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if isinstance(entry, dict):
+                        yield entry
+        except (EOFError, OSError):
+            # Rotated away (or half-written) while we were reading; the rest is still usable
+            continue
+
+
+def read_confirmed(path=CONFIRMED_PATH, log_path=LOG_PATH):
+    # Confirmed entries, oldest first. Before the store exists (older installs) they are only in the
+    # log, rotated history included.
+    entries = read_log(path) if os.path.exists(path) else read_log(log_path)
+    return [entry for entry in entries if entry.get("confirmed")]
+
+
+def get_confirmed_writer():
+    # The store starts with the confirmed entries the log already holds, read on the writer thread
+    return get_log_writer(CONFIRMED_PATH, max_bytes=0, seed=read_confirmed)
+
+
+def write_log(ticket_message, result, edge_case="", confirmed=False):
+    entry = {
+        "timestamp": datetime.utcnow().isoformat(),
+        "input": ticket_message,
+        "output": result,
+        "edge_case": edge_case or (result or {}).get("edge_case", ""),
+    }
+    if confirmed:
+        # A person checked these fields; fewshot_index.py and ticket_model.py learn from such entries. The
+        # ticket is already in the log from when it was classified, so this goes to the store only.
+        entry["confirmed"] = True
+        return get_confirmed_writer().submit(entry)
+    return get_log_writer().submit(entry)
+
+
+_logger = None
+
+
+def get_logger():
+    # Leveled diagnostics for the classifier; records are handed to a QueueListener thread
+    global _logger
+    if _logger is None:
+        logger = logging.getLogger("ticket_classifier")
+        logger.setLevel(LOG_LEVEL)
+        logger.propagate = False
+        records = queue.Queue(-1)
+        stream = logging.StreamHandler(sys.stderr)
+        stream.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        listener = logging.handlers.QueueListener(records, stream, respect_handler_level=True)
+        listener.start()
+        atexit.register(listener.stop)
+        logger.addHandler(logging.handlers.QueueHandler(records))
+        _logger = logger
+    return _logger
@@ -1,13 +1,29 @@
 import sys
-from llm_classifier import classify_ticket
+from llm_classifier import classify_ticket, classify_ticket_stream, write_log
+
+SOURCE_MARKS = {"cache": "💾", "rules": "📏", "preliminary": "⚡", "llm": "🤖"}
+
+def classify_streaming(message):
+    # Fields print as soon as they're known; the final table below has the reconciled values
+    result = {}
+    for event in classify_ticket_stream(message):
+        if event["event"] == "field":
+            if event["value"]:
+                print(f"{SOURCE_MARKS.get(event['source'], '')} {event['field'].title():<15}: {event['value']}", flush=True)
+        else:
+            result = event["result"]
+    print("-" * 60)
+    return result
 
 if __name__ == "__main__":
+    stream = "--stream" in sys.argv[1:]
     print("\U0001f4e8 Paste your ticket message below. Press Ctrl+D (Linux/macOS) or Ctrl+Z (Windows) when done:\n")
     message = sys.stdin.read().strip()
 
     print("\n\U0001f4c4 Output:")
     print("=" * 60)
-    result = classify_ticket(message)
+    result = classify_streaming(message) if stream else classify_ticket(message)
+    write_log(message, result)
     for field in [
         "contact", "dealer_name", "dealer_id", "rep",
         "category", "sub_category", "syndicator", "inventory_type"
@@ -21,6 +37,15 @@ if __name__ == "__main__":
     edge_case = result.get("edge_case", "")
     if edge_case:
         print(f"\n⚠️  Edge Case Flagged: {edge_case}")
+    for model, reasons in result.get("escalations", {}).items():
+        print(f"🧭 {model} answer escalated: {', '.join(reasons)}")
+    if result.get("escalation_failed"):
+        print(f"⚠️  Escalation failed, showing the {result['model']} answer: {result['escalation_failed']}")
+    for field, check in result.get("model_disagrees", {}).items():
+        print(f"🤖 Local model disagrees on {field}: {check['model']!r} ({check['probability']:.0%}) vs {check['llm']!r}")
+    for syndicator, active in result.get("export_active", {}).items():
+        print(f"📦 {syndicator} export is already {'ON' if active else 'OFF'} "
+              f"(snapshot {result.get('export_snapshot_age_hours', 0):.0f}h old)")
     print("=" * 60)
 
     input("\n✅ Press Enter to exit.")
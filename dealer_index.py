@@ -0,0 +1,225 @@
+import io
+import os
+import re
+import csv
+import hashlib
+import heapq
+import threading
+from collections import Counter
+from difflib import SequenceMatcher
+from artifacts import load_artifact
+from keyword_automaton import KeywordAutomaton
+
+MAPPING_PATH = "rep_dealer_mapping.csv"
+
+# Short forms agents use in tickets -> the spelling used in the mapping file
+BRAND_ALIASES = {
+    "vw": "volkswagen",
+    "chev": "chevrolet",
+    "chevy": "chevrolet",
+    "mercedes-benz": "mercedes",
+    "mercedes benz": "mercedes",
+    "lex": "lexus",
+    "saint": "st",
+    "sainte": "ste",
+}
+
+_CAMEL_RE = re.compile(r"([a-z])([A-Z])")
+_PUNCT_RE = re.compile(r"[\-–_.,'’/()&]+")
+_GROUP_RE = re.compile(r"\bgroupe?\b")
+_ALIAS_RE = re.compile(r"\b(" + "|".join(re.escape(a) for a in sorted(BRAND_ALIASES, key=len, reverse=True)) + r")\b")
+
+
+def normalize_dealer_name(name):
+    name = _CAMEL_RE.sub(r"\1 \2", str(name))
+    return " ".join(name.lower().split())
+
+
+def trigrams(text):
+    text = f"  {text} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def alias_key(name):
+    key = _ALIAS_RE.sub(lambda m: BRAND_ALIASES[m.group(1)], normalize_dealer_name(name))
+    return " ".join(_PUNCT_RE.sub(" ", key).split())
+
+
+def build_dealer_tables(path):
+    dealer_to_id, dealer_to_rep = {}, {}
+    with open(path, "rb") as f:
+        raw = f.read()
+    for row in csv.DictReader(io.StringIO(raw.decode("utf-8"), newline="")):
+        name = normalize_dealer_name(row.get("Dealer Name") or "")
+        if not name:
+            continue
+        # Later rows win, same as the old set_index(...).to_dict()
+        dealer_to_id[name] = (row.get("Dealer ID") or "").strip()
+        dealer_to_rep[name] = (row.get("Rep Name") or "").strip()
+    aliases = {}
+    for name in dealer_to_id:
+        key = alias_key(name)
+        if key != name and key not in dealer_to_id:
+            aliases.setdefault(key, name)
+    return {
+        "ids": dealer_to_id,
+        "reps": dealer_to_rep,
+        "aliases": aliases,
+        "digest": hashlib.sha256(raw).hexdigest(),
+    }
+
+
+class DealerIndex:
+    def __init__(self, path=MAPPING_PATH):
+        self.path = path
+        self.mtime = None
+        self.digest = ""
+        self.dealer_to_id = {}
+        self.dealer_to_rep = {}
+        self.aliases = {}
+        self._scanner = None
+        self._trigram_index = None
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def refresh(self):
+        mtime = os.stat(self.path).st_mtime_ns
+        if mtime == self.mtime:
+            return False
+        with self._lock:
+            if mtime == self.mtime:
+                return False
+            tables = load_artifact(self.path, "dealers", build_dealer_tables)
+            dealer_to_id, dealer_to_rep, aliases = tables["ids"], tables["reps"], tables["aliases"]
+            self.dealer_to_id, self.dealer_to_rep, self.aliases = dealer_to_id, dealer_to_rep, aliases
+            self._scanner = None
+            self._trigram_index = None
+            self.digest = tables["digest"]
+            self.mtime = mtime
+        return True
+
+    def resolve(self, name):
+        norm = normalize_dealer_name(name)
+        if norm in self.dealer_to_id:
+            return norm
+        key = alias_key(norm)
+        if key in self.dealer_to_id:
+            return key
+        return self.aliases.get(key, "")
+
+    def lookup(self, name):
+        norm = self.resolve(name)
+        if not norm:
+            return {}
+        return {
+            "dealer_name": norm,
+            "dealer_id": self.dealer_to_id[norm],
+            "rep": self.dealer_to_rep[norm],
+        }
+
+    @property
+    def scanner(self):
+        scanner = self._scanner
+        if scanner is None:
+            scanner = KeywordAutomaton()
+            for keyword, name in self.scan_keywords():
+                scanner.add(keyword, name)
+            self._scanner = scanner.build()
+        return scanner
+
+    def scan_keywords(self):
+        # (keyword, dealer name) pairs the scanner looks for: mapped names and their aliases
+        for name, dealer_id in self.dealer_to_id.items():
+            if dealer_id and len(name) > 2:
+                yield name, name
+        for key, name in self.aliases.items():
+            if self.dealer_to_id[name] and len(key) > 2:
+                yield key, name
+
+    def mention(self, start, end, name):
+        return {
+            "dealer_name": name,
+            "dealer_id": self.dealer_to_id[name],
+            "rep": self.dealer_to_rep[name],
+            "start": start,
+            "end": end,
+            "is_group": bool(_GROUP_RE.search(name)),
+        }
+
+    def scan(self, text):
+        return [self.mention(start, end, name) for start, end, name in self.scanner.find_all(text)]
+
+    @property
+    def trigram_index(self):
+        index = self._trigram_index
+        if index is None:
+            keys, postings = [], {}
+            for key, name in [(n, n) for n in self.dealer_to_id] + list(self.aliases.items()):
+                key = alias_key(key)
+                grams = trigrams(key)
+                for gram in grams:
+                    postings.setdefault(gram, []).append(len(keys))
+                keys.append((key, name, len(grams), " ".join(sorted(key.split()))))
+            index = self._trigram_index = (keys, postings)
+        return index
+
+    def fuzzy(self, name, limit=5, cutoff=0.8, shortlist=6):
+        query = alias_key(name)
+        if not query:
+            return []
+        keys, postings = self.trigram_index
+        grams = trigrams(query)
+        overlap = Counter()
+        for gram in grams:
+            overlap.update(postings.get(gram, ()))
+        # Dice coefficient on trigram sets narrows ~3k names to a shortlist before exact scoring
+        # (raw overlap counts pre-trim the candidates so the Dice ranking stays cheap)
+        dice = heapq.nlargest(
+            shortlist,
+            overlap.most_common(shortlist * 8),
+            key=lambda item: 2 * item[1] / (len(grams) + keys[item[0]][2]),
+        )
+        plain = SequenceMatcher(None)
+        plain.set_seq2(query)
+        by_tokens = SequenceMatcher(None)
+        by_tokens.set_seq2(" ".join(sorted(query.split())))
+        best = {}
+        for i, _ in dice:
+            key, canonical, _, key_sorted = keys[i]
+            score = 0
+            for matcher, candidate in ((plain, key), (by_tokens, key_sorted)):
+                matcher.set_seq1(candidate)
+                if matcher.quick_ratio() > max(score, cutoff - 1e-9):
+                    score = max(score, matcher.ratio())
+            if score >= cutoff and score > best.get(canonical, 0):
+                best[canonical] = score
+        ranked = sorted(best.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [dict(self.lookup(canonical), score=round(score, 3)) for canonical, score in ranked]
+
+    def names(self):
+        return self.dealer_to_id.keys()
+
+    def dealer_ids(self):
+        return sorted({dealer_id for dealer_id in self.dealer_to_id.values() if dealer_id})
+
+    def __contains__(self, name):
+        return bool(self.resolve(name))
+
+    def __len__(self):
+        return len(self.dealer_to_id)
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_dealer_index(path=MAPPING_PATH):
+    index = _indexes.get(path)
+    if index is None:
+        with _indexes_lock:
+            index = _indexes.get(path)
+            if index is None:
+                index = _indexes[path] = DealerIndex(path)
+        return index
+    index.refresh()
+    return index
@@ -1,134 +1,40 @@
 
 import re
-import nltk
-import pandas as pd
+from artifacts import load_artifact
+from dealer_index import MAPPING_PATH, get_dealer_index
+from syndicator_index import SYNDICATOR_REFERENCE_PATH, load_reference
+from ticket_features import extract_features
 
-nltk.download("punkt", quiet=True)
+# Minimum similarity for classify_ticket to accept a fuzzy dealer match without asking the model again
+FUZZY_DEALER_CUTOFF = 0.9
 
 DEALER_BLOCKLIST = {"blue admin", "admin blue", "admin red", "d2c media", "cars commerce"}
 
 # Load approved syndicators
 try:
-    SYNDICATOR_LIST = pd.read_csv("Full_Syndicator_Keyword_Reference.csv")["Syndicator"].dropna()
+    SYNDICATOR_LIST = load_artifact(SYNDICATOR_REFERENCE_PATH, "syndicators", load_reference)
     APPROVED_SYNDICATORS = set(s.lower() for s in SYNDICATOR_LIST)
 except Exception:
+    SYNDICATOR_LIST = []
     APPROVED_SYNDICATORS = set()
 
-# Keyword-to-approved-name mapping
-SYNDICATOR_KEYWORDS = {
-    "edealer": "EDealer",
-    "toyota legacy elite": "EDealer",
-    "legacy elite": "EDealer",
-    "gubagoo": "Gubagoo",
-    "spincar": "SpinCar",
-    "trader": "Trader",
-    "easydeal": "EasyDeal",
-    "facebook": "Facebook",
-    "google": "Google",
-}
-
-def detect_language(text):
-    return "fr" if re.search(r"\b(merci|bonjour|véhicule|images|depuis)\b", text.lower()) else "en"
-
-def detect_stock_number(text):
-    return bool(re.search(r"\b[A-Z0-9]{6,}\b", text))
-
-def extract_contacts(text):
-    lines = text.strip().split('\n')
-    for i in range(len(lines) - 1):
-        line = lines[i].strip().lower()
-        if re.match(r'^(best regards|regards|merci|thanks|cordially|from:|envoyé par|de:)', line, re.IGNORECASE):
-            next_line = lines[i + 1].strip()
-            name_match = re.match(r'^[A-Z][a-z]+( [A-Z][a-z]+)+$', next_line)
-            if name_match:
-                return next_line
-    greet_match = re.search(r'^(hi|bonjour|hello|salut)[\s,:-]+([A-Z][a-z]+)', text.strip(), re.IGNORECASE | re.MULTILINE)
-    if greet_match:
-        candidate = greet_match.group(2)
-        if not re.match(r'^(nous|client|dealer|photos?|images?|request|inventory)$', candidate, re.IGNORECASE):
-            return candidate
-    match = re.search(r'\b([A-Z][a-z]+ [A-Z][a-z]+)\b', text)
-    if match and not re.match(r'^(nous|client|dealer|photos?|images?|request|inventory)$', match.group(1), re.IGNORECASE):
-        return match.group(1)
-    return ""
-
-def extract_dealers(text):
-    lines = text.split('\n')
-    extracted = []
-    for line in lines:
-        m = re.search(r"(Dealership Name|Dealer Name|Dealer)\s*[:\-]?\s*([A-Za-z0-9 &'\-]+)", line, re.IGNORECASE)
-        if m:
-            candidate = m.group(2).strip()
-            if candidate:
-                extracted.append(candidate.lower())
-    if not extracted:
-        dealer_matches = re.findall(
-            r"\b(?:mazda|toyota|honda|chevrolet|hyundai|genesis|ford|ram|gmc|acura|jeep"
-            r"|buick|nissan|volvo|subaru|volkswagen|kia|mitsubishi|infiniti|lexus"
-            r"|cadillac|dodge|mini|jaguar|land rover|bmw|mercedes|audi|porsche|tesla)"
-            r"[a-zé\-\s]*\b", text.lower()
-        )
-        INVALID_SUFFIXES = {"units", "inventory", "vehicles", "images", "stock"}
-        cleaned = []
-        for d in dealer_matches:
-            d_clean = d.strip()
-            parts = d_clean.split()
-            if parts and parts[-1] not in INVALID_SUFFIXES:
-                cleaned.append(d_clean)
-        extracted = list(set(cleaned))
-    return extracted
-
-def extract_syndicators(text):
-    text = text.lower()
-    matches = set()
-
-    # Base rule: only map if keyword and approved name are valid
-    for keyword, name in SYNDICATOR_KEYWORDS.items():
-        if keyword in text and name.lower() in APPROVED_SYNDICATORS:
-            matches.add(name)
-
-    # Special case: "Cox Automotive" maps to "HomeNet" if HomeNet is approved
-    if "cox automotive" in text or "homenet" in text or "coxauto" in text:
-        if "homenet" in APPROVED_SYNDICATORS:
-            matches.add("HomeNet")
-
-    return list(matches)
-
-def extract_image_flags(text):
-    flags = []
-    lower = text.lower()
-    if "image" in lower:
-        flags.append("image")
-    if "certified" in lower:
-        flags.append("certified")
-    if "overwrite" in lower or "overwritten" in lower:
-        flags.append("overwritten")
-    return flags
-
 def preprocess_ticket(text):
-    return {
-        "message": text,
-        "contains_french": detect_language(text) == "fr",
-        "contains_stock_number": detect_stock_number(text),
-        "contacts_found": [extract_contacts(text)],
-        "dealers_found": extract_dealers(text),
-        "syndicators": extract_syndicators(text),
-        "image_flags": extract_image_flags(text),
-        "line_count": text.count("\n") + 1
-    }
-
-def lookup_dealer_by_name(name, csv_path="rep_dealer_mapping.csv"):
-    name = name.lower().strip()
-    df = pd.read_csv(csv_path)
-    df["Dealer Name"] = df["Dealer Name"].str.lower().str.strip()
-    match = df[df["Dealer Name"] == name]
-    if not match.empty:
+    # One lowercase/split of the text feeds every field; see ticket_features
+    return extract_features(text)
+
+def lookup_dealer_by_name(name, csv_path=MAPPING_PATH):
+    match = get_dealer_index(csv_path).lookup(name)
+    if match:
         return {
-            "dealer_id": str(match.iloc[0]["Dealer ID"]),
-            "rep": match.iloc[0]["Rep Name"]
+            "dealer_id": match["dealer_id"],
+            "rep": match["rep"]
         }
     return {}
 
+def fuzzy_lookup_dealer(name, limit=5, cutoff=0.8, csv_path=MAPPING_PATH):
+    # Trigram shortlist + difflib scoring; returns [{"dealer_name", "dealer_id", "rep", "score"}, ...] best first
+    return get_dealer_index(csv_path).fuzzy(name, limit=limit, cutoff=cutoff)
+
 def detect_edge_case(message: str, zoho_fields=None):
     text = message.lower()
     synd = (zoho_fields or {}).get("syndicator", "").lower()
@@ -143,7 +49,6 @@ def detect_edge_case(message: str, zoho_fields=None):
     return ""
 
 def format_zoho_comment(zf, context):
-    print("=== USING THE NEW UNIVERSAL COMMENT FUNCTION ===")
     lines = []
     category = zf.get('category', '').lower()
     sub_category = zf.get('sub_category', '').lower()
@@ -153,12 +58,8 @@ def format_zoho_comment(zf, context):
     lines.append(f"{zf.get('dealer_name', '')} ({zf.get('dealer_id', '')})")
     lines.append(f"Rep: {zf.get('rep', '')}")
 
-    dealer_emails = []
-    for e in re.findall(r"[a-z0-9._%+-]+@[a-z0-9.-]+\.[a-z]{2,}", context.get("message", "").lower()):
-        if not any(skip in e for skip in ("d2cmedia", "carscommerce")):
-            dealer_emails.append(e)
-    if dealer_emails:
-        lines.append(f"Dealer contact: {dealer_emails[0]}")
+    if context.emails:
+        lines.append(f"Dealer contact: {context.emails[0]}")
 
     if sub_category == "export":
         lines.append(f"Export: {syndicator} – {inventory_type}")
@@ -171,12 +72,12 @@ def format_zoho_comment(zf, context):
         lines.append("")
         lines.append("Client reports import/sync issue. Will investigate.")
 
-    elif "image" in context.get("image_flags", []) or "photo" in context.get("message", "").lower():
+    elif "image" in context.image_flags or "photo" in context.keywords:
         lines.append("Client says issue with vehicle images/photos.")
         lines.append("Looks random.")
         lines.append("Will investigate.")
 
-    elif "firewall" in context.get("message", "").lower():
+    elif "firewall" in context.keywords:
         lines.append("Partner unable to pull import due to firewall block.")
         lines.append("Will escalate.")
 
@@ -0,0 +1,258 @@
+import os
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+
+from result_cache import normalize_ticket_text
+from ticket_features import TicketFeatures, extract_features
+
+# Agents paste whole Zoho/Gmail/Outlook threads. The classifier only needs the newest message;
+# older ones are reduced to a one-line summary each, and their extraction results are cached by
+# message hash so a reply to a thread we've already seen only processes the new part.
+SPLIT_THREADS = os.getenv("CLASSIFIER_SPLIT_THREADS", "1") != "0"
+THREAD_HISTORY_MESSAGES = int(os.getenv("CLASSIFIER_THREAD_HISTORY", "5"))
+MESSAGE_CACHE_SIZE = 2048
+SUMMARY_CHARS = 160
+
+QUOTE_RE = re.compile(r"^\s*(?:>\s?)+")
+SEPARATOR_RE = re.compile(r"^\s*(?:-{2,}\s*(?:original message|message d'origine)\s*-{2,}|_{10,})\s*$", re.IGNORECASE)
+# A forward is not a reply boundary: the forwarded mail is the request, the forwarder's "FYI, see below"
+# is not. The marker and everything under it stay in the message that forwards it.
+FORWARD_RE = re.compile(
+    r"^\s*(?:-{2,}\s*(?:forwarded message|message transféré)\s*-{2,}|begin forwarded message\s*:?)\s*$",
+    re.IGNORECASE,
+)
+# Anything a ticket can be classified from; a newest message without it (and without a dealer or
+# syndicator) is a cover note, so the whole paste is classified instead
+ACTION_RE = re.compile(
+    r"\b(exports?|feeds?|imports?|cancel\w*|activat\w*|enable|disable|remove|add|missing|not showing|error|issue"
+    r"|problem|images?|photos?|inventory|annuler|activer|désactiver|ajouter|manquant\w*|erreur|problème)\b",
+    re.IGNORECASE,
+)
+# Gmail / Zoho ("---- On Mon, 8 Jan 2024 10:15:00 -0500 John <j@x.com> wrote ----") / French Gmail
+REPLY_HEADER_RE = re.compile(r"^\s*-*\s*(?:On|Le)\s+(?P<rest>.+?)\s+(?:wrote|a écrit)\s*:?\s*-*\s*$", re.IGNORECASE)
+REPLY_DATE_RE = re.compile(
+    r"^(?P<date>.*(?:\d{1,2}:\d{2}(?::\d{2})?(?:\s*[ap]\.?m\.?)?(?:\s*[+-]\d{4})?|\d{4}))\s*,?\s+(?P<sender>.+)$",
+    re.IGNORECASE,
+)
+# Outlook block: "From: ...", then Sent/Date/To/Cc/Subject lines
+FROM_HEADER_RE = re.compile(r"^\s*\*?(?:From|De)\s*:\*?\s*(?P<value>.+)$", re.IGNORECASE)
+HEADER_FIELD_RE = re.compile(
+    r"^\s*\*?(?P<name>Sent|Date|Envoyé|To|À|A|Cc|Cci|Bcc|Subject|Objet|Importance)\s*:\*?\s*(?P<value>.*)$",
+    re.IGNORECASE,
+)
+EMAIL_IN_NAME_RE = re.compile(r"\s*[<\[(]?(?:mailto:)?[\w.%+-]+@[\w.-]+\.\w+[>\])]?\s*")
+SIGNOFF_LINE_RE = re.compile(
+    r"^\s*[-—–]?\s*(best regards|kind regards|regards|thanks|thank you|merci|cordialement|cordially|cheers"
+    r"|sincerely|bonne journée)\b[\s,!.]*$",
+    re.IGNORECASE,
+)
+SIGNATURE_START_RE = re.compile(
+    r"^\s*(?:--\s*$|sent from my|envoyé de mon|get outlook for|this (?:e-?mail|message) (?:and any|is confidential|may contain)"
+    r"|confidentiality notice|ce (?:courriel|message) (?:est confidentiel|et toute))",
+    re.IGNORECASE,
+)
+
+
+class ThreadMessage:
+    __slots__ = ("sender", "date", "body", "signature", "digest")
+
+    def __init__(self, sender="", date="", body="", signature=""):
+        self.sender = sender
+        self.date = date
+        self.body = body
+        self.signature = signature
+        self.digest = hashlib.sha256(normalize_ticket_text(f"{body}\n{signature}").encode("utf-8")).hexdigest()
+
+    def __repr__(self):
+        return f"ThreadMessage(sender={self.sender!r}, date={self.date!r}, body={self.body[:40]!r}…)"
+
+
+def _sender_name(value):
+    name = EMAIL_IN_NAME_RE.sub(" ", value).strip(" \"',;")
+    return name or value.strip()
+
+
+def _parse_reply_header(rest):
+    m = REPLY_DATE_RE.match(rest.strip())
+    if not m:
+        return _sender_name(rest), ""
+    return _sender_name(m.group("sender")), m.group("date").strip(" ,")
+
+
+def strip_signature(body):
+    # Keep the sign-off and the name under it (that's where the contact comes from), drop the rest:
+    # titles, phone numbers, addresses, disclaimers, "Sent from my iPhone"
+    lines = body.split("\n")
+    cut = len(lines)
+    for i, line in enumerate(lines):
+        if SIGNATURE_START_RE.match(line):
+            cut = i
+            break
+    for i in range(cut - 1, -1, -1):
+        if SIGNOFF_LINE_RE.match(lines[i]):
+            keep = i + 1
+            while keep < cut and not lines[keep].strip():
+                keep += 1
+            if keep < cut and len(lines[keep].split()) <= 5 and not any(ch.isdigit() for ch in lines[keep]):
+                keep += 1
+            cut = keep
+            break
+    return "\n".join(lines[:cut]).strip(), "\n".join(lines[cut:]).strip()
+
+
+def split_thread(text):
+    # -> [ThreadMessage, ...], newest first
+    messages = []
+    sender, date, body, forwarded = "", "", [], []
+
+    def close():
+        content = "\n".join(body).strip()
+        if content or sender or forwarded:
+            kept, signature = strip_signature(content)
+            if forwarded:
+                # Only the forwarder's own note loses its signature; the forwarded mail is kept whole
+                kept = f"{kept}\n\n" + "\n".join(forwarded).strip() if kept else "\n".join(forwarded).strip()
+            messages.append(ThreadMessage(sender, date, kept, signature))
+
+    lines = text.replace("\r\n", "\n").split("\n")
+    i = 0
+    while i < len(lines):
+        line = QUOTE_RE.sub("", lines[i])
+        if FORWARD_RE.match(line):
+            forwarded = [QUOTE_RE.sub("", rest) for rest in lines[i:]]
+            break
+        if SEPARATOR_RE.match(line):
+            i += 1
+            continue
+        header = REPLY_HEADER_RE.match(line)
+        if not header and i + 1 < len(lines) and re.match(r"^\s*-*\s*(?:On|Le)\s", line, re.IGNORECASE):
+            # Gmail wraps long "On ..., Name <email> wrote:" lines
+            header = REPLY_HEADER_RE.match(line + " " + QUOTE_RE.sub("", lines[i + 1]).strip())
+            if header:
+                i += 1
+        if header:
+            close()
+            sender, date = _parse_reply_header(header.group("rest"))
+            body = []
+            i += 1
+            continue
+        from_header = FROM_HEADER_RE.match(line)
+        if from_header and i + 1 < len(lines) and HEADER_FIELD_RE.match(QUOTE_RE.sub("", lines[i + 1])):
+            close()
+            sender, date, body = _sender_name(from_header.group("value")), "", []
+            i += 1
+            while i < len(lines):
+                field = HEADER_FIELD_RE.match(QUOTE_RE.sub("", lines[i]))
+                if not field:
+                    break
+                if field.group("name").lower() in ("sent", "date", "envoyé"):
+                    date = field.group("value").strip()
+                i += 1
+            continue
+        body.append(line)
+        i += 1
+    close()
+    return messages
+
+
+class MessageCache:
+    # In-process LRU of per-message extraction results keyed by message hash
+    def __init__(self, max_entries=MESSAGE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, message, build):
+        with self._lock:
+            entry = self._entries.get(message.digest)
+            if entry is not None:
+                self._entries.move_to_end(message.digest)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        entry = build(message)
+        with self._lock:
+            self._entries[message.digest] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_message_cache = MessageCache()
+
+
+def get_message_cache():
+    return _message_cache
+
+
+def _extract(message):
+    features = extract_features(f"{message.body}\n{message.signature}".strip() if message.signature else message.body)
+    preview = " ".join(message.body.split())
+    if len(preview) > SUMMARY_CHARS:
+        preview = preview[:SUMMARY_CHARS].rsplit(" ", 1)[0] + "…"
+    entities = []
+    if features.dealers_found:
+        entities.append("dealers: " + ", ".join(features.dealers_found[:3]))
+    if features.syndicators:
+        entities.append("syndicators: " + ", ".join(features.syndicators[:3]))
+    summary = f"{message.date or 'undated'} – {message.sender or 'unknown sender'}: {preview}"
+    if entities:
+        summary += f" ({'; '.join(entities)})"
+    return features, summary
+
+
+def _merge(newest, older):
+    # Entities (dealers, syndicators, contacts, e-mails) carry over from earlier messages, newest first;
+    # intent signals (image/stock/firewall keywords, language) only come from the newest message
+    merged = TicketFeatures(
+        message=newest.message,
+        contains_french=newest.contains_french,
+        contains_stock_number=newest.contains_stock_number,
+        contacts_found=newest.contacts_found,
+        dealers_found=newest.dealers_found,
+        syndicators=newest.syndicators,
+        image_flags=newest.image_flags,
+        line_count=newest.line_count,
+        keywords=newest.keywords,
+        emails=newest.emails,
+        dealer_mentions=newest.dealer_mentions,
+    )
+    for features in older:
+        for name in ("dealers_found", "syndicators", "emails"):
+            values = getattr(merged, name)
+            values.extend(v for v in getattr(features, name) if v not in values)
+        merged.dealer_mentions.extend(features.dealer_mentions)
+        if not any(merged.contacts_found) and any(features.contacts_found):
+            merged.contacts_found = list(features.contacts_found)
+    return merged
+
+
+def prepare_thread(text, history_limit=THREAD_HISTORY_MESSAGES, cache=None):
+    # -> (text to classify, TicketFeatures, [summary line per earlier message]); single messages pass through
+    messages = split_thread(text) if SPLIT_THREADS else []
+    messages = [m for m in messages if m.body]
+    if len(messages) < 2:
+        return text, extract_features(text), []
+    cache = cache or _message_cache
+    newest, older = messages[0], messages[1:]
+    newest_features, _ = cache.get_or_build(newest, _extract)
+    if not (newest_features.dealers_found or newest_features.dealer_mentions or newest_features.syndicators
+            or ACTION_RE.search(newest.body)):
+        # "Thanks, see below" with nothing to classify: the request is further down the paste
+        return text, extract_features(text), []
+    extracted = [cache.get_or_build(m, _extract) for m in older]
+    context = _merge(newest_features, [features for features, _ in extracted])
+    history = [summary for _, summary in extracted[:history_limit]]
+    # The signature stays out of the prompt; its dealer/contact details are already in the features
+    return newest.body, context, history
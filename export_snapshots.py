@@ -0,0 +1,227 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+import threading
+
+# Local copy of every dealer's export checkboxes (exportationbydealer.php), so "is this export already
+# on?" and bulk-toggle diffs don't need a browser. The crawler reads each table in one page-side
+# evaluation, runs on the export_toggles browser pool, and only revisits dealers whose snapshot is older
+# than --max-age-hours. Stored column-wise in a NumPy .npz (one entry per dealer x syndicator row).
+
+SNAPSHOT_PATH = os.getenv("CLASSIFIER_EXPORT_SNAPSHOTS", "export_snapshots.npz")
+SNAPSHOT_MAX_AGE_HOURS = float(os.getenv("CLASSIFIER_EXPORT_SNAPSHOT_MAX_AGE_HOURS", "24"))
+SAVE_EVERY = 50
+
+# Checkbox name suffix -> bit in the flags column
+SUFFIX_BITS = {"_export": 1, "_use": 2, "_new": 4, "_demo": 8}
+# Some checked box has none of those suffixes. A disable job unchecks those too (ToggleJob.targets), so
+# the snapshot alone cannot say it has nothing to do.
+OTHER_CHECKED = 16
+# Stores written before OTHER_CHECKED existed load with it set on every row: unknown, not "nothing else"
+SNAPSHOT_FORMAT = 2
+
+# Every table row with a label cell, as [label, [[checkbox name, checked], ...]], in one round trip
+READ_TABLE_JS = """
+() => Array.from(document.querySelectorAll("table tr"))
+    .filter(row => row.querySelectorAll("td").length >= 2)
+    .map(row => [
+        row.querySelectorAll("td")[1].innerText,
+        Array.from(row.querySelectorAll("input[type=checkbox]")).map(box => [box.name || "", box.checked]),
+    ])
+"""
+
+
+def clean_label(label):
+    return label.replace("✓", "").strip()
+
+
+def label_matches(label, syndicator):
+    # Same rule as the toggle scripts: the syndicator name appears in the row label
+    return syndicator.lower() in clean_label(label).lower()
+
+
+def row_flags(checkboxes):
+    flags = 0
+    for name, checked in checkboxes:
+        if not checked:
+            continue
+        bits = [bit for suffix, bit in SUFFIX_BITS.items() if name.endswith(suffix)]
+        for bit in bits or [OTHER_CHECKED]:
+            flags |= bit
+    return flags
+
+
+class ExportSnapshots:
+    def __init__(self, path=SNAPSHOT_PATH):
+        self.path = path
+        self.mtime = None
+        # dealer_id -> (crawled_at, [(syndicator label, flags), ...])
+        self.dealers = {}
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def refresh(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if mtime == self.mtime:
+            return False
+        import numpy as np
+        with self._lock, np.load(self.path, allow_pickle=False) as data:
+            legacy = 0 if "format" in data and int(data["format"]) >= SNAPSHOT_FORMAT else OTHER_CHECKED
+            dealers = {str(d): (float(t), []) for d, t in zip(data["crawl_dealer"], data["crawled_at"])}
+            for dealer, syndicator, flags in zip(data["dealer"], data["syndicator"], data["flags"]):
+                dealers[str(dealer)][1].append((str(syndicator), int(flags) | legacy))
+            self.dealers = dealers
+            self.mtime = mtime
+        return True
+
+    def save(self):
+        import numpy as np
+        with self._lock:
+            rows = [(d, s, f) for d, (_, entries) in self.dealers.items() for s, f in entries]
+            columns = {
+                "dealer": np.array([r[0] for r in rows], dtype=str),
+                "syndicator": np.array([r[1] for r in rows], dtype=str),
+                "flags": np.array([r[2] for r in rows], dtype=np.uint8),
+                "crawl_dealer": np.array(list(self.dealers), dtype=str),
+                "crawled_at": np.array([t for t, _ in self.dealers.values()], dtype=np.float64),
+                "format": np.array(SNAPSHOT_FORMAT),
+            }
+            tmp = f"{self.path}.{os.getpid()}.tmp.npz"
+            np.savez_compressed(tmp, **columns)
+            os.replace(tmp, self.path)
+            self.mtime = os.stat(self.path).st_mtime_ns
+
+    def update(self, dealer_id, rows, crawled_at=None):
+        # rows: [label, [[checkbox name, checked], ...]] as returned by READ_TABLE_JS
+        entries = [(clean_label(label), row_flags(boxes)) for label, boxes in rows]
+        with self._lock:
+            self.dealers[str(dealer_id)] = (crawled_at or time.time(), entries)
+
+    def invalidate(self, dealer_id):
+        # After a toggle the snapshot is wrong until the next crawl
+        with self._lock:
+            self.dealers.pop(str(dealer_id), None)
+
+    def age_hours(self, dealer_id):
+        entry = self.dealers.get(str(dealer_id))
+        return None if entry is None else (time.time() - entry[0]) / 3600
+
+    def stale(self, dealer_ids, max_age_hours=SNAPSHOT_MAX_AGE_HOURS):
+        cutoff = time.time() - max_age_hours * 3600
+        return [d for d in dealer_ids if self.dealers.get(str(d), (0.0,))[0] < cutoff]
+
+    def flags(self, dealer_id, syndicator, max_age_hours=None):
+        # Flags of the first matching row; None when the dealer was never crawled (or is too old) or
+        # has no such row
+        entry = self.dealers.get(str(dealer_id))
+        if entry is None or (max_age_hours is not None and time.time() - entry[0] > max_age_hours * 3600):
+            return None
+        for label, flags in entry[1]:
+            if label_matches(label, syndicator):
+                return flags
+        return None
+
+    def is_active(self, dealer_id, syndicator, max_age_hours=None):
+        flags = self.flags(dealer_id, syndicator, max_age_hours)
+        return None if flags is None else bool(flags & SUFFIX_BITS["_export"])
+
+    def diff(self, job, max_age_hours=SNAPSHOT_MAX_AGE_HOURS):
+        # Checkbox suffixes a ToggleJob would change, from the snapshot alone; None = unknown, load the page
+        flags = self.flags(job.dealer_id, job.syndicator, max_age_hours)
+        if flags is None:
+            return None
+        fallback, _ = job.targets()
+        if fallback is False and flags & OTHER_CHECKED:
+            # The page would also uncheck boxes the snapshot has no suffix for
+            return None
+        changes = []
+        for suffix, bit in SUFFIX_BITS.items():
+            want = job.wants_checked(suffix)
+            if want is not None and want != bool(flags & bit):
+                changes.append(suffix)
+        return changes
+
+
+_snapshots = None
+_snapshots_lock = threading.Lock()
+
+
+def get_export_snapshots(path=SNAPSHOT_PATH):
+    # None until a crawl has written the store; reloads when the file changes
+    global _snapshots
+    if _snapshots is None:
+        if not os.path.exists(path):
+            return None
+        with _snapshots_lock:
+            if _snapshots is None:
+                _snapshots = ExportSnapshots(path)
+        return _snapshots
+    _snapshots.refresh()
+    return _snapshots
+
+
+async def snapshot_page(page, dealer_id, base_url):
+    from export_toggles import export_url
+    await page.goto(export_url(dealer_id, base_url))
+    await page.wait_for_selector("table")
+    rows = await page.evaluate(READ_TABLE_JS)
+    return {"status": "ok", "rows": rows}
+
+
+async def crawl(dealer_ids, snapshots, concurrency=None, storage_state=None, base_url=None, headless=True,
+                verbose=True):
+    from export_toggles import run_pool, DEFAULT_CONCURRENCY, STORAGE_STATE, ADMIN_BASE_URL
+    base_url = base_url or ADMIN_BASE_URL
+    done = {"count": 0}
+
+    def on_result(result):
+        if result["status"] == "ok":
+            snapshots.update(result["item"], result["rows"])
+            done["count"] += 1
+            # Periodic saves so an interrupted crawl keeps its progress
+            if done["count"] % SAVE_EVERY == 0:
+                snapshots.save()
+        if verbose and result["status"] != "ok":
+            print(f"❌ dealer {result['item']}: {result.get('error', result['status'])}", flush=True)
+
+    async def handle(page, dealer_id):
+        return await snapshot_page(page, dealer_id, base_url)
+
+    results = await run_pool(
+        list(dealer_ids), handle, concurrency or DEFAULT_CONCURRENCY,
+        STORAGE_STATE if storage_state is None else storage_state, headless, on_result,
+    )
+    snapshots.save()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Snapshot export settings for every mapped dealer.")
+    parser.add_argument("--path", default=SNAPSHOT_PATH)
+    parser.add_argument("--max-age-hours", type=float, default=SNAPSHOT_MAX_AGE_HOURS,
+                        help="Re-crawl dealers whose snapshot is older than this (0 = everything)")
+    parser.add_argument("--dealer", action="append", help="Only these dealer IDs (repeatable)")
+    parser.add_argument("--concurrency", type=int, default=None)
+    parser.add_argument("--storage-state", default=None, help="Logged-in session (default auth.json)")
+    parser.add_argument("--base-url", default=None, help="Admin base URL (e.g. fake_export_admin.py)")
+    args = parser.parse_args(argv)
+
+    from dealer_index import get_dealer_index
+    dealer_ids = args.dealer or get_dealer_index().dealer_ids()
+    snapshots = ExportSnapshots(args.path)
+    todo = snapshots.stale(dealer_ids, args.max_age_hours)
+    print(f"🔍 {len(todo)} of {len(dealer_ids)} dealers need a fresh snapshot")
+    started = time.perf_counter()
+    results = asyncio.run(crawl(todo, snapshots, args.concurrency, args.storage_state, args.base_url))
+    ok = sum(r["status"] == "ok" for r in results)
+    print(f"✅ {ok} snapshots in {time.perf_counter() - started:.1f}s, {len(results) - ok} failed → {args.path}")
+    return 0 if ok == len(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,54 +1,38 @@
 import asyncio
 from playwright.async_api import async_playwright
+from export_toggles import ToggleJob, run_jobs
 
 # CONFIGURE HERE
 import sys
 
-DEALER_ID = sys.argv[1]
-SYNDICATOR_NAME = sys.argv[2]
-
-# This version DEACTIVATES all export checkboxes for a syndicator
-
-async def run(playwright):
-    browser = await playwright.chromium.launch(headless=True)
-    context = await browser.new_context(storage_state="auth.json")
-    page = await context.new_page()
-
-    url = f"https://aaadmin.d2cmedia.ca/administration/exportationbydealer.php?id={DEALER_ID}"
-    await page.goto(url)
-    print(f"🔍 Loaded export settings for dealer {DEALER_ID}")
-
-    await page.wait_for_selector("table")
-    rows = await page.query_selector_all("table tr")
-    target_row = None
-
-    for row in rows:
-        cells = await row.query_selector_all("td")
-        if len(cells) < 2:
-            continue
-        label_raw = await cells[1].inner_text()
-        label = label_raw.replace("✓", "").strip().lower()
-        if SYNDICATOR_NAME.lower() in label:
-            target_row = row
-            break
-
-    if not target_row:
-        print(f"❌ Could not find row for: {SYNDICATOR_NAME}")
-        await browser.close()
-        return
-
-    checkboxes = await target_row.query_selector_all("input[type=checkbox]")
-    for checkbox in checkboxes:
-        current_checked = await checkbox.is_checked()
-        if current_checked:
-            await checkbox.uncheck()
-
-    await page.click("input[type=submit][value='Save']")
-    print(f"✅ All exports deactivated for {SYNDICATOR_NAME} at Dealer {DEALER_ID}")
-    await browser.close()
+# This version DEACTIVATES all export checkboxes for a syndicator.
+# Single-dealer front end; see export_toggles.py for bulk jobs on a shared browser pool
+
+async def run(playwright, dealer_id, syndicator_name, dry_run=False):
+    job = ToggleJob(dealer_id, syndicator_name, "disable")
+    print(f"🔍 Loading export settings for dealer {dealer_id}")
+    [result] = await run_jobs([job], concurrency=1, on_result=None, playwright=playwright, dry_run=dry_run)
+
+    if result["status"] == "not_found":
+        print(f"❌ Could not find row for: {syndicator_name}")
+    elif result["status"] == "error":
+        print(f"❌ Could not update dealer {dealer_id}: {result['error']}")
+    elif result["status"] == "planned":
+        for name, want in result["plan"]:
+            print(f"📝 Would {'check' if want else 'uncheck'} {name} ({result['label']})")
+    elif result["status"] == "unchanged":
+        print(f"⏭️  Exports already deactivated for {syndicator_name} at Dealer {dealer_id}")
+    else:
+        print(f"✅ All exports deactivated for {syndicator_name} at Dealer {dealer_id}")
 
 async def main():
+    # --dry-run anywhere on the command line prints the plan without saving
+    dry_run = "--dry-run" in sys.argv
+    args = [a for a in sys.argv[1:] if a != "--dry-run"]
+    dealer_id = args[0]
+    syndicator_name = args[1]
     async with async_playwright() as playwright:
-        await run(playwright)
+        await run(playwright, dealer_id, syndicator_name, dry_run)
 
-asyncio.run(main())
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,271 @@
+import os
+import sys
+import csv
+import json
+import time
+import asyncio
+import argparse
+
+# Enable / disable syndicator exports on the D2C admin (exportationbydealer.php) for many dealers at
+# once: one browser, a pool of contexts sharing the auth.json session, a page per context reused
+# across jobs. Each page is read and planned in one page.evaluate (PLAN_JS) and the plan applied in one
+# more (APPLY_JS); jobs whose checkboxes are already in the target state are not saved again, and
+# --dry-run only prints the plans.
+# export_toggle_enable.py / export_toggle_disable.py are the single-dealer front ends; run_pool is also
+# what export_snapshots.py crawls with.
+
+ADMIN_BASE_URL = os.getenv("D2C_ADMIN_URL", "https://aaadmin.d2cmedia.ca/administration")
+STORAGE_STATE = os.getenv("D2C_STORAGE_STATE", "auth.json")
+DEFAULT_CONCURRENCY = 4
+PAGE_TIMEOUT_MS = 30000
+
+TYPE_SUFFIXES = {
+    "Usagé": "_use",
+    "Neuf": "_new",
+    "Démonstrateur": "_demo",
+}
+ACTIONS = ("enable", "disable")
+
+
+class ToggleJob:
+    __slots__ = ("dealer_id", "syndicator", "action", "inventory_types")
+
+    def __init__(self, dealer_id, syndicator, action, inventory_types=()):
+        if action not in ACTIONS:
+            raise ValueError(f"❌ Unknown action {action!r} (expected one of {', '.join(ACTIONS)})")
+        self.dealer_id = str(dealer_id).strip()
+        self.syndicator = syndicator.strip()
+        self.action = action
+        self.inventory_types = tuple(t.strip() for t in inventory_types if t.strip())
+
+    def __repr__(self):
+        return f"ToggleJob({self.dealer_id!r}, {self.syndicator!r}, {self.action!r}, {self.inventory_types!r})"
+
+    def wants_checked(self, name):
+        # True / False = target state, None = leave the checkbox alone
+        if self.action == "disable":
+            return False
+        if name.endswith("_export"):
+            return True
+        for label, suffix in TYPE_SUFFIXES.items():
+            if name.endswith(suffix) and label in self.inventory_types:
+                return True
+        return None
+
+    def targets(self):
+        # wants_checked() as data for the page: (state for unknown checkbox names, {suffix: state})
+        suffixes = ("_export",) + tuple(TYPE_SUFFIXES.values())
+        return (False if self.action == "disable" else None), {s: self.wants_checked(s) for s in suffixes}
+
+
+def export_url(dealer_id, base_url=ADMIN_BASE_URL):
+    return f"{base_url.rstrip('/')}/exportationbydealer.php?id={dealer_id}"
+
+
+def split_types(value):
+    # "Usagé,Neuf" or "Usagé|Neuf" (the pipe form survives CSV without quoting)
+    return [t for t in value.replace("|", ",").split(",") if t.strip()] if value else []
+
+
+def read_jobs(path, default_action=None):
+    # CSV with dealer_id, syndicator, action, inventory_types columns (action may come from --action),
+    # or JSONL with the same keys
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith((".jsonl", ".json")):
+            rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            rows = list(csv.DictReader(f))
+    jobs = []
+    for row in rows:
+        types = row.get("inventory_types") or ""
+        jobs.append(ToggleJob(
+            row["dealer_id"], row["syndicator"], (row.get("action") or default_action or "").strip().lower(),
+            types if isinstance(types, list) else split_types(types),
+        ))
+    return jobs
+
+
+# Finds the syndicator's row, reads every checkbox and returns only the ones to flip, in one round trip
+# instead of a Playwright call per row, cell and checkbox. Same matching rule as before: first row whose
+# second cell (✓ stripped, lowercased) contains the syndicator name.
+PLAN_JS = """
+({syndicator, fallback, targets}) => {
+    for (const [index, row] of Array.from(document.querySelectorAll("table tr")).entries()) {
+        const cells = row.querySelectorAll("td");
+        if (cells.length < 2) continue;
+        const label = cells[1].innerText.replace(/✓/g, "").trim();
+        if (!label.toLowerCase().includes(syndicator)) continue;
+        const changes = [];
+        for (const box of row.querySelectorAll("input[type=checkbox]")) {
+            const name = box.name || "";
+            const suffix = Object.keys(targets).find(s => name.endsWith(s));
+            const want = suffix === undefined ? fallback : targets[suffix];
+            if (want !== null && want !== box.checked) changes.push([name, want]);
+        }
+        return {row: index, label, changes};
+    }
+    return null;
+}
+"""
+
+# Applies a plan in one batch; change events fire as they would for a click
+APPLY_JS = """
+({row, changes}) => {
+    const boxes = document.querySelectorAll("table tr")[row].querySelectorAll("input[type=checkbox]");
+    const wanted = new Map(changes);
+    for (const box of boxes) {
+        if (!wanted.has(box.name) || box.checked === wanted.get(box.name)) continue;
+        // A real click, like Playwright's check()/uncheck(): onclick handlers run, then input + change
+        box.click();
+    }
+}
+"""
+
+
+async def plan_page(page, job):
+    fallback, targets = job.targets()
+    return await page.evaluate(PLAN_JS, {"syndicator": job.syndicator.lower(), "fallback": fallback, "targets": targets})
+
+
+async def toggle_page(page, job, base_url=ADMIN_BASE_URL, dry_run=False):
+    await page.goto(export_url(job.dealer_id, base_url))
+    await page.wait_for_selector("table")
+    plan = await plan_page(page, job)
+    if plan is None:
+        return {"status": "not_found", "changed": 0}
+    result = {"changed": len(plan["changes"]), "plan": plan["changes"], "label": plan["label"]}
+    if not plan["changes"]:
+        return {"status": "unchanged", **result}
+    if dry_run:
+        return {"status": "planned", **result}
+    await page.evaluate(APPLY_JS, plan)
+    async with page.expect_navigation():
+        await page.click("input[type=submit][value='Save']")
+    return {"status": "saved", **result}
+
+
+def report(result):
+    marks = {"saved": "✅", "planned": "📝", "unchanged": "⏭️ ", "not_found": "❌", "error": "❌"}
+    job = result["item"]
+    detail = {
+        "saved": f"{result['changed']} checkbox(es) changed",
+        "planned": "would set " + ", ".join(f"{name}={'on' if want else 'off'}" for name, want in result.get("plan", ())),
+        "unchanged": "already in the target state",
+        "not_found": f"no row for {job.syndicator}",
+        "error": result.get("error", ""),
+    }[result["status"]]
+    print(f"{marks[result['status']]} {job.action:<7} {job.syndicator} @ dealer {job.dealer_id}: {detail} "
+          f"({result['seconds']:.1f}s)", flush=True)
+
+
+async def run_pool(items, handle, concurrency=DEFAULT_CONCURRENCY, storage_state=STORAGE_STATE, headless=True,
+                   on_result=None, playwright=None):
+    # handle(page, item) -> result dict, run on a pool of browser contexts sharing one Chromium.
+    # Results come back in item order (with "item" and "seconds" added); on_result sees each as it finishes.
+    results = [None] * len(items)
+    queue = asyncio.Queue()
+    for entry in enumerate(items):
+        queue.put_nowait(entry)
+
+    async def worker(browser):
+        context = await browser.new_context(storage_state=storage_state)
+        context.set_default_timeout(PAGE_TIMEOUT_MS)
+        page = await context.new_page()
+        try:
+            while True:
+                try:
+                    i, item = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                started = time.perf_counter()
+                failed = False
+                try:
+                    result = await handle(page, item)
+                except Exception as e:
+                    result, failed = {"status": "error", "error": repr(e)}, True
+                result.update(item=item, seconds=time.perf_counter() - started)
+                results[i] = result
+                if on_result is not None:
+                    on_result(result)
+                if failed:
+                    # A failed navigation can leave the page unusable; the next item gets a fresh one. Closing a
+                    # broken page can fail too, and that must not take the other workers' results down with it.
+                    try:
+                        await page.close()
+                    except Exception:
+                        pass
+                    page = await context.new_page()
+        finally:
+            try:
+                await context.close()
+            except Exception:
+                pass
+
+    async def run(pw):
+        browser = await pw.chromium.launch(headless=headless)
+        try:
+            # A worker that dies (its context is gone) leaves the queue to the others; finished results stay
+            await asyncio.gather(*(worker(browser) for _ in range(max(1, min(concurrency, len(items))))),
+                                 return_exceptions=True)
+        finally:
+            await browser.close()
+
+    if items:
+        if playwright is not None:
+            await run(playwright)
+        else:
+            from playwright.async_api import async_playwright
+            async with async_playwright() as pw:
+                await run(pw)
+    # Items no worker got to (every context died) still get a result, so callers can report and retry them
+    return [result or {"status": "error", "error": "no browser context left", "item": item, "seconds": 0.0}
+            for item, result in zip(items, results)]
+
+
+async def run_jobs(jobs, concurrency=DEFAULT_CONCURRENCY, storage_state=STORAGE_STATE, base_url=ADMIN_BASE_URL,
+                   headless=True, on_result=report, playwright=None, dry_run=False):
+    async def handle(page, job):
+        return await toggle_page(page, job, base_url, dry_run)
+    return await run_pool(jobs, handle, concurrency, storage_state, headless, on_result, playwright)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Enable or disable syndicator exports for many dealers.")
+    parser.add_argument("jobs", help="CSV/JSONL with dealer_id, syndicator, action, inventory_types")
+    parser.add_argument("--action", choices=ACTIONS, help="Action for rows without an action column")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Browser contexts in the pool")
+    parser.add_argument("--storage-state", default=STORAGE_STATE, help="Logged-in session (auth.json)")
+    parser.add_argument("--base-url", default=ADMIN_BASE_URL, help="Admin base URL (e.g. fake_export_admin.py)")
+    parser.add_argument("--headed", action="store_true")
+    parser.add_argument("--dry-run", action="store_true", help="Print each dealer's plan without saving")
+    parser.add_argument("--trust-snapshots", action="store_true",
+                        help="Skip jobs that a fresh export_snapshots.py snapshot shows are already done")
+    args = parser.parse_args(argv)
+
+    jobs = read_jobs(args.jobs, args.action)
+    snapshots = skipped = None
+    if args.trust_snapshots:
+        from export_snapshots import ExportSnapshots
+        snapshots = ExportSnapshots()
+        skipped = [job for job in jobs if snapshots.diff(job) == []]
+        jobs = [job for job in jobs if snapshots.diff(job) != []]
+        print(f"⏭️  {len(skipped)} jobs already in the target state per snapshot")
+    print(f"🔧 {len(jobs)} jobs, {args.concurrency} browser contexts")
+    started = time.perf_counter()
+    results = asyncio.run(run_jobs(jobs, args.concurrency, args.storage_state, args.base_url, not args.headed,
+                                   dry_run=args.dry_run))
+    if snapshots is not None:
+        # Saved dealers no longer match their snapshot; the next crawl picks them up again
+        for result in results:
+            if result["status"] == "saved":
+                snapshots.invalidate(result["item"].dealer_id)
+        snapshots.save()
+    counts = {"snapshot_skipped": len(skipped)} if skipped else {}
+    for result in results:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+    print(f"📊 {counts} in {time.perf_counter() - started:.1f}s")
+    return 0 if not (counts.get("error") or counts.get("not_found")) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+import sys
+import time
+import html
+import random
+import argparse
+import threading
+from urllib.parse import urlsplit, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for the D2C admin's exportationbydealer.php so export_toggles.py (and the export
+# snapshot crawler) can run offline: one table row per syndicator with an _export checkbox and one per
+# inventory type, a Save button that posts the form back. Point them at it with --base-url server.url.
+
+DEFAULT_SYNDICATORS = (
+    "AutoTrader", "Kijiji", "CarGurus", "Car Media", "Dealer Socket", "vAuto", "Facebook Marketplace",
+    "Google VLA", "Inventory+", "PBS", "SERTI", "EasyDeal",
+)
+SUFFIXES = ("_export", "_use", "_new", "_demo")
+SUFFIX_LABELS = {"_export": "Export", "_use": "Usagé", "_new": "Neuf", "_demo": "Démonstrateur"}
+
+
+def checkbox_prefix(syndicator):
+    return "".join(ch for ch in syndicator.lower() if ch.isalnum())
+
+
+class FakeExportAdmin:
+    def __init__(self, dealers=("2618", "4320", "4462"), syndicators=DEFAULT_SYNDICATORS, host="127.0.0.1", port=0,
+                 latency=0.0, seed=0):
+        self.latency = latency
+        self.syndicators = tuple(syndicators)
+        rng = random.Random(seed)
+        # dealer_id -> syndicator -> suffix -> checked
+        self.state = {
+            str(dealer): {s: {suffix: rng.random() < 0.3 for suffix in SUFFIXES} for s in self.syndicators}
+            for dealer in dealers
+        }
+        self.page_loads = 0
+        self.saves = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/administration"
+
+    def render(self, dealer_id):
+        rows = ["<tr><th>#</th><th>Syndicator</th>" + "".join(f"<th>{SUFFIX_LABELS[s]}</th>" for s in SUFFIXES) + "</tr>"]
+        with self._lock:
+            settings = {s: dict(v) for s, v in self.state.get(dealer_id, {}).items()}
+        for i, (syndicator, boxes) in enumerate(settings.items(), 1):
+            mark = " ✓" if boxes["_export"] else ""
+            cells = "".join(
+                f'<td><input type="checkbox" name="{checkbox_prefix(syndicator)}{suffix}"'
+                f'{" checked" if boxes[suffix] else ""}></td>'
+                for suffix in SUFFIXES
+            )
+            rows.append(f"<tr><td>{i}</td><td>{html.escape(syndicator)}{mark}</td>{cells}</tr>")
+        return (
+            "<!DOCTYPE html><html><head><meta charset='utf-8'><title>Exportation</title></head><body>"
+            f"<h1>Exportation — dealer {html.escape(dealer_id)}</h1>"
+            f'<form method="post" action="exportationbydealer.php?id={html.escape(dealer_id)}">'
+            f"<table>{''.join(rows)}</table>"
+            '<input type="submit" value="Save"></form></body></html>'
+        )
+
+    def save(self, dealer_id, checked_names):
+        with self._lock:
+            self.saves += 1
+            for syndicator, boxes in self.state.get(dealer_id, {}).items():
+                prefix = checkbox_prefix(syndicator)
+                for suffix in SUFFIXES:
+                    boxes[suffix] = prefix + suffix in checked_names
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _page(self, dealer_id):
+                payload = server.render(dealer_id).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _dealer_id(self):
+                parts = urlsplit(self.path)
+                if not parts.path.endswith("/exportationbydealer.php"):
+                    return None
+                return (parse_qs(parts.query).get("id") or [""])[0]
+
+            def do_GET(self):
+                dealer_id = self._dealer_id()
+                if dealer_id is None:
+                    self.send_error(404)
+                    return
+                if server.latency:
+                    time.sleep(server.latency)
+                with server._lock:
+                    server.page_loads += 1
+                self._page(dealer_id)
+
+            def do_POST(self):
+                dealer_id = self._dealer_id()
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0)).decode("utf-8")
+                if dealer_id is None:
+                    self.send_error(404)
+                    return
+                if server.latency:
+                    time.sleep(server.latency)
+                # Unchecked boxes are simply absent from the form body, like a real browser submit
+                server.save(dealer_id, set(parse_qs(body, keep_blank_values=True)))
+                self._page(dealer_id)
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a fake exportationbydealer.php for offline runs.")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to sleep per request")
+    parser.add_argument("--all-dealers", action="store_true", help="One page per dealer in rep_dealer_mapping.csv")
+    args = parser.parse_args()
+    if args.all_dealers:
+        from dealer_index import get_dealer_index
+        kwargs = {"dealers": get_dealer_index().dealer_ids()}
+    else:
+        kwargs = {}
+    server = FakeExportAdmin(port=args.port, latency=args.latency, **kwargs)
+    print(f"🧪 Fake export admin on {server.url}/exportationbydealer.php?id=<dealer_id>")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        sys.exit(0)
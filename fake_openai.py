@@ -0,0 +1,321 @@
+import sys
+import json
+import time
+import hashlib
+import random
+import socket
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for the OpenAI HTTP API so batch runs and benchmarks work offline.
+# Point a client at it with base_url=server.url (or OPENAI_BASE_URL=http://127.0.0.1:<port>/v1).
+
+BLANK_FIELDS = {
+    "contact": "", "dealer_name": "", "dealer_id": "", "rep": "",
+    "category": "", "sub_category": "", "syndicator": "", "inventory_type": "",
+}
+
+
+def blank_responder(messages, model):
+    return {"zoho_fields": dict(BLANK_FIELDS), "zoho_comment": "", "suggested_reply": ""}
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+
+def conform(value, schema):
+    # What constrained decoding would produce: only schema keys, and enum strings outside the enum left blank
+    if schema.get("type") == "object":
+        value = value if isinstance(value, dict) else {}
+        return {key: conform(value.get(key), sub) for key, sub in schema.get("properties", {}).items()}
+    value = value if isinstance(value, str) else ""
+    return value if "enum" not in schema or value in schema["enum"] else ""
+
+
+class FakeOpenAIServer:
+    def __init__(self, responder=blank_responder, host="127.0.0.1", port=0, latency=0.0,
+                 error_rate=0.0, seed=None, chunk_size=8, chunk_delay=0.0, cache_min_tokens=1024,
+                 malformed_rate=0.0, batch_delay=0.0):
+        # responder(messages, model) returns the reply text, or a dict that is rendered the way a model
+        # would: a pretty-printed ```json block, or compact schema-shaped JSON under response_format
+        self.responder = responder
+        # Share of free-form dict replies that come back broken (cut off or with a trailing comma)
+        self.malformed_rate = malformed_rate
+        self.latency = latency
+        # Answers are "generated" chunk_size characters per chunk_delay; stream=True requests get them as SSE
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        # Provider-style prompt caching: prefixes of cache_min_tokens+ tokens, in 128-token steps
+        self.cache_min_tokens = cache_min_tokens
+        self._prefixes = set()
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+        self.connections = 0
+        # Batch API: uploaded files and batches live in memory; a batch completes batch_delay seconds
+        # after it is created (error_rate applies per request line, like the real error file)
+        self.batch_delay = batch_delay
+        self.files = {}
+        self.batches = {}
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive, so clients that pool connections reuse them (server.connections counts accepts)
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                with server._lock:
+                    server.connections += 1
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body, headers=()):
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for key, value in headers:
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _send_bytes(self, payload, content_type="application/octet-stream"):
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                parts = self.path.split("?", 1)[0].rstrip("/").split("/")
+                if len(parts) >= 2 and parts[-2] == "batches" and parts[-1] in server.batches:
+                    return self._send(200, server.batches[parts[-1]])
+                if len(parts) >= 3 and parts[-3] == "files" and parts[-1] == "content" and parts[-2] in server.files:
+                    return self._send_bytes(server.files[parts[-2]]["data"])
+                return self._send(404, {"error": {"message": f"unknown path {self.path}"}})
+
+            def do_POST(self):
+                raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                path = self.path.rstrip("/")
+                if path.endswith("/files"):
+                    return self._send(200, server.create_file(self.headers.get("Content-Type", ""), raw))
+                if path.endswith("/batches"):
+                    return self._send(200, server.create_batch(json.loads(raw or b"{}")))
+                body = json.loads(raw or b"{}")
+                with server._lock:
+                    server.requests += 1
+                    roll = server.random.random()
+                if server.latency:
+                    time.sleep(server.latency)
+                if roll < server.error_rate:
+                    with server._lock:
+                        server.errors += 1
+                    status = 429 if roll < server.error_rate / 2 else 500
+                    error = {"error": {"message": "fake upstream error", "type": "server_error", "code": status}}
+                    return self._send(status, error, [("Retry-After", "0")])
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    return self._send(404, {"error": {"message": f"unknown path {self.path}"}})
+                if body.get("stream"):
+                    return self._stream(server.chat_completion_chunks(body))
+                response = server.chat_completion(body)
+                if server.chunk_delay:
+                    # Non-streaming callers still wait for the whole answer to be "generated"
+                    content = response["choices"][0]["message"]["content"]
+                    time.sleep(server.chunk_delay * -(-len(content) // server.chunk_size))
+                return self._send(200, response)
+
+            def _stream(self, chunks):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.end_headers()
+                for i, chunk in enumerate(chunks):
+                    if i and server.chunk_delay:
+                        time.sleep(server.chunk_delay)
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+                self.close_connection = True
+
+        return Handler
+
+    def chat_completion(self, body):
+        messages = body.get("messages", [])
+        model = body.get("model", "")
+        content = self.render(self.responder(messages, model), body.get("response_format"))
+        prompt_tokens = sum(estimate_tokens(m.get("content") or "") for m in messages)
+        completion_tokens = estimate_tokens(content)
+        cached_tokens = self.cached_prefix_tokens(messages)
+        return {
+            "id": f"chatcmpl-fake-{self.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_tokens_details": {"cached_tokens": cached_tokens},
+            },
+        }
+
+    def render(self, answer, response_format=None):
+        schema = ((response_format or {}).get("json_schema") or {}).get("schema")
+        if schema is not None:
+            if isinstance(answer, str):
+                try:
+                    answer = json.loads(answer)
+                except json.JSONDecodeError:
+                    return answer
+            return json.dumps(conform(answer, schema), ensure_ascii=False, separators=(",", ":"))
+        if isinstance(answer, str):
+            return answer
+        text = json.dumps(answer, ensure_ascii=False, indent=2)
+        with self._lock:
+            roll = self.random.random()
+        if roll < self.malformed_rate / 2:
+            text = text[:len(text) * 2 // 3]
+        elif roll < self.malformed_rate:
+            text = text[:-2] + ",\n}"
+        return f"```json\n{text}\n```"
+
+    def create_file(self, content_type, raw):
+        from email.parser import BytesParser
+        from email.policy import HTTP
+        form = BytesParser(policy=HTTP).parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode("utf-8") + raw)
+        fields = {part.get_param("name", header="content-disposition"): part for part in form.iter_parts()}
+        upload = fields["file"]
+        return self._store_file(upload.get_payload(decode=True), fields["purpose"].get_content().strip(),
+                                upload.get_filename() or "upload.jsonl")
+
+    def _store_file(self, data, purpose, filename):
+        with self._lock:
+            file_id = f"file-fake-{len(self.files) + 1}"
+            self.files[file_id] = {"data": data}
+        return {"id": file_id, "object": "file", "bytes": len(data), "created_at": int(time.time()),
+                "filename": filename, "purpose": purpose, "status": "processed"}
+
+    def create_batch(self, body):
+        with self._lock:
+            batch_id = f"batch_fake_{len(self.batches) + 1}"
+            self.batches[batch_id] = batch = {
+                "id": batch_id, "object": "batch", "endpoint": body.get("endpoint"), "errors": None,
+                "input_file_id": body.get("input_file_id"), "completion_window": body.get("completion_window"),
+                "status": "validating", "output_file_id": None, "error_file_id": None,
+                "created_at": int(time.time()), "metadata": body.get("metadata"),
+                "request_counts": {"total": 0, "completed": 0, "failed": 0},
+            }
+        threading.Thread(target=self._run_batch, args=(batch_id,), daemon=True).start()
+        return dict(batch)
+
+    def _run_batch(self, batch_id):
+        batch = self.batches[batch_id]
+        lines = [json.loads(line) for line in self.files[batch["input_file_id"]]["data"].decode("utf-8").splitlines()
+                 if line.strip()]
+        batch["request_counts"]["total"] = len(lines)
+        batch["status"] = "in_progress"
+        time.sleep(self.batch_delay)
+        output, errors = [], []
+        for i, line in enumerate(lines):
+            with self._lock:
+                self.requests += 1
+                roll = self.random.random()
+            entry = {"id": f"batch_req_{i}", "custom_id": line["custom_id"], "error": None}
+            if roll < self.error_rate:
+                with self._lock:
+                    self.errors += 1
+                entry["response"] = {"status_code": 500, "request_id": f"req_{i}",
+                                     "body": {"error": {"message": "fake upstream error", "type": "server_error"}}}
+                errors.append(entry)
+            else:
+                entry["response"] = {"status_code": 200, "request_id": f"req_{i}", "body": self.chat_completion(line["body"])}
+                output.append(entry)
+        for key, entries in (("output_file_id", output), ("error_file_id", errors)):
+            if entries:
+                data = "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in entries).encode("utf-8")
+                batch[key] = self._store_file(data, "batch_output", f"{batch_id}_{key}.jsonl")["id"]
+        batch["request_counts"].update(completed=len(output), failed=len(errors))
+        batch["completed_at"] = int(time.time())
+        batch["status"] = "completed"
+
+    def cached_prefix_tokens(self, messages):
+        prompt = "".join(f"<{m.get('role')}>{m.get('content') or ''}" for m in messages)
+        boundaries = range(self.cache_min_tokens, estimate_tokens(prompt) + 1, 128)
+        keys = [hashlib.sha256(prompt[:tokens * 4].encode("utf-8")).digest() for tokens in boundaries]
+        cached = 0
+        with self._lock:
+            for tokens, key in zip(boundaries, keys):
+                if key not in self._prefixes:
+                    break
+                cached = tokens
+            self._prefixes.update(keys)
+        return cached
+
+    def chat_completion_chunks(self, body):
+        response = self.chat_completion(body)
+        content = response["choices"][0]["message"]["content"]
+        base = {key: response[key] for key in ("id", "created", "model")}
+        base["object"] = "chat.completion.chunk"
+        yield {**base, "choices": [{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}]}
+        for start in range(0, len(content), self.chunk_size):
+            delta = {"content": content[start:start + self.chunk_size]}
+            yield {**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+        yield {**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+        if (body.get("stream_options") or {}).get("include_usage"):
+            yield {**base, "choices": [], "usage": response["usage"]}
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local fake OpenAI API for offline testing.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to sleep per request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 429/500")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="Seconds between streamed chunks")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="Fraction of free-form replies sent broken")
+    parser.add_argument("--batch-delay", type=float, default=0.0, help="Seconds before a submitted batch completes")
+    args = parser.parse_args()
+    server = FakeOpenAIServer(port=args.port, latency=args.latency, error_rate=args.error_rate,
+                              chunk_delay=args.chunk_delay, malformed_rate=args.malformed_rate,
+                              batch_delay=args.batch_delay)
+    print(f"🧪 Fake OpenAI listening on {server.url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        sys.exit(0)
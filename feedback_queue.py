@@ -0,0 +1,172 @@
+import os
+import sys
+import json
+import time
+import uuid
+import queue
+import atexit
+import threading
+
+from http_transport import get_http_client
+
+# "This classification is incorrect" submissions to the Google Form. The UI only appends to a local
+# spool and enqueues; a background thread posts over the shared HTTP pool, retries with backoff, and
+# removes an entry from the spool once the form accepted it. Whatever is still spooled at exit is
+# sent again on the next start; an entry the form rejects outright moves to <spool>.rejected instead.
+
+FEEDBACK_FORM_URL = os.getenv(
+    "CLASSIFIER_FEEDBACK_URL",
+    "https://docs.google.com/forms/d/e/1FAIpQLSfIJgy3DdtSQsZN6G4asdZyiWaf2Qb-8_9fwQLxp74sFTMx4g/formResponse",
+)
+FEEDBACK_SPOOL_PATH = os.getenv("CLASSIFIER_FEEDBACK_SPOOL", "feedback_spool.jsonl")
+FEEDBACK_MAX_ATTEMPTS = 5
+FEEDBACK_TIMEOUT = 10.0
+
+# Google Form field ids for the feedback sheet
+FORM_FIELDS = {
+    "timestamp": "entry.2041497043",
+    "edge_case": "entry.827201251",
+    "zoho_fields": "entry.1216884505",
+    "zoho_comment": "entry.1859746012",
+    "input_text": "entry.91556361",
+}
+
+
+def form_payload(entry):
+    return {field: entry.get(key, "") for key, field in FORM_FIELDS.items()}
+
+
+class FeedbackQueue:
+    def __init__(self, url=FEEDBACK_FORM_URL, spool_path=FEEDBACK_SPOOL_PATH, max_attempts=FEEDBACK_MAX_ATTEMPTS,
+                 backoff=1.0, post=None):
+        self.url = url
+        self.spool_path = spool_path
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.post = post or self._post
+        self.rejected_path = spool_path + ".rejected"
+        self.sent = 0
+        self.failed = 0
+        self._spooled = {}
+        self._spool_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._stop = object()
+        for item in self._read_spool():
+            # Entries that gave up last run get a fresh set of attempts
+            item["attempts"] = 0
+            self._spooled[item["id"]] = item
+            self._queue.put(item)
+        self._thread = threading.Thread(target=self._run, name="feedback-queue", daemon=True)
+        self._thread.start()
+
+    def submit(self, payload):
+        # Returns immediately; the entry is on disk before this returns
+        item = {"id": uuid.uuid4().hex, "payload": payload, "attempts": 0, "queued_at": time.time()}
+        with self._spool_lock:
+            self._spooled[item["id"]] = item
+            with open(self.spool_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(item, ensure_ascii=False) + "\n")
+        self._queue.put(item)
+        return item["id"]
+
+    @property
+    def pending(self):
+        return len(self._spooled)
+
+    def flush(self, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return not self._queue.unfinished_tasks
+
+    def close(self, timeout=2.0):
+        if self._thread.is_alive():
+            self._queue.put(self._stop)
+            self._thread.join(timeout)
+
+    def _post(self, payload):
+        resp = get_http_client().post(self.url, data=payload, timeout=FEEDBACK_TIMEOUT)
+        return resp.status_code
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is self._stop:
+                    return
+                self._deliver(item)
+            finally:
+                self._queue.task_done()
+
+    def _deliver(self, item):
+        while True:
+            item["attempts"] += 1
+            try:
+                status = self.post(item["payload"])
+            except Exception as e:
+                status, error = None, repr(e)
+            else:
+                error = f"HTTP {status}"
+            if status is not None and status < 400:
+                self.sent += 1
+                self._forget(item)
+                return
+            # 4xx other than 429 means the form rejected the fields; retrying will not change that
+            permanent = status is not None and status < 500 and status != 429
+            if permanent:
+                # Kept for a look at the payload, but out of the spool so no restart posts it again
+                self.failed += 1
+                self._reject(item, error)
+                print(f"❌ Feedback rejected by the form ({error}); moved to {self.rejected_path}", file=sys.stderr)
+                return
+            if item["attempts"] >= self.max_attempts:
+                self.failed += 1
+                print(f"❌ Feedback not delivered after {item['attempts']} attempt(s) ({error}); "
+                      f"kept in {self.spool_path}", file=sys.stderr)
+                return
+            time.sleep(min(30.0, self.backoff * 2 ** (item["attempts"] - 1)))
+
+    def _reject(self, item, error):
+        with self._spool_lock:
+            with open(self.rejected_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({**item, "error": error, "rejected_at": time.time()}, ensure_ascii=False) + "\n")
+        self._forget(item)
+
+    def _forget(self, item):
+        with self._spool_lock:
+            self._spooled.pop(item["id"], None)
+            tmp = self.spool_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                for entry in self._spooled.values():
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            os.replace(tmp, self.spool_path)
+
+    def _read_spool(self):
+        if not os.path.exists(self.spool_path):
+            return []
+        items = []
+        with open(self.spool_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    items.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+        return items
+
+
+_feedback_queue = None
+_feedback_lock = threading.Lock()
+
+
+def get_feedback_queue():
+    global _feedback_queue
+    if _feedback_queue is None:
+        with _feedback_lock:
+            if _feedback_queue is None:
+                _feedback_queue = FeedbackQueue()
+                atexit.register(_feedback_queue.close)
+    return _feedback_queue
+
+
+def submit_feedback(entry):
+    return get_feedback_queue().submit(form_payload(entry))
@@ -0,0 +1,238 @@
+import os
+import re
+import csv
+import math
+import threading
+import unicodedata
+from classification_log import CONFIRMED_PATH, get_logger, read_confirmed
+from result_cache import normalize_ticket_text
+from prompt_templates import FEWSHOT_SEEDS, CATEGORIES, SUB_CATEGORIES, INVENTORY_TYPES
+
+# Few-shot examples picked per ticket instead of the same three every time: TF-IDF over word and
+# character-trigram terms (accent-folded, so French and English spellings meet), rows L2-normalised
+# in a NumPy matrix, top-k by one matrix-vector product. The pool is the labelled example CSVs (rows
+# paired by position, as in benchmark.py) and entries someone marked as correct in the app
+# (classification_log.CONFIRMED_PATH); the hand-written seeds are only the fallback when nothing scores
+# above the minimum. Rebuilt in the background when any of those files changes; searches keep using the
+# previous build meanwhile.
+
+FEWSHOT_K = int(os.getenv("CLASSIFIER_FEWSHOT_K", "3"))
+FEWSHOT_MIN_SCORE = float(os.getenv("CLASSIFIER_FEWSHOT_MIN_SCORE", "0.1"))
+
+# (input CSV, expected-output CSV)
+EXAMPLE_SUITES = (
+    ("classifier_input_examples.csv", "classifier_expected_output.csv"),
+    ("Classifier_Complex_Input_Examples.csv", "Classifier_Complex_Expected_Output.csv"),
+)
+
+# expected-output column -> zoho_fields key
+FIELD_COLUMNS = {
+    "Contact": "contact",
+    "Dealer Name": "dealer_name",
+    "Dealer ID": "dealer_id",
+    "Category": "category",
+    "Sub Category": "sub_category",
+    "Syndicator": "syndicator",
+    "Inventory Type": "inventory_type",
+}
+EXAMPLE_FIELDS = ("contact", "dealer_name", "dealer_id", "rep", "category", "sub_category", "syndicator", "inventory_type")
+
+# Dropdown fields an example may only show allowed values for (older sheets use "Both", "Photos", ...)
+ALLOWED_VALUES = {"category": CATEGORIES, "sub_category": SUB_CATEGORIES, "inventory_type": INVENTORY_TYPES}
+VALUE_ALIASES = {"Both": "New + Used"}
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def fold(text):
+    # Lowercase ASCII: accents dropped (é -> e), anything else non-ASCII is a word break anyway
+    text = text.lower()
+    if text.isascii():
+        return text
+    return unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+
+
+def term_counts(text):
+    counts = {}
+    for word in _WORD_RE.findall(fold(text)):
+        if len(word) > 1:
+            key = "w:" + word
+            counts[key] = counts.get(key, 0) + 1
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            gram = padded[i:i + 3]
+            counts[gram] = counts.get(gram, 0) + 1
+    return counts
+
+
+def clean_fields(fields):
+    clean = {}
+    for key in EXAMPLE_FIELDS:
+        value = str(fields.get(key) or "").strip()
+        value = VALUE_ALIASES.get(value, value)
+        if key in ALLOWED_VALUES and value not in ALLOWED_VALUES[key]:
+            value = ""
+        clean[key] = value
+    return clean
+
+
+def labels_match(message, fields):
+    # Rows are paired by position, so a sheet that falls out of step pairs tickets with someone else's
+    # labels; keep a pair only if its syndicator or dealer actually appears in the message
+    text = fold(message)
+    names = [s for s in fields.get("syndicator", "").split(",")] + [fields.get("dealer_name", "")]
+    return any(name.strip() and fold(name.strip()) in text for name in names)
+
+
+def read_suite(input_path, expected_path):
+    if not (os.path.exists(input_path) and os.path.exists(expected_path)):
+        return []
+    with open(input_path, newline="", encoding="utf-8") as f:
+        messages = [row.get("message", "") for row in csv.DictReader(f)]
+    with open(expected_path, newline="", encoding="utf-8") as f:
+        expected = list(csv.DictReader(f))
+    pairs = [(message, {key: row.get(column, "") for column, key in FIELD_COLUMNS.items()})
+             for message, row in zip(messages, expected) if message.strip()]
+    return [(message, fields) for message, fields in pairs if labels_match(message, fields)]
+
+
+def confirmed_examples(path=CONFIRMED_PATH):
+    examples = []
+    for entry in read_confirmed(path):
+        output = entry.get("output")
+        if isinstance(output, dict) and isinstance(output.get("zoho_fields"), dict):
+            examples.append((entry.get("input", ""), output["zoho_fields"]))
+    return examples
+
+
+def load_examples(suites=EXAMPLE_SUITES, confirmed_path=CONFIRMED_PATH):
+    # One example per distinct ticket text; later sources win (a confirmed log entry over a CSV row)
+    examples = {}
+    sources = [read_suite(*suite) for suite in suites]
+    sources.append(confirmed_examples(confirmed_path))
+    for source in sources:
+        for message, fields in source:
+            key = normalize_ticket_text(message)
+            if key:
+                examples[key] = (message.strip(), clean_fields(fields))
+    return examples
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+class FewShotIndex:
+    def __init__(self, suites=EXAMPLE_SUITES, confirmed_path=CONFIRMED_PATH):
+        self.suites = tuple(suites)
+        self.confirmed_path = confirmed_path
+        self.signature = None
+        # (keys, examples, vocabulary, idf, matrix), swapped as one so a search never mixes two builds
+        self._state = ([], [], {}, None, None)
+        self._lock = threading.Lock()
+        self._building = False
+        self.refresh(wait=True)
+
+    def _signature(self):
+        paths = [path for suite in self.suites for path in suite] + [self.confirmed_path]
+        return tuple(_mtime(path) for path in paths)
+
+    def refresh(self, wait=False):
+        # A changed file starts one rebuild in a background thread (inline when `wait`); the request that
+        # noticed it keeps the current examples
+        signature = self._signature()
+        if signature == self.signature:
+            return False
+        with self._lock:
+            if signature == self.signature or self._building:
+                return False
+            self._building = True
+        if wait:
+            self._rebuild(signature)
+        else:
+            threading.Thread(target=self._rebuild, args=(signature,), name="fewshot-index", daemon=True).start()
+        return True
+
+    def _rebuild(self, signature):
+        try:
+            self._build(load_examples(self.suites, self.confirmed_path))
+            self.signature = signature
+        except Exception as e:
+            get_logger().warning("few-shot index rebuild failed: %r", e)
+        finally:
+            self._building = False
+
+    def _build(self, examples):
+        import numpy as np
+        keys = list(examples)
+        counts = [term_counts(message) for message, _ in examples.values()]
+        vocabulary = {}
+        df = []
+        for doc in counts:
+            for term in doc:
+                j = vocabulary.setdefault(term, len(vocabulary))
+                if j == len(df):
+                    df.append(0)
+                df[j] += 1
+        idf = np.log((1 + len(counts)) / (1 + np.array(df, dtype=np.float32))) + 1
+        matrix = np.zeros((len(counts), len(vocabulary)), dtype=np.float32)
+        for i, doc in enumerate(counts):
+            for term, count in doc.items():
+                matrix[i, vocabulary[term]] = 1 + math.log(count)
+        matrix *= idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms == 0, 1, norms)
+        self._state = (keys, list(examples.values()), vocabulary, idf, matrix)
+
+    def search(self, text, k=FEWSHOT_K, min_score=FEWSHOT_MIN_SCORE):
+        # [(score, message, fields)], best first. The ticket's own text is never its example: an exact
+        # repeat is the result cache's job, and it keeps the benchmark from grading the answer key.
+        import numpy as np
+        keys, examples, vocabulary, idf, matrix = self._state
+        if k <= 0 or not examples:
+            return []
+        query = np.zeros(len(vocabulary), dtype=np.float32)
+        for term, count in term_counts(text).items():
+            j = vocabulary.get(term)
+            if j is not None:
+                query[j] = 1 + math.log(count)
+        query *= idf
+        norm = float(np.linalg.norm(query))
+        if not norm:
+            return []
+        scores = matrix @ (query / norm)
+        key = normalize_ticket_text(text)
+        if key in keys:
+            scores[keys.index(key)] = -1.0
+        top = np.argsort(-scores)[:k] if len(scores) <= 4 * k else np.argpartition(-scores, k)[:k]
+        top = sorted(top, key=lambda i: -scores[i])
+        return [(float(scores[i]), *examples[i]) for i in top if scores[i] >= min_score]
+
+    def __len__(self):
+        return len(self._state[1])
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_fewshot_index():
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = FewShotIndex()
+        return _index
+    _index.refresh()
+    return _index
+
+
+def similar_examples(text, k=FEWSHOT_K):
+    # (message, zoho_fields) pairs for build_messages; the seeds when nothing similar enough was found
+    if k <= 0:
+        return []
+    found = [(message, fields) for _, message, fields in get_fewshot_index().search(text, k)]
+    return found or [(message, clean_fields(fields)) for message, fields in FEWSHOT_SEEDS[:k]]
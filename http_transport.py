@@ -0,0 +1,73 @@
+import os
+import sys
+import threading
+import importlib.util
+
+# One pooled HTTP client per process, shared by the OpenAI client and the feedback queue, so TLS
+# handshakes happen once per connection instead of once per call. openai is imported on first use
+# (start-up budget).
+
+# Model calls can take a while to answer, but a dead endpoint should fail fast
+HTTP_CONNECT_TIMEOUT = float(os.getenv("CLASSIFIER_HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("CLASSIFIER_HTTP_READ_TIMEOUT", "60"))
+HTTP_WRITE_TIMEOUT = 10.0
+HTTP_POOL_TIMEOUT = 5.0
+HTTP_MAX_CONNECTIONS = int(os.getenv("CLASSIFIER_HTTP_MAX_CONNECTIONS", "20"))
+# The library default (5 s) drops the connection between two tickets pasted into the app
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("CLASSIFIER_HTTP_KEEPALIVE", "120"))
+HTTP2_ENABLED = os.getenv("CLASSIFIER_HTTP2", "1") != "0"
+OPENAI_MAX_RETRIES = 2
+
+_client = None
+_openai = None
+_lock = threading.RLock()
+
+
+def http_library():
+    # The HTTP library the installed openai SDK is built on (httpx, or httpx2 in newer releases)
+    import openai
+    base = next(cls for cls in openai.DefaultHttpxClient.__mro__ if not cls.__module__.startswith("openai"))
+    return sys.modules[base.__module__.split(".")[0]]
+
+
+def http2_available():
+    # HTTP/2 needs the optional h2 package (pip install h2); without it connections stay on HTTP/1.1
+    return HTTP2_ENABLED and importlib.util.find_spec("h2") is not None
+
+
+def client_options():
+    lib = http_library()
+    return {
+        "http2": http2_available(),
+        "timeout": lib.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT, write=HTTP_WRITE_TIMEOUT,
+                               pool=HTTP_POOL_TIMEOUT),
+        "limits": lib.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_CONNECTIONS,
+                             keepalive_expiry=HTTP_KEEPALIVE_EXPIRY),
+    }
+
+
+def get_http_client():
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                import openai
+                _client = openai.DefaultHttpxClient(**client_options())
+    return _client
+
+
+def make_async_http_client():
+    # Async pools belong to one event loop, so each asyncio.run gets its own
+    import openai
+    return openai.DefaultAsyncHttpxClient(**client_options())
+
+
+def get_openai_client():
+    global _openai
+    if _openai is None:
+        with _lock:
+            if _openai is None:
+                from openai import OpenAI
+                _openai = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=OPENAI_MAX_RETRIES,
+                                 http_client=get_http_client())
+    return _openai
@@ -0,0 +1,98 @@
+import json
+
+_WHITESPACE = " \t\r\n"
+
+
+class IncrementalJSONParser:
+    """Feed a JSON document in arbitrary chunks; get back (path, value) for every scalar as soon as it closes."""
+
+    def __init__(self):
+        self._stack = []      # [is_object, key_or_index] per open container
+        self._expect_key = False
+        self._string = None   # raw characters of the string being read (escapes kept)
+        self._escape = False
+        self._scalar = None   # characters of a number / true / false / null
+        self.started = False
+        self.done = False
+        # Set when the text stops being valid JSON (e.g. a preamble with a bracket in it); no more events after
+        self.failed = False
+
+    @property
+    def path(self):
+        return tuple(key for _, key in self._stack)
+
+    def feed(self, chunk):
+        # Never raises: on invalid input it returns what it had and goes quiet, and the caller parses the
+        # whole reply once it is complete (llm_classifier.parse_or_repair)
+        events = []
+        try:
+            self._feed(chunk, events)
+        except (ValueError, IndexError):
+            self.failed = True
+        return events
+
+    def _feed(self, chunk, events):
+        for ch in chunk:
+            if self.done or self.failed:
+                break
+            if self._string is not None:
+                self._read_string(ch, events)
+                continue
+            if self._scalar is not None:
+                if ch not in ",}]" and ch not in _WHITESPACE:
+                    self._scalar.append(ch)
+                    continue
+                self._emit(json.loads("".join(self._scalar)), events)
+                self._scalar = None
+            if not self.started:
+                # Skip ```json fences or any preamble before the document
+                if ch not in "{[":
+                    continue
+                self.started = True
+            self._structural(ch, events)
+
+    def _read_string(self, ch, events):
+        if self._escape:
+            self._escape = False
+        elif ch == "\\":
+            self._escape = True
+        elif ch == '"':
+            value = json.loads('"' + "".join(self._string) + '"')
+            self._string = None
+            if self._expect_key:
+                self._stack[-1][1] = value
+            else:
+                self._emit(value, events)
+            return
+        self._string.append(ch)
+
+    def _structural(self, ch, events):
+        if ch in _WHITESPACE:
+            return
+        if ch == "{":
+            self._stack.append([True, None])
+            self._expect_key = True
+        elif ch == "[":
+            self._stack.append([False, 0])
+            self._expect_key = False
+        elif ch in "}]":
+            self._stack.pop()
+            self._expect_key = False
+            if not self._stack:
+                self.done = True
+        elif ch == '"':
+            self._string = []
+        elif ch == ":":
+            self._expect_key = False
+        elif ch == ",":
+            frame = self._stack[-1]
+            if frame[0]:
+                frame[1] = None
+                self._expect_key = True
+            else:
+                frame[1] += 1
+        else:
+            self._scalar = [ch]
+
+    def _emit(self, value, events):
+        events.append((self.path, value))
@@ -0,0 +1,96 @@
+from collections import deque
+
+
+class KeywordAutomaton:
+    """Aho-Corasick matcher: finds every keyword occurrence in one pass over the text."""
+
+    def __init__(self, keywords=None, word_boundary=True):
+        self.word_boundary = word_boundary
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        self._matches = self._out
+        self._built = False
+        for keyword, value in (keywords or {}).items():
+            self.add(keyword, value)
+
+    def add(self, keyword, value=None):
+        keyword = keyword.lower()
+        if not keyword:
+            return
+        node = 0
+        for ch in keyword:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append((len(keyword), keyword if value is None else value))
+        self._built = False
+
+    def build(self):
+        goto, fail = self._goto, self._fail
+        out = self._matches = [list(o) for o in self._out]
+        queue = deque()
+        for ch, nxt in goto[0].items():
+            queue.append(nxt)
+            fail[nxt] = self._terminal(ch)
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in goto[node].items():
+                queue.append(nxt)
+                f = fail[node]
+                while f > 0 and ch not in goto[f]:
+                    f = fail[f]
+                if f >= 0 and ch in goto[f]:
+                    fail[nxt] = goto[f][ch]
+                    out[nxt] = out[nxt] + out[fail[nxt]]
+                else:
+                    fail[nxt] = self._terminal(ch)
+        self._built = True
+        return self
+
+    def _terminal(self, ch):
+        # With word boundaries a keyword can only start right after a non-alphanumeric character, so
+        # fail links skip suffixes that begin mid-word and end in DEAD (-1) after a letter or digit
+        return -1 if self.word_boundary and ch.isalnum() else 0
+
+    def find_all(self, text):
+        if not self._built:
+            self.build()
+        goto, fail, out = self._goto, self._fail, self._matches
+        word_boundary = self.word_boundary
+        lowered = text.lower()
+        # str.lower() can change length for a few code points; spans then index the lowered text
+        check = lowered if len(lowered) != len(text) else text
+        size = len(check)
+        matches = []
+        node = 0
+        for i, ch in enumerate(lowered):
+            if node < 0:
+                # Inside a word that no keyword can start in: wait for the next separator
+                if not ch.isalnum():
+                    node = 0
+                continue
+            nxt = goto[node].get(ch)
+            while nxt is None and node > 0:
+                node = fail[node]
+                nxt = goto[node].get(ch) if node >= 0 else None
+            if nxt is None:
+                node = -1 if word_boundary and ch.isalnum() else 0
+                continue
+            node = nxt
+            for length, value in out[node]:
+                end = i + 1
+                # Starts are on a boundary by construction; only the character after the match is left
+                if word_boundary and end < size and check[end].isalnum():
+                    continue
+                matches.append((end - length, end, value))
+        matches.sort(key=lambda m: (m[0], -m[1]))
+        return matches
+
+    def __len__(self):
+        return len(self._goto)
@@ -1,145 +1,404 @@
 import os
 import re
 import json
-import pandas as pd
-from openai import OpenAI
-from dealer_utils import preprocess_ticket, lookup_dealer_by_name, format_zoho_comment, detect_edge_case
+import time
+from dealer_utils import (
+    format_zoho_comment, detect_edge_case, fuzzy_lookup_dealer,
+    DEALER_BLOCKLIST, FUZZY_DEALER_CUTOFF,
+)
+from dealer_index import get_dealer_index
+from email_thread import prepare_thread
+from fewshot_index import similar_examples
+from http_transport import get_openai_client
+from json_stream import IncrementalJSONParser
+from prompt_templates import (
+    PROMPT_FINGERPRINT, RESPONSE_FORMAT, build_messages, repair_messages,
+)
+from syndicator_index import get_syndicator_index
+from result_cache import get_result_cache, make_cache_key
+from tracing import start_trace, NULL_TRACE
+from classification_log import get_logger, write_log
+from rule_classifier import classify_with_rules, is_confident, RULE_CONFIDENCE_THRESHOLD
+from ticket_model import local_prediction, MODEL_MIN_PROB
+from model_router import Route, route_fingerprint, RULE_CHECKED_FIELDS
 from datetime import datetime
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Strict JSON-schema responses (enum-constrained dropdowns, no fences to strip); set to 0 for models
+# without structured-output support
+STRUCTURED_OUTPUT = os.getenv("CLASSIFIER_STRUCTURED_OUTPUT", "1") != "0"
+# Unparseable replies get up to REPAIR_RETRIES round trips to a cheaper model with just the broken reply
+REPAIR_MODEL = os.getenv("CLASSIFIER_REPAIR_MODEL", "gpt-4o-mini")
+REPAIR_RETRIES = int(os.getenv("CLASSIFIER_REPAIR_RETRIES", "1"))
+REPAIR_MAX_TOKENS = 300
 
-try:
-    mapping_df = pd.read_csv("rep_dealer_mapping.csv")
-    mapping_df["Dealer Name"] = mapping_df["Dealer Name"].astype(str).str.lower().str.strip()
-    dealer_to_rep = mapping_df.set_index("Dealer Name")["Rep Name"].to_dict()
-    dealer_to_id  = mapping_df.set_index("Dealer Name")["Dealer ID"].to_dict()
-except Exception as e:
-    raise RuntimeError(f"❌ FATAL: Could not load 'rep_dealer_mapping.csv'. Reason: {e}")
+# Built on first use: importing openai and reading the mapping cost more than the rest of start-up.
+# Shares the process-wide connection pool (http_transport); assign a client here to override it.
+client = None
 
-def classify_ticket(text: str, model="gpt-4o"):
-    context = preprocess_ticket(text)
-    dealer_list = context.get("dealers_found", [])
-    dealer_candidates = []
+def get_client():
+    global client
+    if client is None:
+        client = get_openai_client()
+    return client
+
+def load_dealer_index():
+    try:
+        return get_dealer_index()
+    except Exception as e:
+        raise RuntimeError(f"❌ FATAL: Could not load 'rep_dealer_mapping.csv'. Reason: {e}")
+
+def classify_ticket(text: str, model="gpt-4o", use_cache=True, rule_threshold=RULE_CONFIDENCE_THRESHOLD, trace=None):
+    trace = start_trace(trace)
+    data = _classify_ticket(text, model, use_cache, rule_threshold, trace)
+    add_export_status(data)
+    if trace.enabled:
+        data["trace"] = trace.to_dict()
+        trace.write_jsonl()
+    return data
+
+def answer_inputs(examples, rules, prediction):
+    # What shapes this ticket's LLM answer besides its text: the few-shot examples retrieved for it and the
+    # rule / local-model labels confident enough to escalate an answer. Part of its cache key, so a
+    # confirmed example or a retrained model only misses the tickets it actually changes.
+    fields, confidence = rules
+    return {
+        "examples": examples,
+        "rules": {f: fields[f] for f in RULE_CHECKED_FIELDS
+                  if fields.get(f) and confidence.get(f, 0.0) >= RULE_CONFIDENCE_THRESHOLD},
+        "model": {f: label for f, (label, probability) in (prediction or {}).items() if probability >= MODEL_MIN_PROB},
+    }
+
+def cache_fingerprint(model, structured=None, inputs=None):
+    # Everything besides the ticket, the model and the dealer mapping that changes an answer: prompt,
+    # reply format, routing policy and the ticket's answer_inputs(). A change to any of them is a cache miss.
+    structured = STRUCTURED_OUTPUT if structured is None else structured
+    return "\x1f".join([
+        PROMPT_FINGERPRINT, "structured" if structured else "free-form", route_fingerprint(model),
+        json.dumps(inputs, ensure_ascii=False, sort_keys=True),
+    ])
 
-    FEMSHOT = """
-Example 1:
-Message:
-"Hi Véronique, Mazda Steele is still showing vehicles that were sold last week. Request to check the PBS import."
-
-Zoho Fields:
-{
-  "contact": "Véronique Fournier",
-  "dealer_name": "Mazda Steele",
-  "dealer_id": "2618",
-  "rep": "Véronique Fournier",
-  "category": "Problem / Bug",
-  "sub_category": "Import",
-  "syndicator": "PBS",
-  "inventory_type": ""
-}
-
-Example 2:
-Message:
-"Hi, we’d like to activate a Car Media export for our new and used vehicles at Lallier Kia Laval."
-
-Zoho Fields:
-{
-  "contact": "",
-  "dealer_name": "Lallier Kia Laval",
-  "dealer_id": "",
-  "rep": "",
-  "category": "Product Activation – Existing Client",
-  "sub_category": "Export",
-  "syndicator": "Car Media",
-  "inventory_type": "New + Used"
-}
-Example 3:
-Message:
-"Can we please create a feed from each of the ffun group stores to export to Dealer Socket?"
-
-Zoho Fields:
-{
-  "contact": "Nathan Griffith",
-  "dealer_name": "Ffun Auto Group",
-  "dealer_id": "4320",
-  "rep": "Nathan Griffith",
-  "category": "Product Activation – Existing Client",
-  "sub_category": "Export",
-  "syndicator": "Dealer Socket",
-  "inventory_type": ""
-}
-"""
-
-    SYSTEM_PROMPT = (
-        "You are a Zoho Desk classification assistant. Only use these allowed dropdown values:\n"
-        "- Category: Product Activation – New Client, Product Activation – Existing Client, Product Cancellation, Problem / Bug, General Question, Analysis / Review, Other.\n"
-        "- Sub Category: Import, Export, Sales Data Import, FB Setup, Google Setup, Other Department, Other, AccuTrade.\n"
-        "- Inventory Type: New, Used, Demo, New + Used, or blank.\n\n"
-        "Important logic rules:\n"
-        "- Only use real dealership rooftops as dealer_name (not group names like 'Kot Auto Group')\n"
-        "- If a group name is used, try to extract the actual rooftop from examples or filenames\n"
-        "- Never use 'Olivier Rizk-Taillandier' as rep unless the sender is actually him\n"
-        "- The 'syndicator' field must refer to the export target (where D2C is sending the feed), not the data source or origin (e.g. Inventory+, PBS, SERTI)\n"
-        "- If any field is uncertain or missing, leave it blank — logic will complete it\n"
-        "- Do not infer — only return grounded field values\n"
-        "- Return a JSON object with ALL keys present and fill missing keys with empty string\n"
-        "- Do not include markdown (e.g. ```json) or explanation. Return only raw JSON\n"
-        "- Do not invent or guess Dealer ID — use mapping or leave blank\n"
-        + FEMSHOT +
-        "\nNow classify the following message and return ONLY the JSON object as exactly specified:"
+def answer_cache_key(text, model, examples, rules, prediction, structured=None):
+    return make_cache_key(
+        text, model, cache_fingerprint(model, structured, answer_inputs(examples, rules, prediction)),
+        get_dealer_index().digest,
     )
 
-    USER_PROMPT = f"""
-Message:
-{text}
-
-Return a JSON object exactly as follows, with ALL keys present (use empty strings if unknown):
-{{
-  "zoho_fields": {{
-    "contact": "",
-    "dealer_name": "",
-    "dealer_id": "",
-    "rep": "",
-    "category": "",
-    "sub_category": "",
-    "syndicator": "",
-    "inventory_type": ""
-  }},
-  "zoho_comment": "",
-  "suggested_reply": ""
-}}
-"""
-
-    # Optional inline hints for edge cases
-    if context.get("image_flags"):
-        USER_PROMPT = "[Contains image/photo keywords]\n" + USER_PROMPT
-    if context.get("contains_stock_number"):
-        USER_PROMPT = "[Contains stock number]\n" + USER_PROMPT
-    if dealer_list:
-        SYSTEM_PROMPT = f"Detected dealer candidates: {', '.join(dealer_list)}\n\n" + SYSTEM_PROMPT
+def _classify_ticket(text, model, use_cache, rule_threshold, trace):
+    with trace.span("dealer_index"):
+        load_dealer_index()
+    with trace.span("preprocess") as span:
+        # Threads: classify the newest message, earlier ones only contribute entities and a summary
+        message, context, history = prepare_thread(text)
+        span.set(
+            dealers_found=len(context.dealers_found),
+            syndicators=len(context.syndicators),
+            thread_messages=len(history) + 1,
+        )
+    with trace.span("local_model") as span:
+        prediction = local_prediction(message)
+        span.set(available=prediction is not None)
+    with trace.span("rules") as span:
+        rules = local_rules(message, context, prediction)
+        data = classify_by_rules(message, context, rule_threshold, trace, rules=rules)
+        span.set(accepted=data is not None)
+    if data is not None:
+        trace.set(tier="rules")
+        return data
+
+    with trace.span("fewshot") as span:
+        examples = similar_examples(message)
+        span.set(examples=len(examples))
+    # Only LLM answers are cached, keyed on what goes into them, so the lookup comes after the rules tier
+    cache = get_result_cache() if use_cache else None
+    cache_key = None
+    if cache is not None:
+        with trace.span("cache_lookup") as span:
+            cache_key = answer_cache_key(text, model, examples, rules, prediction)
+            cached = cache.get(cache_key)
+            span.set(hit=cached is not None)
+        trace.set(cache_hit=cached is not None)
+        if cached is not None:
+            trace.set(tier=cached.get("tier", ""))
+            return cached
+    messages = build_messages(message, context, history, structured=STRUCTURED_OUTPUT, examples=examples)
+    # Cheap model first (model_router.py); the requested model only when its answer fails a check
+    route = Route(model, context, rules, REPAIR_MODEL)
+    for route_model in route:
+        try:
+            with trace.span("llm", model=route_model) as span:
+                started = time.perf_counter()
+                resp = get_client().chat.completions.create(
+                    model=route_model, messages=messages, temperature=0.2, **response_options(),
+                )
+                raw = reply_text(resp)
+                usage = usage_counts(getattr(resp, "usage", None), started)
+                span.set(**usage)
+            with trace.span("parse") as span:
+                parsed = parse_or_repair(raw, usage)
+                span.set(repairs=usage["repairs"])
+        except Exception as e:
+            get_logger().error("LLM call to %s failed: %r", route_model, e)
+            route.failed(route_model, e)
+            continue
+        data = finalize_result(text, context, parsed, trace)
+        add_model_check(data, prediction)
+        route.answer(route_model, data, usage)
+
+    data = route.result()
+    if "error" in data:
+        return data
+    trace.set(tier="llm", model=data["model"], escalations=len(data.get("escalations", {})))
+    return store_result(cache, cache_key, data, trace)
+
+def store_result(cache, cache_key, data, trace=NULL_TRACE):
+    # Shared by classify_ticket, the stream and batch_classifier. A fallback answer from a failed
+    # escalation is not cached, so the next request gets another chance at the escalation.
+    if cache is not None and "error" not in data and "escalation_failed" not in data:
+        with trace.span("cache_store"):
+            cache.put(cache_key, data)
+    return data
+
+def usage_counts(usage, started=None):
+    # Token usage + model latency for the log/trace; cached_tokens is the part of the prompt served
+    # from the provider's prefix cache (billed at a discount, and faster)
+    counts = {
+        "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+        "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+        "cached_tokens": getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", 0) or 0,
+        "repairs": 0,
+    }
+    if started is not None:
+        counts["llm_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return counts
+
+def add_repair_usage(usage, repair):
+    # Repair calls go to a different (cheaper) model, so they are counted apart from the main call
+    usage["repairs"] += 1
+    usage["repair_tokens"] = usage.get("repair_tokens", 0) + repair["prompt_tokens"] + repair["completion_tokens"]
+
+def response_options():
+    return {"response_format": RESPONSE_FORMAT} if STRUCTURED_OUTPUT else {}
+
+def reply_text(resp):
+    message = resp.choices[0].message
+    if getattr(message, "refusal", None):
+        # A refusal has no JSON to repair
+        raise ValueError(f"❌ LLM refused to classify: {message.refusal}")
+    return (message.content or "").strip()
+
+def request_repair(raw):
+    started = time.perf_counter()
+    resp = get_client().chat.completions.create(
+        model=REPAIR_MODEL,
+        messages=repair_messages(raw),
+        temperature=0,
+        max_tokens=REPAIR_MAX_TOKENS,
+        response_format=RESPONSE_FORMAT,
+    )
+    return reply_text(resp), usage_counts(getattr(resp, "usage", None), started)
+
+def parse_or_repair(raw, usage):
+    for attempt in range(REPAIR_RETRIES + 1):
+        try:
+            return parse_llm_response(raw)
+        except ValueError:
+            if attempt >= REPAIR_RETRIES or not raw:
+                raise
+        get_logger().warning("Unparseable LLM reply, asking %s to repair it", REPAIR_MODEL)
+        raw, repair_usage = request_repair(raw)
+        add_repair_usage(usage, repair_usage)
+
+ZOHO_FIELDS = ("contact", "dealer_name", "dealer_id", "rep", "category", "sub_category", "syndicator", "inventory_type")
+
+def _field_event(field, value, source):
+    return {"event": "field", "field": field, "value": value, "source": source}
+
+def classify_ticket_stream(text: str, model="gpt-4o", use_cache=True, rule_threshold=RULE_CONFIDENCE_THRESHOLD):
+    # Generator version of classify_ticket for the UI/CLI. Yields
+    #   {"event": "field", "field", "value", "source"} as soon as a value is known, where source is
+    #   "cache" | "rules" | "preliminary" (rules + dealer index, before the model answers) | "llm"
+    #   ("llm" fields repeat, later values winning, when the cheap model's answer is escalated)
+    # and finally {"event": "result", "result": data} with the same dict classify_ticket returns.
+    dealer_index = load_dealer_index()
+    message, context, history = prepare_thread(text)
+    prediction = local_prediction(message)
+    fields, confidence = local_rules(message, context, prediction)
+    data = classify_by_rules(message, context, rule_threshold, rules=(fields, confidence))
+    if data is not None:
+        for field, value in data["zoho_fields"].items():
+            yield _field_event(field, value, "rules")
+        yield {"event": "result", "result": add_export_status(data)}
+        return
+
+    examples = similar_examples(message)
+    cache = get_result_cache() if use_cache else None
+    cache_key = None
+    if cache is not None:
+        cache_key = answer_cache_key(text, model, examples, (fields, confidence), prediction)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            for field, value in cached.get("zoho_fields", {}).items():
+                yield _field_event(field, value, "cache")
+            yield {"event": "result", "result": add_export_status(cached)}
+            return
+
+    # Deterministic guesses first: anything the rules are sure of, plus the mapping's ID/rep for that dealer
+    threshold = RULE_CONFIDENCE_THRESHOLD if rule_threshold is None else rule_threshold
+    preliminary = {f: v for f, v in fields.items() if v and confidence.get(f, 0.0) >= threshold}
+    if preliminary.get("dealer_name"):
+        match = dealer_index.lookup(preliminary["dealer_name"])
+        preliminary["dealer_name"] = preliminary["dealer_name"].title()
+        preliminary.update({"dealer_id": match.get("dealer_id", ""), "rep": match.get("rep", "")})
+    if not preliminary.get("syndicator") and context.syndicators:
+        preliminary["syndicator"] = context.syndicators[0]
+    for field, value in preliminary.items():
+        if value:
+            yield _field_event(field, value, "preliminary")
+
+    messages = build_messages(message, context, history, structured=STRUCTURED_OUTPUT, examples=examples)
+    route = Route(model, context, (fields, confidence), REPAIR_MODEL)
+    for route_model in route:
+        # Same routing as classify_ticket; an escalated attempt streams its fields again over the cheap ones
+        chunks = []
+        parser = IncrementalJSONParser()
+        try:
+            started = time.perf_counter()
+            stream = get_client().chat.completions.create(
+                model=route_model,
+                messages=messages,
+                temperature=0.2,
+                stream=True,
+                stream_options={"include_usage": True},
+                **response_options(),
+            )
+            usage = None
+            for chunk in stream:
+                if getattr(chunk, "usage", None) is not None:
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                if getattr(delta, "refusal", None):
+                    raise ValueError(f"❌ LLM refused to classify: {delta.refusal}")
+                chunks.append(delta.content or "")
+                for path, value in parser.feed(delta.content or ""):
+                    if len(path) == 2 and path[0] == "zoho_fields" and path[1] in ZOHO_FIELDS and isinstance(value, str):
+                        yield _field_event(path[1], value, "llm")
+            usage = usage_counts(usage, started)
+            parsed = parse_or_repair("".join(chunks).strip(), usage)
+        except Exception as e:
+            get_logger().error("LLM stream from %s failed: %r", route_model, e)
+            route.failed(route_model, e)
+            continue
+        data = finalize_result(text, context, parsed)
+        add_model_check(data, prediction)
+        route.answer(route_model, data, usage)
+
+    data = store_result(cache, cache_key, route.result())
+    yield {"event": "result", "result": add_export_status(data)}
+
+def add_export_status(data):
+    # Export already on for this dealer/syndicator, from the local snapshot store (export_snapshots.py).
+    # Added after the cache on purpose: the answer changes when someone toggles the export.
+    zf = data.get("zoho_fields") or {}
+    dealer_id, syndicator = zf.get("dealer_id", ""), zf.get("syndicator", "")
+    if "error" in data or not dealer_id or not syndicator:
+        return data
+    from export_snapshots import get_export_snapshots
+    snapshots = get_export_snapshots()
+    if snapshots is None:
+        return data
+    active = {}
+    for name in (s.strip() for s in syndicator.split(",") if s.strip()):
+        state = snapshots.is_active(dealer_id, name)
+        if state is not None:
+            active[name] = state
+    if active:
+        data["export_active"] = active
+        data["export_snapshot_age_hours"] = round(snapshots.age_hours(dealer_id), 1)
+    return data
 
+def local_rules(text, context, prediction=None):
+    # Keyword rules, backed by the local model (ticket_model.py) where it is sure: it fills or overrides a
+    # dropdown field when its calibrated probability clears CLASSIFIER_LOCAL_MODEL_MIN_PROB and beats
+    # the rule's own confidence, and an agreement keeps the higher of the two
+    fields, confidence = classify_with_rules(text, context)
+    for field, (label, probability) in (prediction or {}).items():
+        if label == fields.get(field):
+            confidence[field] = max(confidence.get(field, 0.0), probability)
+        elif probability >= MODEL_MIN_PROB and probability > confidence.get(field, 0.0):
+            fields[field], confidence[field] = label, probability
+    return fields, confidence
+
+def add_model_check(data, prediction):
+    # LLM answers the local model confidently disagrees with, for a second look
+    zf = data.get("zoho_fields", {})
+    disagreements = {
+        field: {"llm": zf.get(field, ""), "model": label, "probability": round(probability, 3)}
+        for field, (label, probability) in (prediction or {}).items()
+        if probability >= MODEL_MIN_PROB and label != zf.get(field, "")
+    }
+    if disagreements:
+        data["model_disagrees"] = disagreements
+    return data
+
+def classify_by_rules(text, context, threshold=RULE_CONFIDENCE_THRESHOLD, trace=NULL_TRACE, rules=None,
+                      prediction=None):
+    # Tier 1: keyword rules (+ local model) + dealer index; returns None when the ticket needs the LLM
+    if threshold is None:
+        return None
+    if rules is None:
+        rules = local_rules(text, context, local_prediction(text) if prediction is None else prediction)
+    fields, confidence = rules
+    if not is_confident(confidence, threshold):
+        return None
+    data = finalize_result(text, context, {"zoho_fields": fields}, trace)
+    data["tier"] = "rules"
+    data["confidence"] = confidence
+    return data
+
+def parse_llm_response(raw):
+    # Structured replies are bare JSON; free-form ones may wrap it in ``` fences or a sentence,
+    # so fall back to decoding from the first brace (trailing fences/text are ignored)
     try:
-        resp = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": USER_PROMPT},
-            ],
-            temperature=0.2,
+        data = json.loads(raw)
+    except json.JSONDecodeError:
+        start = raw.find("{")
+        try:
+            data = json.JSONDecoder().raw_decode(raw, start)[0] if start >= 0 else None
+        except json.JSONDecodeError:
+            data = None
+    if not isinstance(data, dict) or not isinstance(data.get("zoho_fields"), dict):
+        raise ValueError("❌ LLM did not return valid JSON:\n" + raw)
+    return data
+
+def finalize_result(text, context, data, trace=NULL_TRACE):
+    with trace.span("dealer_matching") as span:
+        _match_dealer(text, context, data.setdefault("zoho_fields", {}), span)
+    zf = data["zoho_fields"]
+
+    for key in ZOHO_FIELDS:
+        if key not in zf or not isinstance(zf[key], str):
+            zf[key] = ""
+
+    if zf.get("syndicator"):
+        zf["syndicator"] = ", ".join(
+            canonicalize_syndicator(s) or s.strip() for s in zf["syndicator"].split(",") if s.strip()
         )
-        raw = resp.choices[0].message.content.strip()
-    except Exception as e:
-        print("❌ LLM call failed:", repr(e))
-        return {"error": str(e)}
+    elif context.syndicators:
+        zf["syndicator"] = context.syndicators[0]
 
-    raw = re.sub(r"^```(?:json)?\s*\{", "{", raw)
-    raw = re.sub(r"\s*```$", "", raw)
-    m = re.search(r"\{.*\}", raw, re.DOTALL)
-    if not m:
-        raise ValueError("❌ LLM did not return valid JSON:\n" + raw)
-    json_text = m.group(0)
-    data = json.loads(json_text)
-    zf = data.get("zoho_fields", {})
+    with trace.span("comment"):
+        data["zoho_comment"] = format_zoho_comment(zf, context)
+    with trace.span("edge_case"):
+        data["edge_case"] = detect_edge_case(text, zf)
+    data.pop("suggested_reply", None)
+    return data
+
+def _match_dealer(text, context, zf, span):
+    dealer_index = get_dealer_index()
+    dealer_list = context.dealers_found
+    dealer_candidates = []
 
     # Dealer matching logic
     dn_llm = zf.get("dealer_name", "").strip()
@@ -152,25 +411,29 @@ Return a JSON object exactly as follows, with ALL keys present (use empty string
     fallback = find_example_dealer(text)
     if fallback and fallback not in dealer_candidates:
         dealer_candidates.append(fallback)
+    span.set(candidates=len(dealer_candidates))
 
     matched_name = ""
     matched_id = ""
     matched_rep = ""
     for name in dealer_candidates:
-        norm = re.sub(r"([a-z])([A-Z])", r"\1 \2", name).lower().strip()
-        if norm in dealer_to_id:
+        match = dealer_index.lookup(name)
+        if match.get("dealer_id"):
             matched_name = name
-            matched_id = dealer_to_id[norm]
-            matched_rep = dealer_to_rep.get(norm, "")
+            matched_id = match["dealer_id"]
+            matched_rep = match["rep"]
+            span.set(method="exact")
             break
 
-    if not matched_id and dealer_candidates:
+    # Misspelled or reordered names ("Mazda Steel") resolve locally instead of another LLM round trip
+    if not matched_id:
         for name in dealer_candidates:
-            override = lookup_dealer_by_name(name)
-            if override.get("dealer_id"):
-                matched_name = name
-                matched_id = override["dealer_id"]
-                matched_rep = override["rep"]
+            close = fuzzy_lookup_dealer(name, limit=1, cutoff=FUZZY_DEALER_CUTOFF)
+            if close and close[0]["dealer_id"] and close[0]["dealer_name"] not in DEALER_BLOCKLIST:
+                matched_name = close[0]["dealer_name"]
+                matched_id = close[0]["dealer_id"]
+                matched_rep = close[0]["rep"]
+                span.set(method="fuzzy", fuzzy_score=close[0]["score"])
                 break
 
     if matched_id:
@@ -179,42 +442,32 @@ Return a JSON object exactly as follows, with ALL keys present (use empty string
         zf["rep"] = matched_rep
         zf["contact"] = matched_rep
     else:
-        # Group fallback logic: match any mapping row with "group" in name or mapping row that is the only match found
-        group_found = False
-        for name, id_ in dealer_to_id.items():
-            lname = name.strip().lower()
-            if "group" in lname or (
-                # If the mapping row's dealer name is found exactly in the email
-                lname in text.lower()
-            ):
-                zf["dealer_name"] = name.title() + " (Group suggestion)"
-                zf["dealer_id"] = id_
-                # Use mapping rep, or fall back to sender/contact
-                zf["rep"] = dealer_to_rep.get(name, "") or context.get("rep", "") or context.get("contact", "")
-                zf["contact"] = zf["rep"]
-                group_found = True
-                break
-        if not group_found:
+        # Group fallback: scan the whole ticket once for any mapped rooftop or group name,
+        # preferring a specific rooftop over a group and the longest mention otherwise
+        mentions = outermost_mentions(m for m in context.dealer_mentions if m["dealer_name"] not in DEALER_BLOCKLIST)
+        span.set(method="scan" if mentions else "none", mentions=len(mentions))
+        if mentions:
+            best = max(mentions, key=lambda m: (not m["is_group"], m["end"] - m["start"], -m["start"]))
+            zf["dealer_name"] = best["dealer_name"].title() + (" (Group suggestion)" if best["is_group"] else "")
+            zf["dealer_id"] = best["dealer_id"]
+            # Use mapping rep, or fall back to sender/contact
+            zf["rep"] = best["rep"] or context.get("rep", "") or context.get("contact", "")
+            zf["contact"] = zf["rep"]
+        else:
             zf["dealer_name"] = dn_llm.title() if dn_llm else ""
             zf["contact"] = zf.get("rep", "")
 
-
-    expected_keys = [
-        "contact", "dealer_name", "dealer_id", "rep",
-        "category", "sub_category", "syndicator", "inventory_type"
+def outermost_mentions(mentions):
+    # A name found inside a longer mention is part of it ("Ffun" in "Ffun Auto Group"), not a dealer of its own
+    mentions = list(mentions)
+    return [
+        m for m in mentions
+        if not any(o["start"] <= m["start"] and m["end"] <= o["end"] and o["end"] - o["start"] > m["end"] - m["start"]
+                   for o in mentions)
     ]
-    for key in expected_keys:
-        if key not in zf or not isinstance(zf[key], str):
-            zf[key] = ""
-
-    if not zf.get("syndicator") and context.get("syndicators"):
-        zf["syndicator"] = context["syndicators"][0].title()
 
-    data["zoho_comment"] = format_zoho_comment(zf, context)
-    data["edge_case"] = detect_edge_case(text, zf)
-    data.pop("suggested_reply", None)
-
-    return data
+def canonicalize_syndicator(name):
+    return get_syndicator_index().canonicalize(name)
 
 def find_example_dealer(text: str):
     patterns = [
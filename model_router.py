@@ -0,0 +1,213 @@
+import os
+import json
+import threading
+from fewshot_index import ALLOWED_VALUES
+from dealer_utils import DEALER_BLOCKLIST
+from rule_classifier import RULE_CONFIDENCE_THRESHOLD
+
+# Cheap model first, the requested (large) model only when the cheap answer fails a check. The checks
+# are deterministic: dropdown values must be allowed, required fields filled, and the answer must not
+# contradict a confident keyword rule, the syndicators found in the text, the dealer index, or a
+# confident local model (ticket_model.py). CLASSIFIER_ROUTE_FIRST="" sends everything to the requested
+# model as before. Each result records which model answered and the route it took; per-route ticket,
+# latency and cost counters accumulate in-process (get_route_stats) and usage_report.py rebuilds them
+# from the log.
+
+ROUTE_FIRST = tuple(m.strip() for m in os.getenv("CLASSIFIER_ROUTE_FIRST", "gpt-4o-mini").split(",") if m.strip())
+ROUTE_REQUIRED = tuple(
+    f.strip() for f in os.getenv("CLASSIFIER_ROUTE_REQUIRED", "category,sub_category,syndicator").split(",") if f.strip()
+)
+# A failed or unparseable cheap call always escalates; these are the checks on answers that did parse
+ROUTE_CHECKS = ("invalid", "blank", "rules", "syndicator", "dealer", "local_model")
+ENABLED_CHECKS = tuple(
+    c.strip() for c in os.getenv("CLASSIFIER_ROUTE_CHECKS", ",".join(ROUTE_CHECKS)).split(",") if c.strip()
+)
+
+# USD per 1M tokens: (prompt, cached prompt, completion). CLASSIFIER_MODEL_PRICES='{"model": [p, c, o]}'
+# adds or overrides entries; unknown models are priced as gpt-4o.
+MODEL_PRICES = {
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1-nano": (0.10, 0.025, 0.40),
+}
+MODEL_PRICES.update({k: tuple(v) for k, v in json.loads(os.getenv("CLASSIFIER_MODEL_PRICES", "{}")).items()})
+
+# Rule fields worth a second opinion when the keyword rules are confident and the model says otherwise
+RULE_CHECKED_FIELDS = ("category", "sub_category", "inventory_type")
+
+
+def route_models(model, first=None):
+    # Models to try in order; the requested model is always last
+    return [m for m in (ROUTE_FIRST if first is None else first) if m != model] + [model]
+
+
+def route_fingerprint(model):
+    # The routing policy for `model`, for the result-cache key: a different route or check set can give
+    # a different answer
+    return json.dumps([route_models(model), sorted(ENABLED_CHECKS), list(ROUTE_REQUIRED)])
+
+
+def call_cost(model, usage, repair_model=None):
+    prompt, cached, completion = MODEL_PRICES.get(model, MODEL_PRICES["gpt-4o"])
+    fresh = max(0, usage.get("prompt_tokens", 0) - usage.get("cached_tokens", 0))
+    cost = fresh * prompt + usage.get("cached_tokens", 0) * cached + usage.get("completion_tokens", 0) * completion
+    if usage.get("repair_tokens") and repair_model:
+        cost += usage["repair_tokens"] * MODEL_PRICES.get(repair_model, MODEL_PRICES["gpt-4o"])[0]
+    return cost / 1_000_000
+
+
+def _names(value):
+    return {v.strip().lower() for v in value.split(",") if v.strip()}
+
+
+def escalation_reasons(data, context, rules=None, checks=ENABLED_CHECKS, required=ROUTE_REQUIRED):
+    # Why this answer should go to the next model; empty when it passes. `data` is a finalize_result()
+    # output (dealer ID already looked up), `rules` the (fields, confidence) of the rules tier.
+    zf = data.get("zoho_fields", {})
+    reasons = []
+    if "invalid" in checks:
+        reasons += [f"invalid:{f}" for f, allowed in ALLOWED_VALUES.items() if zf.get(f) and zf[f] not in allowed]
+    if "blank" in checks:
+        reasons += [f"blank:{f}" for f in required if not zf.get(f)]
+    if "rules" in checks and rules is not None:
+        fields, confidence = rules
+        reasons += [
+            f"rules:{f}" for f in RULE_CHECKED_FIELDS
+            if fields.get(f) and confidence.get(f, 0.0) >= RULE_CONFIDENCE_THRESHOLD and fields[f] != zf.get(f)
+        ]
+    if "syndicator" in checks and context.syndicators and zf.get("syndicator"):
+        # Syndicators named in the ticket are matched against the keyword reference; the answer should use one
+        if not _names(zf["syndicator"]) & _names(", ".join(context.syndicators)):
+            reasons.append("syndicator")
+    if "dealer" in checks:
+        # The text names dealers from the mapping (automaton hits, not the brand-keyword guesses) and the
+        # answer resolved to none of them. Brand-only tickets never escalate: the ID comes from the
+        # mapping, not the model, so a larger model could not fill it in.
+        mentions = [m for m in context.dealer_mentions if m["dealer_name"] not in DEALER_BLOCKLIST]
+        if mentions and zf.get("dealer_id", "") not in {m["dealer_id"] for m in mentions}:
+            reasons.append("dealer")
+    if "local_model" in checks:
+        reasons += [f"local_model:{f}" for f in data.get("model_disagrees", {})]
+    return reasons
+
+
+def combine_usage(attempts, repair_model=None):
+    # attempts: [(model, usage or None, reasons)] in call order -> one usage dict for the result, with the
+    # per-call breakdown under "calls"
+    total = {"prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0, "repairs": 0, "llm_ms": 0.0,
+             "cost_usd": 0.0, "calls": []}
+    for model, usage, reasons in attempts:
+        usage = usage or {}
+        cost = call_cost(model, usage, repair_model)
+        for key in ("prompt_tokens", "completion_tokens", "cached_tokens", "repairs"):
+            total[key] += usage.get(key, 0)
+        total["llm_ms"] = round(total["llm_ms"] + usage.get("llm_ms", 0.0), 1)
+        total["cost_usd"] += cost
+        if usage.get("repair_tokens"):
+            total["repair_tokens"] = total.get("repair_tokens", 0) + usage["repair_tokens"]
+        total["calls"].append({"model": model, "llm_ms": usage.get("llm_ms", 0.0), "cost_usd": round(cost, 6),
+                               "escalated": reasons})
+    total["cost_usd"] = round(total["cost_usd"], 6)
+    return total
+
+
+def record_route(data, attempts, requested, answered, repair_model=None):
+    # Marks the result with the model whose answer it is and the route taken, folds every call into
+    # data["usage"], and counts the route. The baseline prices the first answered call's tokens at the
+    # requested model: what this ticket would have cost without routing.
+    data["model"] = answered
+    data["route"] = [model for model, _, _ in attempts]
+    escalations = {model: reasons for model, _, reasons in attempts if reasons}
+    if escalations:
+        data["escalations"] = escalations
+    data["usage"] = combine_usage(attempts, repair_model)
+    first = next((usage for _, usage, _ in attempts if usage), {})
+    data["usage"]["baseline_usd"] = round(call_cost(requested, first, repair_model), 6)
+    get_route_stats().add(data["route"], data["usage"])
+    return data
+
+
+class Route:
+    # One ticket's way through route_models(). Iterate for the next model to call, then report each call
+    # with answer() or failed(); iteration stops at the first answer that passes the checks. When the
+    # last model fails, the previous model's answer is kept (with "escalation_failed") instead of
+    # turning a usable classification into an error.
+    def __init__(self, model, context, rules=None, repair_model=None, first=None):
+        self.requested = model
+        self.models = route_models(model, first)
+        self.context = context
+        self.rules = rules
+        self.repair_model = repair_model
+        self.attempts = []
+        self.data = None
+        self.answered = None
+        self.error = None
+        self.done = False
+        self.last = False
+
+    def __iter__(self):
+        for i, model in enumerate(self.models):
+            if self.done:
+                return
+            self.last = i == len(self.models) - 1
+            yield model
+
+    def answer(self, model, data, usage):
+        reasons = [] if self.last else escalation_reasons(data, self.context, self.rules)
+        self.attempts.append((model, usage, reasons))
+        self.data, self.answered = data, model
+        self.done = not reasons
+
+    def failed(self, model, error):
+        self.error = str(error)
+        self.attempts.append((model, None, [] if self.last else ["error"]))
+        if self.last and self.data is not None:
+            self.data["escalation_failed"] = self.error
+
+    def result(self):
+        # The answer to return (tier "llm", route recorded), or {"error"} when no call produced one
+        if self.data is None:
+            return {"error": self.error}
+        self.data["tier"] = "llm"
+        return record_route(self.data, self.attempts, self.requested, self.answered, self.repair_model)
+
+
+class RouteStats:
+    def __init__(self):
+        self.routes = {}
+        self._lock = threading.Lock()
+
+    def add(self, route, usage):
+        key = " → ".join(route)
+        with self._lock:
+            row = self.routes.setdefault(key, {"tickets": 0, "llm_ms": 0.0, "cost_usd": 0.0, "baseline_usd": 0.0})
+            row["tickets"] += 1
+            row["llm_ms"] += usage.get("llm_ms", 0.0)
+            row["cost_usd"] += usage.get("cost_usd", 0.0)
+            row["baseline_usd"] += usage.get("baseline_usd", 0.0)
+
+    def summary(self):
+        with self._lock:
+            return {key: dict(row) for key, row in self.routes.items()}
+
+
+_stats = RouteStats()
+
+
+def get_route_stats():
+    return _stats
+
+
+def format_routes(routes):
+    # Lines for usage_report.py / the bench: tickets, mean latency and cost per route, then the saving
+    lines = []
+    cost = sum(r["cost_usd"] for r in routes.values())
+    baseline = sum(r["baseline_usd"] for r in routes.values())
+    for key, row in sorted(routes.items(), key=lambda item: -item[1]["tickets"]):
+        lines.append(f"   {key:<28} {row['tickets']:>6} tickets  {row['llm_ms'] / row['tickets']:>7.0f} ms/ticket  "
+                     f"${row['cost_usd']:.4f}")
+    if baseline:
+        lines.append(f"   routed ${cost:.4f} vs ${baseline:.4f} with the large model only ({1 - cost / baseline:.0%} saved)")
+    return lines
@@ -1,22 +1,22 @@
 import os
 import pandas as pd
-import nltk
 from dotenv import load_dotenv
-from llm_classifier import classify_ticket, write_log
+from llm_classifier import write_log
+from batch_classifier import classify_batch
 
 # Setup
 load_dotenv()
-nltk.download("punkt", quiet=True)
 
 def classify_batch_from_csv(path="Classifier_Complex_Input_Examples.csv"):
     df = pd.read_csv(path)
     msg_col = "message" if "message" in df.columns else df.columns[0]
     print(f"Detected message column: {msg_col}\n")
 
-    for i, row in df.iterrows():
-        ticket_message = str(row[msg_col])
+    messages = [str(m) for m in df[msg_col]]
+    results = classify_batch(messages)
+
+    for i, (ticket_message, result) in enumerate(zip(messages, results)):
         print(f"\n📩 Ticket {i+1} Source: Email from client\n")
-        result = classify_ticket(ticket_message)
         fields = result.get("zoho_fields", {})
 
         print("📋 Summary for Zoho Fields:")
@@ -0,0 +1,184 @@
+import json
+import hashlib
+
+# Prompt layout for the provider-side prompt cache: everything static (instructions, output contract)
+# lives in SYSTEM_PROMPT and is byte-identical for every ticket, so it forms a cacheable prefix.
+# Everything that varies per ticket comes after it: the retrieved few-shot examples as earlier
+# user/assistant turns, then the user turn with the ticket text and hints.
+
+# Bump when the prompt wording or output contract changes; part of the result-cache key
+PROMPT_VERSION = "6"
+
+# Hand-written examples; fewshot_index.py falls back to them when nothing in its pool is similar enough
+FEWSHOT_SEEDS = (
+    (
+        "Hi Véronique, Mazda Steele is still showing vehicles that were sold last week. Request to check the PBS import.",
+        {"contact": "Véronique Fournier", "dealer_name": "Mazda Steele", "dealer_id": "2618", "rep": "Véronique Fournier",
+         "category": "Problem / Bug", "sub_category": "Import", "syndicator": "PBS", "inventory_type": ""},
+    ),
+    (
+        "Hi, we’d like to activate a Car Media export for our new and used vehicles at Lallier Kia Laval.",
+        {"contact": "", "dealer_name": "Lallier Kia Laval", "dealer_id": "", "rep": "",
+         "category": "Product Activation – Existing Client", "sub_category": "Export", "syndicator": "Car Media",
+         "inventory_type": "New + Used"},
+    ),
+    (
+        "Can we please create a feed from each of the ffun group stores to export to Dealer Socket?",
+        {"contact": "Nathan Griffith", "dealer_name": "Ffun Auto Group", "dealer_id": "4320", "rep": "Nathan Griffith",
+         "category": "Product Activation – Existing Client", "sub_category": "Export", "syndicator": "Dealer Socket",
+         "inventory_type": ""},
+    ),
+)
+
+# Allowed dropdown values; "" (blank) is always allowed so the model can leave a field for the logic to fill
+CATEGORIES = (
+    "Product Activation – New Client", "Product Activation – Existing Client", "Product Cancellation",
+    "Problem / Bug", "General Question", "Analysis / Review", "Other",
+)
+SUB_CATEGORIES = (
+    "Import", "Export", "Sales Data Import", "FB Setup", "Google Setup", "Other Department", "Other", "AccuTrade",
+)
+INVENTORY_TYPES = ("New", "Used", "Demo", "New + Used")
+
+OUTPUT_CONTRACT = """{
+  "zoho_fields": {
+    "contact": "",
+    "dealer_name": "",
+    "dealer_id": "",
+    "rep": "",
+    "category": "",
+    "sub_category": "",
+    "syndicator": "",
+    "inventory_type": ""
+  },
+  "zoho_comment": "",
+  "suggested_reply": ""
+}
+"""
+
+INSTRUCTIONS = (
+    "You are a Zoho Desk classification assistant. Only use these allowed dropdown values:\n"
+    f"- Category: {', '.join(CATEGORIES)}.\n"
+    f"- Sub Category: {', '.join(SUB_CATEGORIES)}.\n"
+    f"- Inventory Type: {', '.join(INVENTORY_TYPES)}, or blank.\n\n"
+    "Important logic rules:\n"
+    "- Only use real dealership rooftops as dealer_name (not group names like 'Kot Auto Group')\n"
+    "- If a group name is used, try to extract the actual rooftop from examples or filenames\n"
+    "- Never use 'Olivier Rizk-Taillandier' as rep unless the sender is actually him\n"
+    "- The 'syndicator' field must refer to the export target (where D2C is sending the feed), not the data source or origin (e.g. Inventory+, PBS, SERTI)\n"
+    "- If any field is uncertain or missing, leave it blank — logic will complete it\n"
+    "- Do not infer — only return grounded field values\n"
+    "- Return a JSON object with ALL keys present and fill missing keys with empty string\n"
+    "- Do not include markdown (e.g. ```json) or explanation. Return only raw JSON\n"
+    "- Do not invent or guess Dealer ID — use mapping or leave blank\n"
+    "- Earlier turns, if any, are solved tickets similar to this one, shown as examples\n"
+)
+
+SYSTEM_PROMPT = (
+    INSTRUCTIONS
+    + "\nReturn a JSON object exactly as follows, with ALL keys present (use empty strings if unknown):\n"
+    + OUTPUT_CONTRACT +
+    "\nNow classify the message in the next turn and return ONLY the JSON object as exactly specified:"
+)
+
+# Structured-output mode: the API enforces RESPONSE_FORMAT, so the prompt drops the contract and the
+# model only writes zoho_fields (finalize_result rebuilds the comment anyway)
+STRUCTURED_SYSTEM_PROMPT = (
+    INSTRUCTIONS
+    + "\nNow classify the message in the next turn. Fill every zoho_fields key of the response schema, "
+    "using an empty string when a value is unknown."
+)
+
+
+def _string(allowed=None):
+    return {"type": "string", "enum": ["", *allowed]} if allowed else {"type": "string"}
+
+
+ZOHO_FIELDS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "contact": _string(),
+        "dealer_name": _string(),
+        "dealer_id": _string(),
+        "rep": _string(),
+        "category": _string(CATEGORIES),
+        "sub_category": _string(SUB_CATEGORIES),
+        "syndicator": _string(),
+        "inventory_type": _string(INVENTORY_TYPES),
+    },
+    "required": ["contact", "dealer_name", "dealer_id", "rep", "category", "sub_category", "syndicator",
+                 "inventory_type"],
+    "additionalProperties": False,
+}
+
+RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "zoho_classification",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {"zoho_fields": ZOHO_FIELDS_SCHEMA},
+            "required": ["zoho_fields"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+# Covers both prompt layouts and the schema, so changing any of them invalidates cached results
+PROMPT_FINGERPRINT = hashlib.sha256(
+    f"{PROMPT_VERSION}\n{SYSTEM_PROMPT}\n{STRUCTURED_SYSTEM_PROMPT}\n{json.dumps(RESPONSE_FORMAT)}".encode("utf-8")
+).hexdigest()[:16]
+
+REPAIR_PROMPT = (
+    "The text in the next turn was meant to be a JSON ticket classification but could not be parsed. "
+    "Return the same values as JSON matching the response schema. Do not add or change values; "
+    "use an empty string for anything missing or cut off."
+)
+
+MESSAGE_HEADER = "Message:\n"
+HINTS_HEADER = "\n\nTicket hints:\n"
+
+
+def example_messages(examples):
+    # (message, zoho_fields) pairs as solved turns; the answer is the structured-output shape either way
+    turns = []
+    for message, fields in examples:
+        turns.append({"role": "user", "content": MESSAGE_HEADER + message})
+        turns.append({"role": "assistant", "content": json.dumps({"zoho_fields": fields}, ensure_ascii=False)})
+    return turns
+
+
+def build_messages(text, context, history=(), structured=False, examples=()):
+    hints = []
+    if context.dealers_found:
+        hints.append(f"Detected dealer candidates: {', '.join(context.dealers_found)}")
+    if context.image_flags:
+        hints.append("Contains image/photo keywords")
+    if context.contains_stock_number:
+        hints.append("Contains stock number")
+    if history:
+        earlier = "\n".join(f"  - {line}" for line in history)
+        hints.append(f"Earlier messages in this thread (newest first, context only):\n{earlier}")
+    user_prompt = MESSAGE_HEADER + text
+    if hints:
+        user_prompt += HINTS_HEADER + "\n".join(f"- {hint}" for hint in hints)
+    return [
+        {"role": "system", "content": STRUCTURED_SYSTEM_PROMPT if structured else SYSTEM_PROMPT},
+        *example_messages(examples),
+        {"role": "user", "content": user_prompt},
+    ]
+
+
+def repair_messages(raw):
+    # Only the broken reply goes back, not the ticket: a short prompt for a cheaper model
+    return [
+        {"role": "system", "content": REPAIR_PROMPT},
+        {"role": "user", "content": raw},
+    ]
+
+
+def ticket_text(user_prompt):
+    # Inverse of build_messages for the last user turn: the ticket text without the hints
+    body = user_prompt[len(MESSAGE_HEADER):] if user_prompt.startswith(MESSAGE_HEADER) else user_prompt
+    return body.split(HINTS_HEADER, 1)[0]
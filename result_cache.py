@@ -0,0 +1,105 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+
+CACHE_PATH = os.getenv("CLASSIFIER_CACHE_PATH", "classifier_cache.sqlite3")
+CACHE_MAX_ENTRIES = int(os.getenv("CLASSIFIER_CACHE_MAX_ENTRIES", "5000"))
+CACHE_TTL_SECONDS = int(os.getenv("CLASSIFIER_CACHE_TTL", str(7 * 24 * 3600)))
+CACHE_ENABLED = os.getenv("CLASSIFIER_CACHE", "1") != "0"
+
+CACHED_KEYS = ("zoho_fields", "zoho_comment", "edge_case", "tier")
+
+_WS_RE = re.compile(r"[ \t\r\f\v]+")
+_BLANK_LINES_RE = re.compile(r"\n\s*\n+")
+
+
+def normalize_ticket_text(text):
+    # Same ticket pasted twice rarely matches byte-for-byte: unify unicode forms, trailing spaces and blank lines
+    text = unicodedata.normalize("NFC", text).replace("\r\n", "\n")
+    text = "\n".join(_WS_RE.sub(" ", line).strip() for line in text.split("\n"))
+    return _BLANK_LINES_RE.sub("\n\n", text).strip()
+
+
+def make_cache_key(text, model, prompt_version, mapping_digest):
+    payload = "\x1f".join([normalize_ticket_text(text), model, prompt_version, mapping_digest])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, path=CACHE_PATH, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed_at)")
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE results SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key, result):
+        now = time.time()
+        value = json.dumps({k: result.get(k, "") for k in CACHED_KEYS}, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            self._evict(now)
+
+    def _evict(self, now):
+        self._conn.execute("DELETE FROM results WHERE created_at < ?", (now - self.ttl,))
+        # Least recently used entries go first once the table is over its size budget
+        self._conn.execute(
+            "DELETE FROM results WHERE key IN ("
+            " SELECT key FROM results ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM results")
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    global _cache
+    if not CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResultCache()
+    return _cache
@@ -0,0 +1,112 @@
+import re
+from dealer_index import get_dealer_index
+from dealer_utils import DEALER_BLOCKLIST
+
+# A field is trusted without the LLM once its confidence reaches RULE_CONFIDENCE_THRESHOLD;
+# the fast path needs every field in RULE_REQUIRED_FIELDS to clear it.
+RULE_CONFIDENCE_THRESHOLD = 0.85
+RULE_REQUIRED_FIELDS = ("dealer_name", "category", "sub_category", "syndicator")
+
+_CANCEL_RE = re.compile(
+    r"\b(cancel\w*|deactivate|disable|terminate|stop|turn off|remove|annuler|désactiver|arrêter|fermer)\b"
+)
+_ACTIVATE_RE = re.compile(
+    r"\b(activate|enable|set ?up|configure|create|add|start|turn on|activer|ajouter|créer|configurer)\b"
+)
+_EXPORT_RE = re.compile(r"\b(exports?|feeds?|syndicat\w*|exportation)\b")
+_IMPORT_RE = re.compile(r"\b(imports?|importation)\b")
+_PROBLEM_RE = re.compile(
+    r"\b(missing|not showing|not updating|disappeared|not visible|not appearing|not receiving|"
+    r"still show(?:s|ing)?|overwritten|wrong|error|issue|problem|manquant\w*|erreur|problème)\b"
+)
+_IMAGE_RE = re.compile(r"\b(images?|photos?|pictures?)\b")
+_QUESTION_RE = re.compile(r"\b(which|what|how|could you let us know|quel\w*|comment)\b")
+
+_NEW_RE = re.compile(r"\b(new|neufs?|neuves?)\b")
+_USED_RE = re.compile(r"\b(used|pre-owned|certified|usag\w+|d'occasion)\b")
+_DEMO_RE = re.compile(r"\b(demo|démo|démonstrateurs?)\b")
+
+
+def _classify_category(lowered):
+    export = bool(_EXPORT_RE.search(lowered))
+    import_ = bool(_IMPORT_RE.search(lowered))
+    target = "Export" if export and not import_ else "Import" if import_ and not export else ""
+
+    # Problem phrasing wins over cancel words: "remove sold units, they still show on the feed" is a bug
+    # report, not a cancellation, and falls through to the (sub-threshold) problem branches below
+    if _CANCEL_RE.search(lowered) and export and not _PROBLEM_RE.search(lowered):
+        return "Product Cancellation", "Export", 0.95 if not import_ else 0.7
+    if _ACTIVATE_RE.search(lowered) and export and not _PROBLEM_RE.search(lowered):
+        return "Product Activation – Existing Client", "Export", 0.9 if not import_ else 0.7
+    if _IMAGE_RE.search(lowered) and _PROBLEM_RE.search(lowered):
+        return "Problem / Bug", "Import", 0.75
+    if _PROBLEM_RE.search(lowered):
+        return "Problem / Bug", target or "Import", 0.7 if target else 0.5
+    if _QUESTION_RE.search(lowered):
+        return "General Question", target or "Other", 0.5
+    return "", "", 0.0
+
+
+def _classify_inventory(lowered):
+    new, used, demo = (bool(r.search(lowered)) for r in (_NEW_RE, _USED_RE, _DEMO_RE))
+    if new and used:
+        return "New + Used", 0.9
+    if used:
+        return "Used", 0.85
+    if demo:
+        return "Demo", 0.85
+    if new:
+        # "new" is often not about inventory ("new provider", "new client")
+        return "New", 0.6
+    return "", 0.8
+
+
+def _classify_dealer(text, context):
+    index = get_dealer_index()
+    rooftops = {
+        m["dealer_name"] for m in context.dealer_mentions
+        if not m["is_group"] and m["dealer_name"] not in DEALER_BLOCKLIST
+    }
+    if len(rooftops) == 1:
+        return rooftops.pop(), 0.95
+    if len(rooftops) > 1:
+        return "", 0.3
+    for name in context.dealers_found:
+        match = index.lookup(name)
+        if match.get("dealer_id") and match["dealer_name"] not in DEALER_BLOCKLIST:
+            return match["dealer_name"], 0.9
+    return "", 0.0
+
+
+def classify_with_rules(text, context):
+    lowered = text.lower()
+    category, sub_category, category_conf = _classify_category(lowered)
+    inventory_type, inventory_conf = _classify_inventory(lowered)
+    dealer_name, dealer_conf = _classify_dealer(text, context)
+
+    syndicators = context.syndicators
+    syndicator = syndicators[0] if len(syndicators) == 1 else ""
+    syndicator_conf = 0.95 if len(syndicators) == 1 else 0.4 if syndicators else 0.0
+
+    fields = {
+        "contact": "",
+        "dealer_name": dealer_name,
+        "dealer_id": "",
+        "rep": "",
+        "category": category,
+        "sub_category": sub_category,
+        "syndicator": syndicator,
+        "inventory_type": inventory_type,
+    }
+    confidence = {
+        "dealer_name": dealer_conf,
+        "category": category_conf,
+        "sub_category": category_conf,
+        "syndicator": syndicator_conf,
+        "inventory_type": inventory_conf,
+    }
+    return fields, confidence
+
+
+def is_confident(confidence, threshold=RULE_CONFIDENCE_THRESHOLD):
+    return all(confidence.get(field, 0.0) >= threshold for field in RULE_REQUIRED_FIELDS)
@@ -0,0 +1,146 @@
+import os
+import re
+import csv
+import threading
+from artifacts import load_artifact
+from keyword_automaton import KeywordAutomaton
+
+SYNDICATOR_REFERENCE_PATH = "Full_Syndicator_Keyword_Reference.csv"
+
+# Spellings that can't be derived from the reference names themselves -> canonical reference name
+SYNDICATOR_ALIASES = {
+    "accu-trade": "AccuTrade",
+    "accu trade": "AccuTrade",
+    "cox automotive": "HomeNet",
+    "coxauto": "HomeNet",
+    "toyota legacy elite": "EDealer",
+    "legacy elite": "EDealer",
+    "e-dealer": "EDealer",
+    "car media": "CarMedia",
+    "auto trader": "Autotrader",
+    "autotrader.ca": "Autotrader",
+    "cars com": "Cars.com",
+    "dealer com": "Dealer.com",
+    "dealer inspire": "DealerInspire",
+    "max digital": "MAXDigital",
+    "reynolds and reynolds": "Reynolds & Reynolds",
+    "reynolds": "Reynolds & Reynolds",
+    "vin solutions": "VinSolutions",
+    "j.d. power": "JD Power",
+    "j.d power": "JD Power",
+    "evolution automobiles": "EvolutionAutomobiles",
+    "evolutionautomobiles": "EvolutionAutomobiles",
+    "inventory+": "Inventory+",
+    "inventory plus": "Inventory+",
+}
+
+# Our own company names appear in every signature; they are never the syndicator
+NON_TARGET_SYNDICATORS = {"d2c media", "cars commerce"}
+
+# Everyday words that only count as a syndicator when capitalised in the ticket ("Shift", not "shift")
+CAPITALISED_ONLY = {"shift", "omni", "bumper", "driveway", "redline", "impel", "quorum"}
+
+_CAMEL_RE = re.compile(r"([a-z])([A-Z])")
+_SQUASH_RE = re.compile(r"[^0-9a-z+]+")
+
+
+def squash(name):
+    return _SQUASH_RE.sub("", name.lower())
+
+
+def name_variants(name):
+    lowered = name.lower()
+    variants = {lowered, squash(name)}
+    spaced = _CAMEL_RE.sub(r"\1 \2", name).lower()
+    if len(spaced.split()) > 1 and all(len(part) > 1 for part in spaced.split()):
+        variants.add(spaced)
+    variants.add(re.sub(r"[\-.]", " ", lowered))
+    return {v for v in variants if len(v) > 2}
+
+
+def load_reference(path=SYNDICATOR_REFERENCE_PATH):
+    with open(path, newline="", encoding="utf-8") as f:
+        return [row["Syndicator"].strip() for row in csv.DictReader(f) if (row.get("Syndicator") or "").strip()]
+
+
+class SyndicatorIndex:
+    def __init__(self, path=SYNDICATOR_REFERENCE_PATH, aliases=SYNDICATOR_ALIASES):
+        self.path = path
+        self.alias_table = aliases
+        self.mtime = None
+        self.canonical = {}
+        self.keywords = []
+        self.automaton = None
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def refresh(self):
+        mtime = os.stat(self.path).st_mtime_ns if os.path.exists(self.path) else None
+        if mtime == self.mtime and self.automaton is not None:
+            return False
+        with self._lock:
+            names = load_artifact(self.path, "syndicators", load_reference) if mtime is not None else []
+            canonical = {}
+            for name in names:
+                if name.lower() in NON_TARGET_SYNDICATORS:
+                    continue
+                # First spelling in the reference wins for duplicates like AccuTrade / Accu-Trade
+                canonical.setdefault(squash(name), name)
+            for alias, name in self.alias_table.items():
+                canonical.setdefault(squash(name), name)
+            keywords = [(variant, name) for name in canonical.values() for variant in name_variants(name)]
+            for alias, name in self.alias_table.items():
+                keywords.append((alias, canonical.get(squash(name), name)))
+            for alias, name in self.alias_table.items():
+                canonical.setdefault(squash(alias), canonical.get(squash(name), name))
+            automaton = KeywordAutomaton()
+            for keyword, name in keywords:
+                automaton.add(keyword, name)
+            self.canonical = canonical
+            self.keywords = keywords
+            self.automaton = automaton.build()
+            self.mtime = mtime
+        return True
+
+    def find(self, text):
+        return self.select(text, self.automaton.find_all(text))
+
+    def select(self, text, matches):
+        hits = []
+        last_end = -1
+        # find_all is sorted by start then longest first: keep leftmost-longest, non-overlapping hits
+        for start, end, name in matches:
+            if start < last_end:
+                continue
+            matched = text[start:end]
+            if matched.lower() in CAPITALISED_ONLY and not matched[:1].isupper():
+                continue
+            hits.append({"syndicator": name, "start": start, "end": end, "match": matched})
+            last_end = end
+        return hits
+
+    def extract(self, text, matches=None):
+        seen = []
+        hits = self.find(text) if matches is None else self.select(text, matches)
+        for hit in hits:
+            if hit["syndicator"] not in seen:
+                seen.append(hit["syndicator"])
+        return seen
+
+    def canonicalize(self, name):
+        return self.canonical.get(squash(name or ""), "")
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_syndicator_index(path=SYNDICATOR_REFERENCE_PATH):
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = SyndicatorIndex(path)
+        return _index
+    _index.refresh()
+    return _index
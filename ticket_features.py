@@ -0,0 +1,163 @@
+import re
+import threading
+
+from dealer_index import get_dealer_index
+from keyword_automaton import KeywordAutomaton
+from syndicator_index import get_syndicator_index
+
+# Everything preprocess_ticket needs, compiled once. The text is lowercased and split into lines
+# once; line-level features come from two walks over those lines (sign-offs up to the first name,
+# then "Dealer:" labels) and dealer + syndicator names from one automaton holding both keyword sets.
+
+SIGNOFF_PREFIXES = ("best regards", "regards", "merci", "thanks", "cordially", "from:", "envoyé par", "de:")
+
+NAME_LINE_RE = re.compile(r"^[A-Z][a-z]+( [A-Z][a-z]+)+$")
+GREETING_RE = re.compile(r"^(hi|bonjour|hello|salut)[\s,:-]+([A-Z][a-z]+)", re.IGNORECASE | re.MULTILINE)
+FULL_NAME_RE = re.compile(r"\b([A-Z][a-z]+ [A-Z][a-z]+)\b")
+NOT_A_NAME_RE = re.compile(r"^(nous|client|dealer|photos?|images?|request|inventory)$", re.IGNORECASE)
+DEALER_LABEL_RE = re.compile(r"(Dealership Name|Dealer Name|Dealer)\s*[:\-]?\s*([A-Za-z0-9 &'\-]+)", re.IGNORECASE)
+BRAND_RE = re.compile(
+    r"\b(?:mazda|toyota|honda|chevrolet|hyundai|genesis|ford|ram|gmc|acura|jeep"
+    r"|buick|nissan|volvo|subaru|volkswagen|kia|mitsubishi|infiniti|lexus"
+    r"|cadillac|dodge|mini|jaguar|land rover|bmw|mercedes|audi|porsche|tesla)"
+    r"[a-zé\-\s]*\b"
+)
+STOCK_NUMBER_RE = re.compile(r"\b[A-Z0-9]{6,}\b")
+EMAIL_RE = re.compile(r"[a-z0-9._%+-]+@[a-z0-9.-]+\.[a-z]{2,}")
+FRENCH_RE = re.compile(r"\b(merci|bonjour|véhicule|images|depuis)\b")
+# Substring checks on the lowered text; `in` is much cheaper than one regex alternation over them
+KEYWORDS = ("image", "certified", "overwrite", "overwritten", "photo", "firewall")
+
+BRAND_INVALID_SUFFIXES = {"units", "inventory", "vehicles", "images", "stock"}
+OWN_EMAIL_DOMAINS = ("d2cmedia", "carscommerce")
+
+
+class TicketFeatures:
+    # Slotted record instead of a dict: one small object per ticket, fixed fields, attribute access.
+    # Hand-written rather than @dataclass(slots=True) to keep dataclasses/inspect out of start-up.
+    __slots__ = ("message", "contains_french", "contains_stock_number", "contacts_found", "dealers_found",
+                 "syndicators", "image_flags", "line_count", "keywords", "emails", "dealer_mentions")
+
+    def __init__(self, message, contains_french=False, contains_stock_number=False, contacts_found=(),
+                 dealers_found=(), syndicators=(), image_flags=(), line_count=0, keywords=frozenset(),
+                 emails=(), dealer_mentions=()):
+        self.message = message
+        self.contains_french = contains_french
+        self.contains_stock_number = contains_stock_number
+        self.contacts_found = list(contacts_found)
+        self.dealers_found = list(dealers_found)
+        self.syndicators = list(syndicators)
+        self.image_flags = list(image_flags)
+        self.line_count = line_count
+        self.keywords = frozenset(keywords)
+        self.emails = list(emails)
+        self.dealer_mentions = list(dealer_mentions)
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__ if name != "message")
+        return f"TicketFeatures({fields})"
+
+    def __eq__(self, other):
+        if not isinstance(other, TicketFeatures):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    # Read-only dict access for code that still treats the context as preprocess_ticket's old dict
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+_automaton = None
+_automaton_key = None
+_automaton_lock = threading.Lock()
+
+
+def name_automaton(dealer_index, syndicator_index):
+    # Rebuilt only when either reference file changes
+    global _automaton, _automaton_key
+    key = (dealer_index.path, dealer_index.digest, syndicator_index.path, syndicator_index.mtime)
+    if key != _automaton_key:
+        with _automaton_lock:
+            if key != _automaton_key:
+                automaton = KeywordAutomaton()
+                for keyword, name in dealer_index.scan_keywords():
+                    automaton.add(keyword, (True, name))
+                for keyword, name in syndicator_index.keywords:
+                    automaton.add(keyword, (False, name))
+                _automaton = automaton.build()
+                _automaton_key = key
+    return _automaton
+
+
+def _contact(text, lines, lowered_lines):
+    for i in range(len(lines) - 1):
+        if lowered_lines[i].strip().startswith(SIGNOFF_PREFIXES):
+            next_line = lines[i + 1].strip()
+            if NAME_LINE_RE.match(next_line):
+                return next_line
+    greet = GREETING_RE.search(text.strip())
+    if greet and not NOT_A_NAME_RE.match(greet.group(2)):
+        return greet.group(2)
+    match = FULL_NAME_RE.search(text)
+    if match and not NOT_A_NAME_RE.match(match.group(1)):
+        return match.group(1)
+    return ""
+
+
+def extract_features(text):
+    lowered = text.lower()
+    lines = text.split("\n")
+    lowered_lines = lowered.split("\n")
+    if len(lowered_lines) != len(lines):
+        lowered_lines = [line.lower() for line in lines]
+
+    dealers = []
+    for line, lowered_line in zip(lines, lowered_lines):
+        if "dealer" in lowered_line:
+            m = DEALER_LABEL_RE.search(line)
+            if m and m.group(2).strip():
+                dealers.append(m.group(2).strip().lower())
+    if not dealers:
+        brands = (d.strip() for d in BRAND_RE.findall(lowered))
+        dealers = list(dict.fromkeys(d for d in brands if d.split() and d.split()[-1] not in BRAND_INVALID_SUFFIXES))
+
+    keywords = {kw for kw in KEYWORDS if kw in lowered}
+
+    image_flags = []
+    if "image" in keywords:
+        image_flags.append("image")
+    if "certified" in keywords:
+        image_flags.append("certified")
+    if "overwrite" in keywords or "overwritten" in keywords:
+        image_flags.append("overwritten")
+
+    dealer_index, syndicator_index = get_dealer_index(), get_syndicator_index()
+    dealer_mentions, syndicator_matches = [], []
+    for start, end, (is_dealer, name) in name_automaton(dealer_index, syndicator_index).find_all(text):
+        if is_dealer:
+            dealer_mentions.append(dealer_index.mention(start, end, name))
+        else:
+            syndicator_matches.append((start, end, name))
+
+    return TicketFeatures(
+        message=text,
+        contains_french=FRENCH_RE.search(lowered) is not None,
+        contains_stock_number=STOCK_NUMBER_RE.search(text) is not None,
+        contacts_found=[_contact(text, lines, lowered_lines)],
+        dealers_found=dealers,
+        syndicators=syndicator_index.extract(text, syndicator_matches),
+        image_flags=image_flags,
+        line_count=len(lines),
+        keywords=frozenset(keywords),
+        emails=[e for e in EMAIL_RE.findall(lowered) if not any(d in e for d in OWN_EMAIL_DOMAINS)] if "@" in text else [],
+        dealer_mentions=dealer_mentions,
+    )
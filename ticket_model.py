@@ -0,0 +1,368 @@
+import os
+import sys
+import json
+import math
+import time
+import re
+import zlib
+import argparse
+import threading
+from collections import Counter
+from fewshot_index import EXAMPLE_SUITES, fold, read_suite, clean_fields
+from classification_log import LOG_PATH, CONFIRMED_PATH, read_log, read_confirmed
+from result_cache import normalize_ticket_text
+
+# Small local model for the dropdown fields: hashed word / word-bigram / character-trigram features
+# (accent-folded, sublinear tf, L2-normalised) and one softmax regression per field, stored as NumPy
+# arrays. Probabilities are temperature-scaled on out-of-fold predictions so "0.9" means roughly 9 in
+# 10. Trained from the LLM's answers in the classification log, the labelled CSVs and confirmed
+# classifications, which count more. `python ticket_model.py` trains; classify_ticket uses the result,
+# when the file exists, to back up the rules tier and to cross-check the LLM.
+
+MODEL_PATH = os.getenv("CLASSIFIER_LOCAL_MODEL", "ticket_model.npz")
+MODEL_MIN_PROB = float(os.getenv("CLASSIFIER_LOCAL_MODEL_MIN_PROB", "0.9"))
+
+MODEL_FIELDS = ("category", "sub_category", "inventory_type")
+# Blank is a real answer for inventory_type (not mentioned); for the others it just means unlabelled
+BLANK_IS_LABEL = ("inventory_type",)
+N_BITS = 16
+LABELLED_WEIGHT = 3.0
+TEMPERATURES = [0.25 * 1.1 ** i for i in range(60)]
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def feature_terms(text):
+    words = _WORD_RE.findall(fold(text))
+    grams = ["w:" + word for word in words]
+    grams += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+    grams += [padded[j:j + 3] for padded in (f" {word} " for word in words) for j in range(len(padded) - 2)]
+    return Counter(grams)
+
+
+# n_bits -> {term: (column, sign)}; tickets reuse most of their vocabulary, so this skips most hashing
+_HASHES = {}
+_HASHES_MAX = 500_000
+
+
+def _hash_term(term, n_bits, table):
+    # Stable across processes (unlike hash()); the top bit signs the term so collisions cancel out on
+    # average instead of piling up
+    if len(table) >= _HASHES_MAX:
+        table.clear()
+    h = zlib.crc32(term.encode("utf-8"))
+    hashed = table[term] = (h & ((1 << n_bits) - 1), 1.0 if h >> 31 else -1.0)
+    return hashed
+
+
+def hashed_features(text, n_bits=N_BITS):
+    # (columns, values) of one L2-normalised row. Colliding terms keep separate entries: the sparse
+    # products sum them anyway.
+    table = _HASHES.setdefault(n_bits, {})
+    columns, values = [], []
+    for term, count in feature_terms(text).items():
+        col, sign = table.get(term) or _hash_term(term, n_bits, table)
+        columns.append(col)
+        values.append(sign if count == 1 else sign * (1 + math.log(count)))
+    norm = math.sqrt(sum(v * v for v in values)) or 1.0
+    return columns, [v / norm for v in values]
+
+
+def feature_matrix(texts, n_bits=N_BITS):
+    # CSR-style arrays: columns/values of every row back to back, offsets[i]:offsets[i + 1] is row i
+    import numpy as np
+    columns, values, offsets = [], [], [0]
+    for text in texts:
+        cols, vals = hashed_features(text, n_bits)
+        columns += cols
+        values += vals
+        offsets.append(len(columns))
+    return np.array(columns, dtype=np.int64), np.array(values, dtype=np.float32), np.array(offsets, dtype=np.int64)
+
+
+def sparse_logits(matrix, weights, bias):
+    import numpy as np
+    columns, values, offsets = matrix
+    logits = np.tile(bias, (len(offsets) - 1, 1))
+    lengths = np.diff(offsets)
+    if len(columns):
+        nonempty = lengths > 0
+        contributions = weights[columns] * values[:, None]
+        logits[nonempty] += np.add.reduceat(contributions, offsets[:-1][nonempty], axis=0)
+    return logits
+
+
+def softmax(logits):
+    import numpy as np
+    logits = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+def fit_softmax(matrix, labels, sample_weight, n_classes, n_features, epochs=300, lr=0.5, l2=1e-4):
+    # Full-batch gradient descent with momentum; the training sets here are hundreds of rows, not millions.
+    # Only columns that occur are trained (the rest stay 0), so an epoch costs the nonzeros, not 2**bits.
+    import numpy as np
+    all_columns, values, offsets = matrix
+    active, columns = np.unique(all_columns, return_inverse=True)
+    matrix = (columns, values, offsets)
+    rows = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    weights = np.zeros((len(active), n_classes), dtype=np.float32)
+    bias = np.zeros(n_classes, dtype=np.float32)
+    velocity_w, velocity_b = np.zeros_like(weights), np.zeros_like(bias)
+    target = np.zeros((len(labels), n_classes), dtype=np.float32)
+    target[np.arange(len(labels)), labels] = 1
+    scale = sample_weight[:, None] / sample_weight.sum()
+    for _ in range(epochs):
+        grad_logits = (softmax(sparse_logits(matrix, weights, bias)) - target) * scale
+        grad_w = np.zeros_like(weights)
+        per_entry = grad_logits[rows] * values[:, None]
+        for c in range(n_classes):
+            grad_w[:, c] = np.bincount(columns, weights=per_entry[:, c], minlength=len(active))
+        grad_w += l2 * weights
+        velocity_w = 0.9 * velocity_w - lr * grad_w
+        velocity_b = 0.9 * velocity_b - lr * grad_logits.sum(axis=0)
+        weights += velocity_w
+        bias += velocity_b
+    full = np.zeros((n_features, n_classes), dtype=np.float32)
+    full[active] = weights
+    return full, bias
+
+
+def fit_temperature(logits, labels, sample_weight):
+    # Temperature with the lowest weighted log-loss on held-out logits
+    import numpy as np
+    best, best_loss = 1.0, float("inf")
+    for t in TEMPERATURES:
+        probs = softmax(logits / t)[np.arange(len(labels)), labels]
+        loss = -float(np.sum(sample_weight * np.log(np.maximum(probs, 1e-12)))) / float(sample_weight.sum())
+        if loss < best_loss:
+            best, best_loss = t, loss
+    return best
+
+
+def read_training_data(log_path=LOG_PATH, suites=EXAMPLE_SUITES, confirmed_path=CONFIRMED_PATH):
+    # {normalised text: (text, fields, weight)}: the latest LLM answer per ticket from the log, rotated
+    # history included, then confirmed entries over them and labelled rows on top. Rules-tier answers
+    # (which this model backs up) are left out, so it never learns from its own predictions.
+    data = {}
+
+    def add(text, output, weight):
+        key = normalize_ticket_text(text)
+        if key and isinstance(output, dict) and "error" not in output and isinstance(output.get("zoho_fields"), dict):
+            data[key] = (text, clean_fields(output["zoho_fields"]), weight)
+
+    for entry in read_log(log_path):
+        output = entry.get("output")
+        # Entries older than the rules tier have no "tier"; every one of them is an LLM answer
+        if entry.get("confirmed") or not isinstance(output, dict) or output.get("tier", "llm") != "llm":
+            continue
+        if output.get("escalation_failed"):
+            # The cheap model's answer after it failed a check, kept only because the large model errored
+            continue
+        add(entry.get("input", ""), output, 1.0)
+    for entry in read_confirmed(confirmed_path, log_path):
+        add(entry.get("input", ""), entry.get("output"), LABELLED_WEIGHT)
+    for suite in suites:
+        for text, fields in read_suite(*suite):
+            data[normalize_ticket_text(text)] = (text, clean_fields(fields), LABELLED_WEIGHT)
+    return list(data.values())
+
+
+def train(examples, n_bits=N_BITS, folds=5, epochs=300, seed=0):
+    # {field: {"weights", "bias", "classes", "temperature", "samples", "cv_accuracy"}}
+    import numpy as np
+    from email_thread import prepare_thread
+    texts = [prepare_thread(text)[0] for text, _, _ in examples]
+    matrix_all = feature_matrix(texts, n_bits)
+    n_features = 1 << n_bits
+    rng = np.random.default_rng(seed)
+    models = {}
+    for field in MODEL_FIELDS:
+        keep = [i for i, (_, fields, _) in enumerate(examples) if fields[field] or field in BLANK_IS_LABEL]
+        classes = sorted({examples[i][1][field] for i in keep})
+        if len(classes) < 2:
+            continue
+        labels = np.array([classes.index(examples[i][1][field]) for i in keep])
+        weight = np.array([examples[i][2] for i in keep], dtype=np.float32)
+        matrix = _rows(matrix_all, keep)
+
+        # Out-of-fold logits for the temperature and an honest accuracy figure
+        fold_of = rng.permutation(len(keep)) % max(2, min(folds, len(keep)))
+        held_out = np.zeros((len(keep), len(classes)), dtype=np.float32)
+        for k in np.unique(fold_of):
+            train_idx, test_idx = np.flatnonzero(fold_of != k), np.flatnonzero(fold_of == k)
+            w, b = fit_softmax(_rows(matrix, train_idx), labels[train_idx], weight[train_idx], len(classes),
+                               n_features, epochs)
+            held_out[test_idx] = sparse_logits(_rows(matrix, test_idx), w, b)
+        temperature = fit_temperature(held_out, labels, weight)
+        weights, bias = fit_softmax(matrix, labels, weight, len(classes), n_features, epochs)
+        models[field] = {
+            "weights": weights, "bias": bias, "classes": classes, "temperature": temperature,
+            "samples": len(keep), "cv_accuracy": float(np.mean(held_out.argmax(axis=1) == labels)),
+        }
+    return models
+
+
+def _rows(matrix, index):
+    import numpy as np
+    columns, values, offsets = matrix
+    parts = [np.arange(offsets[i], offsets[i + 1]) for i in index]
+    take = np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+    lengths = np.array([offsets[i + 1] - offsets[i] for i in index], dtype=np.int64)
+    return columns[take], values[take], np.concatenate([[0], np.cumsum(lengths)])
+
+
+def save_models(models, path=MODEL_PATH, n_bits=N_BITS, meta=None):
+    import numpy as np
+    arrays = {"n_bits": np.array(n_bits), "meta": np.array(json.dumps(meta or {}))}
+    for field, model in models.items():
+        arrays[f"{field}.weights"] = model["weights"].astype(np.float16)
+        arrays[f"{field}.bias"] = model["bias"]
+        arrays[f"{field}.classes"] = np.array(model["classes"], dtype=str)
+        arrays[f"{field}.temperature"] = np.array(model["temperature"], dtype=np.float32)
+    tmp = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez_compressed(tmp, **arrays)
+    os.replace(tmp, path)
+
+
+class TicketModel:
+    def __init__(self, path=MODEL_PATH):
+        self.path = path
+        self.mtime = None
+        # (n_bits, weights, bias, {field: (slice, classes, temperature)}), swapped as one on reload. All
+        # fields' weights sit side by side so a batch needs a single gather over the feature columns.
+        self._state = (N_BITS, None, None, {})
+        self.meta = {}
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def refresh(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            # Deleted or mid-replace: keep serving the weights already loaded
+            return False
+        if mtime == self.mtime:
+            return False
+        import numpy as np
+        with self._lock, np.load(self.path, allow_pickle=False) as data:
+            fields, weights, bias, start = {}, [], [], 0
+            for field in MODEL_FIELDS:
+                if f"{field}.weights" in data:
+                    classes = [str(c) for c in data[f"{field}.classes"]]
+                    fields[field] = (slice(start, start + len(classes)), classes, float(data[f"{field}.temperature"]))
+                    weights.append(data[f"{field}.weights"].astype(np.float32))
+                    bias.append(data[f"{field}.bias"].astype(np.float32))
+                    start += len(classes)
+            if fields:
+                self._state = (int(data["n_bits"]), np.hstack(weights), np.concatenate(bias), fields)
+            else:
+                self._state = (int(data["n_bits"]), None, None, {})
+            self.meta = json.loads(str(data["meta"]))
+            self.mtime = mtime
+        return True
+
+    @property
+    def fields(self):
+        return tuple(self._state[3])
+
+    def predict_proba(self, texts):
+        # {field: (classes, probabilities[len(texts), len(classes)])} for a whole batch at once
+        n_bits, weights, bias, fields = self._state
+        if not fields:
+            return {}
+        logits = sparse_logits(feature_matrix(texts, n_bits), weights, bias)
+        return {
+            field: (classes, softmax(logits[:, columns] / temperature))
+            for field, (columns, classes, temperature) in fields.items()
+        }
+
+    def predict_batch(self, texts):
+        # [{field: (label, probability)}] in input order
+        texts = list(texts)
+        results = [{} for _ in texts]
+        for field, (classes, probs) in self.predict_proba(texts).items():
+            best = probs.argmax(axis=1)
+            for i, j in enumerate(best):
+                results[i][field] = (classes[j], float(probs[i, j]))
+        return results
+
+    def predict(self, text):
+        return self.predict_batch([text])[0]
+
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_ticket_model(path=MODEL_PATH):
+    # None until `python ticket_model.py` has written a model; reloads when the file changes
+    global _model
+    if _model is None:
+        if not os.path.exists(path):
+            return None
+        with _model_lock:
+            if _model is None:
+                _model = TicketModel(path)
+        return _model
+    _model.refresh()
+    return _model
+
+
+def local_prediction(text):
+    model = get_ticket_model()
+    return model.predict(text) if model is not None else None
+
+
+def local_predictions(texts):
+    # Batch form for backlog runs: one vectorised pass over any iterable of texts (not consumed, and
+    # None returned, when no model has been trained)
+    model = get_ticket_model()
+    return model.predict_batch(texts) if model is not None else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the local category / sub-category / inventory model.")
+    parser.add_argument("--log", default=LOG_PATH, help="Classification log to learn from")
+    parser.add_argument("-o", "--output", default=MODEL_PATH)
+    parser.add_argument("--bits", type=int, default=N_BITS, help="Hashed feature space is 2**bits")
+    parser.add_argument("--epochs", type=int, default=300)
+    args = parser.parse_args(argv)
+
+    examples = read_training_data(args.log)
+    labelled = sum(1 for _, _, w in examples if w > 1)
+    print(f"🧠 {len(examples)} distinct tickets ({labelled} labelled or confirmed, {len(examples) - labelled} from the log)")
+    started = time.perf_counter()
+    models = train(examples, args.bits, epochs=args.epochs)
+    if not models:
+        print("❌ Not enough distinct labels to train (every field needs at least two classes)")
+        return 1
+    meta = {"trained_at": time.time(), "tickets": len(examples),
+            "fields": {f: {"samples": m["samples"], "cv_accuracy": m["cv_accuracy"]} for f, m in models.items()}}
+    save_models(models, args.output, args.bits, meta)
+    print(f"⏱️  trained in {time.perf_counter() - started:.1f}s")
+    for field, model in models.items():
+        print(f"   {field:<15} {len(model['classes'])} classes, {model['samples']} samples, "
+              f"out-of-fold accuracy {model['cv_accuracy']:.0%}, temperature {model['temperature']:.2f}")
+
+    model = TicketModel(args.output)
+    texts = [text for text, _, _ in examples]
+    for text in texts:
+        model.predict(text)
+    timings = []
+    for text in texts * max(1, 2000 // len(texts)):
+        started = time.perf_counter()
+        model.predict(text)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    started = time.perf_counter()
+    model.predict_batch(texts * max(1, 2000 // len(texts)))
+    batch_ms = (time.perf_counter() - started) * 1000 / (len(texts) * max(1, 2000 // len(texts)))
+    print(f"💾 {args.output} ({os.path.getsize(args.output) / 1024:.0f} KB); predict p50 {timings[len(timings) // 2]:.3f} ms, "
+          f"p95 {timings[int(len(timings) * 0.95)]:.3f} ms, batch {batch_ms:.3f} ms/ticket")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
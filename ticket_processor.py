@@ -4,6 +4,8 @@ import json
 import pandas as pd
 from preprocessor import preprocess_ticket, batch_preprocess_csv
 from dotenv import load_dotenv
+from dealer_index import get_dealer_index
+from batch_classifier import classify_batch
 
 load_dotenv()
 client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
@@ -18,12 +20,6 @@ Only use known dropdowns for Category, Sub Category, and Inventory Type. If a fi
 Avoid assumptions. Match how a real support analyst would reason.
 """
 
-# Load dealer-rep mapping
-mapping_df = pd.read_csv("rep_dealer_mapping.csv")
-mapping_df["Dealer Name"] = mapping_df["Dealer Name"].str.lower()
-dealer_to_rep = mapping_df.set_index("Dealer Name")["Rep Name"].to_dict()
-dealer_to_id = mapping_df.set_index("Dealer Name")["Dealer ID"].to_dict()
-
 def build_prompt(text, context):
     return [
         {"role": "system", "content": SYSTEM_PROMPT},
@@ -43,21 +39,26 @@ def classify_ticket_llm(text):
     # Auto-fill Dealer ID and Rep if Dealer Name matches confidently
     for line in result.splitlines():
         if line.lower().startswith("dealer name:"):
-            dealer_name = line.split(":", 1)[1].strip().lower()
-            if dealer_name in dealer_to_rep:
-                result = result.replace("Rep:", f"Rep: {dealer_to_rep[dealer_name]}")
-            if dealer_name in dealer_to_id:
-                result = result.replace("Dealer ID:", f"Dealer ID: {dealer_to_id[dealer_name]}")
+            match = get_dealer_index().lookup(line.split(":", 1)[1])
+            if match:
+                result = result.replace("Rep:", f"Rep: {match['rep']}")
+                result = result.replace("Dealer ID:", f"Dealer ID: {match['dealer_id']}")
             break
 
     return result
 
 def classify_batch_from_csv(path="classifier_input_examples.csv"):
+    # Concurrent, through the same engine as prep_main.py (batch_classifier.py); results keep input order
     df = pd.read_csv(path)
-    for row in df.itertuples(index=False):
+    results = classify_batch(str(m) for m in df["message"])
+    for row, result in zip(df.itertuples(index=False), results):
         print(f"--- Ticket Source: {row.source} ---")
-        result = classify_ticket_llm(row.message)
-        print(result)
+        if "error" in result:
+            print(f"❌ {result['error']}")
+        else:
+            for field, value in result.get("zoho_fields", {}).items():
+                print(f"{field}: {value}")
+            print(f"\n{result.get('zoho_comment', '').strip()}")
         print("=" * 80)
 
 if __name__ == "__main__":
@@ -0,0 +1,151 @@
+import os
+import time
+import secrets
+
+# Opt-in per-stage timing for classify_ticket. Disabled traces are a shared no-op object,
+# so the instrumented code pays one attribute lookup and an empty `with` per stage.
+TRACE_ENABLED = os.getenv("CLASSIFIER_TRACE", "0") == "1"
+TRACE_PATH = os.getenv("CLASSIFIER_TRACE_PATH", "")
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attributes):
+        pass
+
+
+class NullTrace:
+    enabled = False
+
+    def span(self, name, **attributes):
+        return _NULL_SPAN
+
+    def set(self, **attributes):
+        pass
+
+    def to_dict(self):
+        return None
+
+
+_NULL_SPAN = _NullSpan()
+NULL_TRACE = NullTrace()
+
+
+class Span:
+    def __init__(self, trace, name, parent, attributes):
+        self.trace = trace
+        self.name = name
+        self.span_id = secrets.token_hex(8)
+        self.parent = parent
+        self.attributes = attributes
+        self.start_ns = 0
+        self.end_ns = 0
+
+    def __enter__(self):
+        self.trace._stack.append(self)
+        self.start_ns = time.time_ns()
+        self._perf = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_ns = self.start_ns + (time.perf_counter_ns() - self._perf)
+        if exc_type is not None:
+            self.attributes["error"] = repr(exc)
+        self.trace._stack.pop()
+        return False
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    @property
+    def duration_ms(self):
+        return (self.end_ns - self.start_ns) / 1e6
+
+
+class Trace:
+    enabled = True
+
+    def __init__(self, name="classify_ticket"):
+        self.name = name
+        self.trace_id = secrets.token_hex(16)
+        self.attributes = {}
+        self.spans = []
+        self._stack = []
+        self.start_ns = time.time_ns()
+
+    def span(self, name, **attributes):
+        parent = self._stack[-1].span_id if self._stack else None
+        span = Span(self, name, parent, attributes)
+        self.spans.append(span)
+        return span
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self):
+        end_ns = max([s.end_ns for s in self.spans] + [self.start_ns])
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "duration_ms": round((end_ns - self.start_ns) / 1e6, 3),
+            "attributes": dict(self.attributes),
+            "spans": [
+                {
+                    "name": s.name,
+                    "span_id": s.span_id,
+                    "parent_id": s.parent,
+                    "start_offset_ms": round((s.start_ns - self.start_ns) / 1e6, 3),
+                    "duration_ms": round(s.duration_ms, 3),
+                    "attributes": dict(s.attributes),
+                }
+                for s in self.spans
+            ],
+        }
+
+    def to_otel(self):
+        # OTLP/JSON span shape, ready to wrap in resourceSpans/scopeSpans for a collector
+        return [
+            {
+                "traceId": self.trace_id,
+                "spanId": s.span_id,
+                "parentSpanId": s.parent or "",
+                "name": s.name,
+                "kind": 1,
+                "startTimeUnixNano": str(s.start_ns),
+                "endTimeUnixNano": str(s.end_ns),
+                "attributes": [_otel_attribute(k, v) for k, v in {**self.attributes, **s.attributes}.items()],
+            }
+            for s in self.spans
+        ]
+
+    def write_jsonl(self, path=None):
+        # Queued to a background writer (classification_log.py) so the request never waits on disk
+        path = path or TRACE_PATH
+        if not path:
+            return False
+        from classification_log import get_log_writer
+        return get_log_writer(path).submit(self.to_dict())
+
+
+def _otel_attribute(key, value):
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def start_trace(trace=None, name="classify_ticket"):
+    # trace: None -> follow CLASSIFIER_TRACE, True/False -> force, or an existing Trace to append to
+    if isinstance(trace, (Trace, NullTrace)):
+        return trace
+    if trace is None:
+        trace = TRACE_ENABLED
+    return Trace(name) if trace else NULL_TRACE
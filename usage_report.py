@@ -0,0 +1,67 @@
+import sys
+import json
+import argparse
+
+from classification_log import LOG_PATH
+from model_router import RouteStats, format_routes
+
+# Token usage, repair round trips and model latency from the classification log (result["usage"] on LLM-tier results):
+# how much of the prompt the provider served from its prefix cache, and how much faster those calls were. Routed
+# results (model_router.py) add tickets, latency and cost per route against the requested model alone.
+
+
+def read_outputs(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                output = json.loads(line).get("output")
+            except json.JSONDecodeError:
+                continue
+            if isinstance(output, dict) and isinstance(output.get("usage"), dict):
+                yield output
+
+
+def median(values):
+    ordered = sorted(values)
+    return ordered[len(ordered) // 2] if ordered else 0.0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarise token usage and prompt-cache hits from the classification log.")
+    parser.add_argument("log", nargs="?", default=LOG_PATH)
+    parser.add_argument("--cached-discount", type=float, default=0.5, help="Price of a cached prompt token vs a fresh one")
+    args = parser.parse_args(argv)
+
+    outputs = list(read_outputs(args.log))
+    rows = [output["usage"] for output in outputs]
+    if not rows:
+        print(f"ℹ️  No LLM usage recorded in {args.log} yet.")
+        return 0
+    prompt = sum(r.get("prompt_tokens", 0) for r in rows)
+    cached = sum(r.get("cached_tokens", 0) for r in rows)
+    completion = sum(r.get("completion_tokens", 0) for r in rows)
+    repairs = sum(r.get("repairs", 0) for r in rows)
+    hit = [r["llm_ms"] for r in rows if r.get("cached_tokens") and "llm_ms" in r]
+    miss = [r["llm_ms"] for r in rows if not r.get("cached_tokens") and "llm_ms" in r]
+
+    calls = sum(len(r.get("calls", [None])) for r in rows)
+    print(f"📊 {len(rows)} LLM-tier tickets, {calls} calls: {prompt} prompt tokens ({cached / prompt:.0%} cached), {completion} completion tokens")
+    print(f"   {completion / calls:.0f} completion tokens per call, {repairs} repair round trips "
+          f"({sum(r.get('repair_tokens', 0) for r in rows)} tokens)")
+    print(f"   prompt cost saved by caching: {cached * (1 - args.cached_discount) / prompt:.0%}")
+    print(f"   median model latency: {median(hit):.0f} ms with cache hit ({len(hit)} tickets), "
+          f"{median(miss):.0f} ms without ({len(miss)} tickets)")
+
+    routes = RouteStats()
+    for output in outputs:
+        if output.get("route"):
+            routes.add(output["route"], output["usage"])
+    if routes.routes:
+        print("🧭 Model routes:")
+        for line in format_routes(routes.summary()):
+            print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())